@@ -11,6 +11,12 @@ from ..services.auth import (
 from ..services.ml_integration import ml_service
 from ..db.database import db
 from ..db.neo4j_client import store_social_raw_data
+from ..services.interest_index import interest_index
+from ..services.minhash_index import minhash_index
+from ..services.feature_store import feature_store
+from ..services.recommendation_cache import recommendation_cache
+from ..services.matching import birth_year_of, calculate_age
+from ..core.interest_bitmask import mask_properties
 from typing import Any, Dict
 import uuid
 import os
@@ -27,7 +33,7 @@ async def register(user_in: UserCreate) -> Any:
     query = """
     MATCH (u:User {email: $email}) RETURN u
     """
-    result = db.execute_query(query, {"email": user_in.email})
+    result = await db.execute_query_async(query, {"email": user_in.email})
     if result:
         raise HTTPException(
             status_code=400,
@@ -52,8 +58,12 @@ async def register(user_in: UserCreate) -> Any:
         hashed_password: $hashed_password,
         gender: $gender,
         birth_date: $birth_date,
+        birth_year: $birth_year,
+        age: $age,
         bio: $bio,
         interests: $interests,
+        interest_mask: $interest_mask,
+        interest_count: $interest_count,
         location: $location,
         profile_photo: $profile_photo,
         created_at: datetime(),
@@ -70,8 +80,13 @@ async def register(user_in: UserCreate) -> Any:
     
     user_data = user_in.dict()
     user_data["hashed_password"] = hashed_password
+    # Denormalized for the indexed age filter
+    user_data["birth_year"] = birth_year_of(user_in.birth_date)
+    user_data["age"] = calculate_age(user_in.birth_date)
+    # Interests as a bitmask over the interest vocabulary
+    user_data.update(mask_properties(user_in.interests))
     
-    result = db.execute_query(query, user_data)
+    result = await db.execute_query_async(query, user_data)
     
     # Analyze user metadata
     metadata = ml_service.analyze_user(user_data)
@@ -82,7 +97,7 @@ async def register(user_in: UserCreate) -> Any:
         MATCH (u:User {email: $email})
         SET u.metadata = $metadata
         """
-        db.execute_query(
+        await db.execute_query_async(
             update_query,
             {
                 "email": user_data["email"],
@@ -90,6 +105,11 @@ async def register(user_in: UserCreate) -> Any:
             }
         )
     
+    interest_index.update_user(result[0]["u"].get("id"), user_data["interests"])
+    minhash_index.update_user(result[0]["u"].get("id"), interests=user_data["interests"])
+    recommendation_cache.invalidate_segment(user_data["interests"])
+    await feature_store.refresh_user(result[0]["u"].get("id"))
+    
     return UserResponse(**result[0]["u"])
 
 @router.post("/auth/register_test", response_model=UserResponse)
@@ -98,7 +118,7 @@ async def register_test(user_in: UserCreate) -> Any:
     query = """
     MATCH (u:User {email: $email}) RETURN u
     """
-    result = db.execute_query(query, {"email": user_in.email})
+    result = await db.execute_query_async(query, {"email": user_in.email})
     if result:
         raise HTTPException(
             status_code=400,
@@ -117,8 +137,12 @@ async def register_test(user_in: UserCreate) -> Any:
         hashed_password: $hashed_password,
         gender: $gender,
         birth_date: $birth_date,
+        birth_year: $birth_year,
+        age: $age,
         bio: $bio,
         interests: $interests,
+        interest_mask: $interest_mask,
+        interest_count: $interest_count,
         location: $location,
         profile_photo: $profile_photo,
         created_at: datetime(),
@@ -135,8 +159,13 @@ async def register_test(user_in: UserCreate) -> Any:
     
     user_data = user_in.dict()
     user_data["hashed_password"] = hashed_password
+    # Denormalized for the indexed age filter
+    user_data["birth_year"] = birth_year_of(user_in.birth_date)
+    user_data["age"] = calculate_age(user_in.birth_date)
+    # Interests as a bitmask over the interest vocabulary
+    user_data.update(mask_properties(user_in.interests))
     user_data["id"] = user_id
-    result = db.execute_query(query, user_data)
+    result = await db.execute_query_async(query, user_data)
     
     if not result:
         raise HTTPException(
@@ -144,6 +173,11 @@ async def register_test(user_in: UserCreate) -> Any:
             detail="Could not create user"
         )
     
+    interest_index.update_user(user_id, user_data["interests"])
+    minhash_index.update_user(user_id, interests=user_data["interests"])
+    recommendation_cache.invalidate_segment(user_data["interests"])
+    await feature_store.refresh_user(user_id)
+    
     # Convert Neo4j DateTime to Python datetime
     user_dict = dict(result[0]["u"])
     if "birth_date" in user_dict:
@@ -171,7 +205,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     MATCH (u:User {email: $email})
     RETURN u
     """
-    result = db.execute_query(query, {"email": form_data.username})
+    result = await db.execute_query_async(query, {"email": form_data.username})
     
     if not result:
         raise HTTPException(
@@ -199,7 +233,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     SET u.login_frequency = coalesce(u.login_frequency, 0) + 1,
         u.last_login = datetime()
     """
-    db.execute_query(update_query, {"email": user["email"]})
+    await db.execute_query_async(update_query, {"email": user["email"]})
     
     return {
         "access_token": access_token,
@@ -3,6 +3,7 @@ from typing import Any, List, Dict
 from ..models.user import UserInDB
 from ..services.auth import get_current_active_user
 from ..db.database import db
+from ..services.activity_counters import activity_counters
 from datetime import datetime, timedelta
 import json
 import random
@@ -26,24 +27,9 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
-            # Store message in database
-            query = """
-            MATCH (sender:User {id: $sender_id}), (receiver:User {id: $receiver_id})
-            CREATE (sender)-[r:SENT {
-                content: $content,
-                sent_at: datetime(),
-                read: false
-            }]->(receiver)
-            RETURN r
-            """
-            
-            db.execute_query(
-                query,
-                {
-                    "sender_id": user_id,
-                    "receiver_id": message_data["receiver_id"],
-                    "content": message_data["content"]
-                }
+            # Store message in database and update the sender's message counters
+            await activity_counters.record_message(
+                user_id, message_data["receiver_id"], message_data["content"]
             )
             
             # Send message to receiver if online
@@ -66,7 +52,7 @@ async def get_chat_history(
     RETURN r
     """
     
-    result = db.execute_query(
+    result = await db.execute_query_async(
         query,
         {
             "current_user_id": current_user.id,
@@ -90,7 +76,7 @@ async def get_chat_history(
     LIMIT 100
     """
     
-    messages = db.execute_query(
+    messages = await db.execute_query_async(
         query,
         {
             "user1_id": current_user.id,
@@ -112,7 +98,7 @@ async def mark_messages_as_read(
     RETURN count(r) as updated
     """
     
-    result = db.execute_query(
+    result = await db.execute_query_async(
         query,
         {
             "sender_id": user_id,
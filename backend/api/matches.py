@@ -1,29 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Any, List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime
 import os
 import random
 import uuid
 
-from ..models.user import UserInDB, UserResponse, UserPreferences
+from ..core.config import get_settings
+from ..models.user import UserInDB, UserResponse, UserPreferences, SwipeAction, SwipeBatch, DeckPage
 from ..services.auth import get_current_active_user
 from ..services.matching import get_matches, create_match, accept_match, reject_match
 from ..db.database import db
 from ..db.neo4j_client import get_recommendations_for_user
 from ..services.ml_integration import ml_service
+from ..services.interest_index import interest_index
+from ..services.minhash_index import minhash_index
+from ..core.interest_bitmask import INTEREST_BITS
+from ..services.analysis_cache import analysis_cache
+from ..services.feature_store import feature_store
+from ..services.recommendation_cache import recommendation_cache
+from ..services.ml_executor import ml_executor
+from ..services.geo_index import geo_index
+from ..services.activity_counters import activity_counters
+from ..services.seen_set import seen_sets
+from ..services.deck import deck_store, decode_cursor, InvalidCursor
+from ..services.user_snapshot import user_snapshot
 from pydantic import EmailStr
 
 # --------------------------------------------------------------------------- #
 # helpers                                                                     #
 # --------------------------------------------------------------------------- #
 
+settings = get_settings()
+
 SUPERADMIN_MODE   = os.getenv("SUPERADMIN_MODE", "False").lower() == "true"
 SUPERADMIN_DB_ID  = os.getenv("SUPERADMIN_DB_ID", "00000000-0000-0000-0000-000000admin")
 SUPERADMIN_EMAIL  = os.getenv("SUPERADMIN_EMAIL", "superadmin@example.com")
 SUPERADMIN_UNAME  = os.getenv("SUPERADMIN_USERNAME", "superadmin")
 
 
-def _ensure_superadmin_node() -> str:
+async def _ensure_superadmin_node() -> str:
     """
     Make sure the super-admin User node exists in Neo4j.
     Returns the node’s id (uuid as string).
@@ -37,28 +52,40 @@ def _ensure_superadmin_node() -> str:
         sa.gender          = 'other',
         sa.birth_date      = date('1980-01-01'),
         sa.age             = 44,
+        sa.birth_year      = 1980,
         sa.location        = 'Nowhere',
         sa.city            = 'Nowhere',
         sa.country         = 'Nowhere',
         sa.latitude        = 0.0,
         sa.longitude       = 0.0,
+        sa.location_point  = point({latitude: 0.0, longitude: 0.0}),
         sa.interests       = ['Technology'],
+        sa.interest_mask   = $interest_mask,
+        sa.interest_count  = 1,
         sa.bio             = 'I keep the lights on 👑',
         sa.created_at      = datetime(),
         sa.updated_at      = datetime(),
         sa.is_active       = true,
         sa.is_verified     = true,
         sa.match_score     = 1.0
+    // Nodes created before they had a point are not covered by the radius index
+    ON MATCH SET
+        sa.location_point  = coalesce(sa.location_point, point({latitude: 0.0, longitude: 0.0}))
     RETURN sa.id AS id
     """
-    rec = db.execute_query(
+    rec = await db.execute_query_async(
         query,
-        {"id": SUPERADMIN_DB_ID, "email": SUPERADMIN_EMAIL, "username": SUPERADMIN_UNAME},
+        {
+            "id": SUPERADMIN_DB_ID,
+            "email": SUPERADMIN_EMAIL,
+            "username": SUPERADMIN_UNAME,
+            "interest_mask": INTEREST_BITS["Technology"],
+        },
     )
     return rec[0]["id"]
 
 
-def _normalise_current_user(current_user: UserInDB) -> UserInDB:
+async def _normalise_current_user(current_user: UserInDB) -> UserInDB:
     """
     If SUPERADMIN_MODE is active we map any authenticated “super-admin”
     account to the persistent DB node so that all Cypher queries work.
@@ -66,7 +93,7 @@ def _normalise_current_user(current_user: UserInDB) -> UserInDB:
     if not SUPERADMIN_MODE:
         return current_user
 
-    _ensure_superadmin_node()  # create if needed
+    await _ensure_superadmin_node()  # create if needed
     # overwrite only the id / email / username used in Cypher
     current_user.id = SUPERADMIN_DB_ID
     current_user.email = SUPERADMIN_EMAIL
@@ -86,24 +113,94 @@ async def get_match_recommendations(
     current_user: UserInDB = Depends(get_current_active_user),
 ) -> Any:
     """
-    1. Try to return the 10 best matches in Neo4j using the
-       Jaccard-similarity / shared-interest query.
+    1. Try to return the 10 best matches by Jaccard similarity over
+       interests, answered from the in-process inverted interest index.
     2. If no matches are found, fall back to the existing RandomUser
        recommendation logic (get_recommendations_for_user).
     3. If SUPERADMIN_MODE is on and the caller has no stored preferences,
        we *still* run the Jaccard query – super-admin just skips the
        preference filter rather than failing.
     """
+    await _require_preferences(current_user)
+
+    cached = recommendation_cache.get(current_user.id, "recommendations")
+    if cached is not None:
+        return cached
+
+    recommendations, my_interests = await _rank_recommendations(current_user, 10)
+    if recommendations:  # ✨ we found matches, cache them for the frontend
+        recommendation_cache.set(
+            current_user.id, "recommendations", recommendations, segments=my_interests
+        )
+        return recommendations
+
+    # ----------------------------------------------------------------------
+    # 2.  Fallback – RandomUser recommendations (your existing behaviour)
+    # ----------------------------------------------------------------------
+    fallback = await get_recommendations_for_user(current_user.id, 10)
+    return [_to_user_response(r, r["match_score"], i) for i, r in enumerate(fallback)]
+
+
+@router.get("/matches/deck", response_model=DeckPage)
+async def get_match_deck(
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+    page_size: int = Query(settings.DECK_PAGE_SIZE, ge=1, le=50),
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> Any:
+    """
+    Page through a ranked recommendation deck.
+
+    The deck (DECK_SIZE users, ranked like /matches/recommendations) is
+    computed once and kept server-side; each page returns `next_cursor` for
+    the following one, and `prefetch` once the client should request it ahead
+    of time. Profiles swiped since the deck was ranked are skipped. A new deck
+    is ranked only when the cursor is exhausted or its deck was invalidated.
+    """
+    await _require_preferences(current_user)
+
+    if cursor:
+        try:
+            deck_id, offset = decode_cursor(cursor)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    else:
+        deck_id, offset = deck_store.current(current_user.id), 0
+
+    seen = await seen_sets.get(current_user.id)
+    page = deck_store.page(current_user.id, deck_id, offset, page_size, exclude=seen) if deck_id else None
+    if page is None or not page["items"]:
+        ranked, _ = await _rank_recommendations(current_user, settings.DECK_SIZE)
+        if not ranked:
+            fallback = await get_recommendations_for_user(current_user.id, settings.DECK_SIZE)
+            ranked = [_to_user_response(r, r["match_score"], i) for i, r in enumerate(fallback)]
+        deck_id = deck_store.store(current_user.id, ranked)
+        page = deck_store.page(current_user.id, deck_id, 0, page_size, exclude=seen)
+
+    if page is None:
+        return DeckPage(items=[], next_cursor=None, prefetch=False, remaining=0)
+    return DeckPage(
+        items=page["items"],
+        next_cursor=page["next_cursor"],
+        prefetch=page["remaining"] <= page_size,
+        remaining=page["remaining"],
+    )
+
+
+async def _require_preferences(current_user: UserInDB) -> None:
+    """
+    Reject callers without stored matching preferences. Super-admin
+    skips the check rather than failing.
+    """
     # ---- super-admin flag -------------------------------------------------
     SUPERADMIN_MODE = os.getenv("SUPERADMIN_MODE", "False").lower() == "true"
 
-    # ---- fetch user preferences (we do **not** need them for this query,
+    # ---- fetch user preferences (we do **not** need them for the ranking,
     #      but keep the old logic so non-super-admins still get the warning)
     prefs_q = """
     MATCH (u:User {email: $email})
     RETURN u.preferences AS prefs
     """
-    rec = db.execute_query(prefs_q, {"email": current_user.email})
+    rec = await db.execute_query_async(prefs_q, {"email": current_user.email})
     prefs_present = bool(rec and rec[0].get("prefs"))
 
     if not prefs_present and not SUPERADMIN_MODE:
@@ -112,43 +209,67 @@ async def get_match_recommendations(
             detail="Please set your matching preferences first.",
         )
 
-    # ----------------------------------------------------------------------
-    # 1.  Neo4j Jaccard-similarity query
-    # ----------------------------------------------------------------------
-    cypher = """
-    MATCH (me:User {id: $me_id})
-    MATCH (them:User)
-    WHERE me <> them
-    WITH me, them,
-         [i IN me.interests WHERE i IN them.interests]        AS commonInterests,
-         size(me.interests) + size(them.interests)
-           - size([i IN me.interests WHERE i IN them.interests]) AS unionSize
-    WITH them,
-         commonInterests,
-         CASE
-           WHEN unionSize = 0 THEN 0.0
-           ELSE toFloat(size(commonInterests)) / unionSize
-         END                                                AS jaccardScore
-    ORDER BY jaccardScore DESC, size(commonInterests) DESC
-    LIMIT 10
-    RETURN them                               AS user,
-           commonInterests                    AS shared_interests,
-           round(jaccardScore, 2)             AS similarity;
-    """
 
-    records = db.execute_query(cypher, {"me_id": current_user.id})
+async def _user_interests(user_id: str) -> List[str]:
+    """The user's interests from the interest index, read from Neo4j when not indexed."""
+    interests = interest_index.get_interests(user_id)
+    if interests is None:
+        me_rec = await db.execute_query_async(
+            "MATCH (me:User {id: $me_id}) RETURN me.interests AS interests",
+            {"me_id": user_id},
+        )
+        interests = list((me_rec[0]["interests"] if me_rec else None) or [])
+        if me_rec:
+            interest_index.update_user(user_id, interests)
+    return interests
+
 
-    if records:  # ✨ we found matches, format them for the frontend
-        return [
-            _to_user_response(r["user"], r["similarity"], i)
-            for i, r in enumerate(records)
-        ]
+async def _rank_recommendations(
+    current_user: UserInDB,
+    k: int,
+) -> Tuple[List[UserResponse], List[str]]:
+    """
+    Rank the k best matches by Jaccard similarity over interests.
 
+    Returns the ranked users and the caller's interests (the cache segment).
+    """
     # ----------------------------------------------------------------------
-    # 2.  Fallback – RandomUser recommendations (your existing behaviour)
+    # 1.  Jaccard similarity over the in-process inverted interest index:
+    #     only users sharing an interest with the caller are scored
     # ----------------------------------------------------------------------
-    fallback = await get_recommendations_for_user(current_user.id, 10)
-    return [_to_user_response(r, r["match_score"], i) for i, r in enumerate(fallback)]
+    await interest_index.ensure_loaded()
+    my_interests = await _user_interests(current_user.id)
+
+    # Users the caller already liked, disliked, blocked or matched are
+    # dropped before scoring
+    seen = await seen_sets.get(current_user.id)
+    neighbours = []
+    if len(interest_index) >= settings.MINHASH_MIN_USERS:
+        # Past a few hundred thousand users even the posting lists of popular
+        # interests are too long: take approximate neighbours over interests
+        # and topics from the LSH buckets instead
+        await minhash_index.ensure_loaded(wait=False)
+        if minhash_index.is_loaded and current_user.id not in minhash_index:
+            minhash_index.update_user(current_user.id, interests=my_interests)
+        neighbours = minhash_index.top_k(current_user.id, k=k, exclude=seen)
+    if not neighbours:
+        neighbours = interest_index.top_k(current_user.id, my_interests, k=k, exclude=seen)
+
+    # Hydrate only the winning User nodes, keeping the ranking order
+    users_q = """
+    UNWIND $ids AS id
+    MATCH (them:User {id: id})
+    RETURN them.id AS id, them AS user
+    """
+    nodes = {
+        r["id"]: r["user"]
+        for r in await db.execute_query_async(users_q, {"ids": [n["id"] for n in neighbours]})
+    }
+    recommendations = [
+        _to_user_response(nodes[n["id"]], n["similarity"], i)
+        for i, n in enumerate(n for n in neighbours if n["id"] in nodes)
+    ]
+    return recommendations, my_interests
 
 
 # --------------------------------------------------------------------------- #
@@ -160,50 +281,30 @@ async def create_new_match(
     user_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
 ) -> Any:
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
 
-    # 1 . Does the target user actually exist?
-    exists_q = "MATCH (u:User {id:$them}) RETURN count(u) AS c"
-    if db.execute_query(exists_q, {"them": user_id})[0]["c"] == 0:
+    # Validate the target, upsert the relationship and detect reciprocity
+    # in a single write transaction
+    match = await create_match(current_user.id, user_id)
+    if match is None:
         raise HTTPException(status_code=404, detail="Target user not found")
-
-    # 2 . Relationship already there?
-    qry_exists = """
-    MATCH (u1:User {id:$me})-[r:MATCHED]->(u2:User {id:$them})
-    RETURN r
-    """
-    if db.execute_query(qry_exists, {"me": current_user.id, "them": user_id}):
+    seen_sets.add(current_user.id, user_id)
+    if not match["is_new"]:
         return {"message": "Match already exists", "is_new": False}
 
-    # 3 . Pick a score (fallback to 0.75 if none stored)
-    score_q = "MATCH (u:User {id:$them}) RETURN coalesce(u.match_score, 0.75) AS s"
-    score_rec = db.execute_query(score_q, {"them": user_id})
-    match_score = score_rec[0]["s"] if score_rec else 0.75
-
-    # 4 . Create relationship
-    create_match(current_user.id, user_id, match_score)
-
-    # 5 . Check if this instantly became mutual
-    mutual_q = """
-    MATCH (a:User {id:$me})-[:MATCHED {status:'accepted'}]->(b:User {id:$them}),
-          (b)-[:MATCHED {status:'accepted'}]->(a)
-    RETURN count(*) > 0 AS is_mutual
-    """
-    is_mutual = db.execute_query(
-        mutual_q, {"me": current_user.id, "them": user_id}
-    )[0]["is_mutual"]
+    recommendation_cache.invalidate_user(current_user.id)
 
     return {
         "message": "Match created successfully",
         "is_new": True,
-        "is_mutual": is_mutual,
+        "is_mutual": match["is_mutual"],
     }
 
 @router.put("/matches/{user_id}/accept")
 async def accept_user_match(
     user_id: str, current_user: UserInDB = Depends(get_current_active_user)
 ):
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
     try:
         accept_match(current_user.id, user_id)
         return {"message": "Match accepted successfully"}
@@ -215,7 +316,7 @@ async def accept_user_match(
 async def reject_user_match(
     user_id: str, current_user: UserInDB = Depends(get_current_active_user)
 ):
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
     try:
         reject_match(current_user.id, user_id)
         return {"message": "Match rejected successfully"}
@@ -229,13 +330,13 @@ async def reject_user_match(
 
 @router.get("/matches/my-matches", response_model=List[UserResponse])
 async def get_my_matches(current_user: UserInDB = Depends(get_current_active_user)):
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
     q = """
     MATCH (me:User {id:$me})-[r:MATCHED {status:'accepted'}]->(u:User)
     RETURN u AS user, r.score AS score
     ORDER BY r.score DESC
     """
-    recs = db.execute_query(q, {"me": current_user.id})
+    recs = await db.execute_query_async(q, {"me": current_user.id})
     return [
         UserResponse(**{**d["user"], "match_score": d["score"]}) for d in recs
     ]
@@ -243,13 +344,13 @@ async def get_my_matches(current_user: UserInDB = Depends(get_current_active_use
 
 @router.get("/matches/my-pending-likes")
 async def get_my_pending_likes(current_user: UserInDB = Depends(get_current_active_user)):
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
     q = """
     MATCH (me:User {id:$me})-[r:MATCHED {status:'pending'}]->(u:User)
     RETURN u AS user, r.score AS score, r.created_at AS liked_at
     ORDER BY liked_at DESC
     """
-    recs = db.execute_query(q, {"me": current_user.id})
+    recs = await db.execute_query_async(q, {"me": current_user.id})
     return [
         {
             "id": d["user"]["id"],
@@ -274,12 +375,22 @@ async def get_my_pending_likes(current_user: UserInDB = Depends(get_current_acti
 async def get_potential_matches(
     current_user: UserInDB = Depends(get_current_active_user),
 ) -> List[Dict[str, Any]]:
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
     try:
         from ..ml.matching_service import matching_service
 
+        cached = recommendation_cache.get(current_user.id, "matches")
+        if cached is not None:
+            return cached
+
         matches = await matching_service.get_matches_for_user(current_user.id, limit=10)
         if matches:
+            recommendation_cache.set(
+                current_user.id,
+                "matches",
+                matches,
+                segments=await _user_interests(current_user.id),
+            )
             return matches
     except Exception as exc:
         print("ML matching failed — falling back", exc)
@@ -291,26 +402,51 @@ async def get_potential_matches(
 async def like_user(
     user_id: str, current_user: UserInDB = Depends(get_current_active_user)
 ):
-    current_user = _normalise_current_user(current_user)
+    current_user = await _normalise_current_user(current_user)
 
     from ..ml.matching_service import matching_service
 
-    await matching_service.record_user_interaction(current_user.id, user_id, "LIKED")
+    # One transaction records the like, updates both users' statistics and
+    # creates the MATCHED relationships when the like is mutual
+    result = await matching_service.record_swipe(current_user.id, user_id, "LIKED")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Target user not found")
+
+    return {"success": True, "is_match": result["is_match"]}
 
-    mutual_q = """
-    MATCH (a:User {id:$me})-[:LIKED]->(b:User {id:$them}),
-          (b)-[:LIKED]->(a)
-    RETURN count(*) > 0 AS is_match
+
+@router.post("/swipes", tags=["matches"])
+async def submit_swipes(
+    batch: SwipeBatch, current_user: UserInDB = Depends(get_current_active_user)
+) -> Dict[str, Any]:
     """
-    is_match = db.execute_query(mutual_q, {"me": current_user.id, "them": user_id})[0][
-        "is_match"
-    ]
+    Record an ordered burst of swipes in one transaction.
+
+    Returns one result per swipe, in order, with whether it created a mutual
+    match, plus the caller's match statistics after the batch.
+    """
+    current_user = await _normalise_current_user(current_user)
 
-    if is_match:
-        await matching_service.update_user_match_statistics(current_user.id)
-        await matching_service.update_user_match_statistics(user_id)
+    from ..ml.matching_service import matching_service
 
-    return {"success": True, "is_match": is_match}
+    interaction_types = {SwipeAction.LIKE: "LIKED", SwipeAction.DISLIKE: "DISLIKED"}
+    recorded = await matching_service.record_swipes(
+        current_user.id,
+        [(swipe.target_id, interaction_types[swipe.action]) for swipe in batch.swipes],
+    )
+
+    return {
+        "results": [
+            {
+                "target_id": item["target_id"],
+                "action": swipe.action.value,
+                "status": item["status"],
+                "is_match": item["is_match"],
+            }
+            for swipe, item in zip(batch.swipes, recorded["results"])
+        ],
+        "statistics": recorded["statistics"],
+    }
 
 
 # --------------------------------------------------------------------------- #
@@ -322,7 +458,22 @@ async def get_match_statistics(
     current_user: UserInDB = Depends(get_current_active_user),
 ) -> Dict[str, Any]:
     # no DB access needed here – delegate to ML layer
-    return await ml_service.get_match_statistics()
+    statistics = await ml_service.get_match_statistics()
+    statistics["recommendation_cache"] = recommendation_cache.stats()
+    statistics["analysis_cache"] = analysis_cache.stats()
+    statistics["feature_store"] = feature_store.stats()
+    statistics["ml_executor"] = ml_executor.stats()
+    statistics["geo_index"] = geo_index.stats()
+    statistics["activity_counters"] = activity_counters.stats()
+    statistics["seen_sets"] = seen_sets.stats()
+    statistics["deck_store"] = deck_store.stats()
+    statistics["minhash_index"] = minhash_index.stats()
+    statistics["user_snapshot"] = user_snapshot.stats()
+
+    from ..ml.matching_service import matching_service
+    statistics["matching_pipeline"] = matching_service.pipeline_stats.as_dict()
+    statistics["scoring_queue"] = matching_service.scoring_queue.stats()
+    return statistics
 
 def _to_user_response(
     u: dict,
@@ -4,6 +4,12 @@ from ..models.user import UserUpdate, UserResponse, UserInDB, UserPreferences
 from ..services.auth import get_current_active_user, get_current_user
 from ..db.database import db
 from ..db.neo4j_client import get_user_raw_interests, store_user_topics
+from ..services.interest_index import interest_index
+from ..services.minhash_index import minhash_index
+from ..core.interest_bitmask import mask_properties
+from ..services.feature_store import feature_store
+from ..services.recommendation_cache import recommendation_cache
+from ..services.deck import deck_store
 import base64
 from pydantic import BaseModel
 from starlette.requests import Request          # keep this import
@@ -84,14 +90,23 @@ async def update_user_me(
     updates = {k: v for k, v in user_in.dict(exclude_unset=True).items()}
     if not updates:
         return current_user
+    if "interests" in updates:
+        # Keep the interest bitmask in step with the list (removed when it has no mask)
+        updates.update(mask_properties(updates["interests"]))
         
-    result = db.execute_query(
+    result = await db.execute_query_async(
         query,
         {
             "email": current_user.email,
             "updates": updates
         }
     )
+    if "interests" in updates:
+        interest_index.update_user(result[0]["u"].get("id"), updates["interests"])
+        minhash_index.update_user(result[0]["u"].get("id"), interests=updates["interests"])
+    recommendation_cache.invalidate_user(current_user.id)
+    deck_store.invalidate_user(current_user.id)
+    await feature_store.refresh_user(result[0]["u"].get("id"))
     return UserResponse(**result[0]["u"])
 
 @router.post("/users/me/photo")
@@ -108,7 +123,7 @@ async def upload_profile_photo(
     RETURN u
     """
     
-    result = db.execute_query(
+    result = await db.execute_query_async(
         query,
         {
             "email": current_user.email,
@@ -128,13 +143,15 @@ async def update_preferences(
     RETURN u
     """
     
-    result = db.execute_query(
+    result = await db.execute_query_async(
         query,
         {
             "email": current_user.email,
             "preferences": preferences.dict()
         }
     )
+    recommendation_cache.invalidate_user(current_user.id)
+    deck_store.invalidate_user(current_user.id)
     return {"message": "Preferences updated successfully"}
 
 @router.get("/users/{user_id}", response_model=UserResponse)
@@ -147,7 +164,7 @@ async def read_user(
     RETURN u
     """
     
-    result = db.execute_query(query, {"user_id": user_id})
+    result = await db.execute_query_async(query, {"user_id": user_id})
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
         
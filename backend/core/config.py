@@ -13,7 +13,13 @@ class Settings(BaseSettings):
     NEO4J_URI: str = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
     NEO4J_USER: str = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD: str = os.getenv("NEO4J_PASSWORD", "sammy_swipe_secret")
-    
+
+    # Neo4j connection pool settings (timeouts in seconds)
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50"))
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "10"))
+    NEO4J_MAX_CONNECTION_LIFETIME: float = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+    NEO4J_QUERY_TIMEOUT: float = float(os.getenv("NEO4J_QUERY_TIMEOUT", "15"))
+
     # JWT settings
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key")
     JWT_ALGORITHM: str = "HS256"
@@ -25,6 +31,73 @@ class Settings(BaseSettings):
     # ML Model settings
     MODEL_PATH: str = "ml/models"
     
+    # Seconds before the in-process interest index is rebuilt from Neo4j
+    INTEREST_INDEX_REFRESH_SECONDS: int = int(os.getenv("INTEREST_INDEX_REFRESH_SECONDS", "300"))
+    
+    # Per-user recommendation cache
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
+    RECOMMENDATION_CACHE_MAX_ENTRIES: int = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "10000"))
+    RECOMMENDATION_CACHE_MAX_BYTES: int = int(os.getenv("RECOMMENDATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    
+    # Memoized analysis of users' raw social data (ANALYSIS_CACHE_DIR enables on-disk persistence)
+    ANALYSIS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+    ANALYSIS_CACHE_DIR: str = os.getenv("ANALYSIS_CACHE_DIR", "")
+    
+    # In-process copy of the per-user feature records
+    FEATURE_STORE_CACHE_SECONDS: int = int(os.getenv("FEATURE_STORE_CACHE_SECONDS", "300"))
+    FEATURE_STORE_MAX_CACHED: int = int(os.getenv("FEATURE_STORE_MAX_CACHED", "20000"))
+    
+    # Executor for ML analysis and scoring (process pool only for batches of ML_PROCESS_MIN_BATCH+ items)
+    ML_THREAD_WORKERS: int = int(os.getenv("ML_THREAD_WORKERS", "4"))
+    ML_PROCESS_WORKERS: int = int(os.getenv("ML_PROCESS_WORKERS", "2"))
+    ML_PROCESS_MIN_BATCH: int = int(os.getenv("ML_PROCESS_MIN_BATCH", "2000"))
+    ML_EXECUTOR_MAX_PENDING: int = int(os.getenv("ML_EXECUTOR_MAX_PENDING", "64"))
+    
+    # Candidate search radius in km when a user has no max_distance preference (0 = unbounded)
+    MATCH_DEFAULT_RADIUS_KM: int = int(os.getenv("MATCH_DEFAULT_RADIUS_KM", "1000"))
+    # Seconds before the in-process geo index (used while the point index is unavailable) is rebuilt
+    GEO_INDEX_REFRESH_SECONDS: int = int(os.getenv("GEO_INDEX_REFRESH_SECONDS", "300"))
+    
+    # Seconds between recounts of the denormalized activity counters on User nodes
+    ACTIVITY_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("ACTIVITY_RECONCILE_INTERVAL_SECONDS", "3600"))
+    
+    # Per-user sets of already-seen profiles excluded from the swipe deck
+    SEEN_SET_MAX_USERS: int = int(os.getenv("SEEN_SET_MAX_USERS", "50000"))
+    SEEN_SET_REFRESH_SECONDS: int = int(os.getenv("SEEN_SET_REFRESH_SECONDS", "600"))
+    
+    # Server-side recommendation decks paged by cursor
+    DECK_SIZE: int = int(os.getenv("DECK_SIZE", "100"))
+    DECK_PAGE_SIZE: int = int(os.getenv("DECK_PAGE_SIZE", "10"))
+    DECK_TTL_SECONDS: int = int(os.getenv("DECK_TTL_SECONDS", "900"))
+    DECK_MAX_USERS: int = int(os.getenv("DECK_MAX_USERS", "20000"))
+    
+    # Matching pipeline budgets: retrieved pool, fully scored short-list, reranked window
+    MATCH_RETRIEVAL_POOL: int = int(os.getenv("MATCH_RETRIEVAL_POOL", "1000"))
+    MATCH_SHORTLIST_SIZE: int = int(os.getenv("MATCH_SHORTLIST_SIZE", "200"))
+    MATCH_RERANK_WINDOW: int = int(os.getenv("MATCH_RERANK_WINDOW", "30"))
+    # Weight of the interest-redundancy penalty of the final rerank (0 keeps the model order)
+    MATCH_RERANK_DIVERSITY: float = float(os.getenv("MATCH_RERANK_DIVERSITY", "0.1"))
+    
+    # MinHash/LSH neighbour index over interests and topics, used instead of exact
+    # Jaccard once at least MINHASH_MIN_USERS users are indexed
+    MINHASH_BANDS: int = int(os.getenv("MINHASH_BANDS", "32"))
+    MINHASH_ROWS: int = int(os.getenv("MINHASH_ROWS", "4"))
+    MINHASH_MAX_CANDIDATES: int = int(os.getenv("MINHASH_MAX_CANDIDATES", "5000"))
+    MINHASH_MIN_USERS: int = int(os.getenv("MINHASH_MIN_USERS", "100000"))
+    MINHASH_REFRESH_SECONDS: int = int(os.getenv("MINHASH_REFRESH_SECONDS", "900"))
+    
+    # Micro-batching of concurrent match scoring: a batch is scored once it holds
+    # SCORING_BATCH_MAX_ITEMS candidates or after SCORING_BATCH_MAX_WAIT_MS (0 disables).
+    # Batches are always scored on the ML thread pool, whatever ML_PROCESS_MIN_BATCH is
+    SCORING_BATCH_MAX_ITEMS: int = int(os.getenv("SCORING_BATCH_MAX_ITEMS", "2000"))
+    SCORING_BATCH_MAX_WAIT_MS: float = float(os.getenv("SCORING_BATCH_MAX_WAIT_MS", "2"))
+    
+    # In-memory columnar snapshot of every user, used for candidate retrieval once loaded
+    USER_SNAPSHOT_REFRESH_SECONDS: int = int(os.getenv("USER_SNAPSHOT_REFRESH_SECONDS", "900"))
+    # Directory the snapshot is published to and memory-mapped from by every worker
+    # (empty: each worker builds its own)
+    USER_SNAPSHOT_DIR: str = os.getenv("USER_SNAPSHOT_DIR", "")
+    
     # Database population settings
     POPULATE_DB_ON_STARTUP: bool = os.getenv("POPULATE_DB_ON_STARTUP", "True").lower() == "true"
     RANDOM_USER_COUNT: int = int(os.getenv("RANDOM_USER_COUNT", "1000"))
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Comprehensive user interests, the ones users are seeded with
+ALL_INTERESTS = [
+    "Travel", "Photography", "Cooking", "Fitness", "Reading",
+    "Art", "Music", "Movies", "Gaming", "Technology",
+    "Fashion", "Hiking", "Yoga", "Dancing", "Writing",
+    "Swimming", "Running", "Cycling", "Skiing", "Climbing",
+    "Food", "Coffee", "Wine", "Beer", "Cocktails",
+    "Science", "History", "Philosophy", "Politics", "Economics",
+    "Meditation", "Spirituality", "Volunteering", "Animals", "Nature",
+    "Cars", "Motorcycles", "DIY", "Gardening", "Painting"
+]
+
+# Closed interest vocabulary: ALL_INTERESTS followed by the analyzer's
+# INTEREST_KEYWORDS categories missing from it. A name's position is its bit
+# in the stored `interest_mask`, so names may only ever be appended (to
+# ALL_INTERESTS too); reordering or removing one invalidates every stored mask.
+# At most 63 names fit a Neo4j (signed 64-bit) integer.
+INTEREST_VOCABULARY = tuple(ALL_INTERESTS) + ("Sports",)
+
+INTEREST_BITS: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(INTEREST_VOCABULARY)}
+
+assert len(INTEREST_VOCABULARY) <= 63, "interest masks must fit a signed 64-bit integer"
+
+# Number of set bits for every byte value
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def interest_mask(interests: Optional[Iterable[str]]) -> Optional[int]:
+    """
+    Encode an interest list as a bitmask over INTEREST_VOCABULARY
+
+    Args:
+        interests: The user's interests
+
+    Returns:
+        The bitmask (0 for no interests), or None when the list has an interest
+        outside the vocabulary or a duplicate, in which case the mask would not
+        reproduce the list's Jaccard similarity and callers compare the lists
+    """
+    mask = 0
+    for interest in interests or []:
+        bit = INTEREST_BITS.get(interest)
+        if bit is None or mask & bit:
+            return None
+        mask |= bit
+    return mask
+
+
+def mask_interests(mask: int) -> List[str]:
+    """Decode a bitmask into interest names, in vocabulary order"""
+    return [name for name, bit in INTEREST_BITS.items() if mask & bit]
+
+
+def mask_jaccard(first: int, second: int) -> float:
+    """Jaccard similarity of two interest bitmasks"""
+    union = (first | second).bit_count()
+    return (first & second).bit_count() / union if union else 0.0
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """Number of set bits of every mask in an int64 array"""
+    masks = np.ascontiguousarray(masks, dtype=np.int64)
+    return _POPCOUNT_TABLE[masks.view(np.uint8)].reshape(len(masks), 8).sum(axis=1, dtype=np.int64)
+
+
+def mask_properties(interests: Optional[Iterable[str]]) -> Dict[str, Optional[int]]:
+    """
+    The `interest_mask` / `interest_count` properties stored next to a User's interests
+
+    Both are None (the properties are removed) when the interests have no mask.
+    """
+    mask = interest_mask(interests)
+    return {
+        "interest_mask": mask,
+        "interest_count": mask.bit_count() if mask is not None else None,
+    }
+
+
+def cypher_bits_literal() -> str:
+    """The vocabulary as a Cypher map literal of name -> bit value, for migrations"""
+    return "{" + ", ".join(f"`{name}`: {bit}" for name, bit in INTEREST_BITS.items()) + "}"
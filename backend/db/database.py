@@ -1,6 +1,8 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase, Query
 from ..core.config import get_settings
-from typing import Any, List, Dict
+from ..core.interest_bitmask import cypher_bits_literal
+from typing import Any, List, Dict, Optional, Set
+import asyncio
 import os
 import json
 import random
@@ -10,17 +12,94 @@ import requests
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Versioned schema steps: (version, description, idempotent statements).
+# Append new steps with the next version number; never edit an applied one.
+SCHEMA_MIGRATIONS = [
+    (1, "Unique user email and username", [
+        "CREATE CONSTRAINT user_email IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
+        "CREATE CONSTRAINT user_username IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE",
+    ]),
+    (2, "Unique ids for hot lookups and range indexes for matching filters", [
+        "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+        "CREATE CONSTRAINT rawblob_id IF NOT EXISTS FOR (r:RawBlob) REQUIRE r.id IS UNIQUE",
+        "CREATE CONSTRAINT topic_name IF NOT EXISTS FOR (t:Topic) REQUIRE t.name IS UNIQUE",
+        "CREATE RANGE INDEX user_gender IF NOT EXISTS FOR (u:User) ON (u.gender)",
+        "CREATE RANGE INDEX user_is_active IF NOT EXISTS FOR (u:User) ON (u.is_active)",
+        "CREATE RANGE INDEX user_age IF NOT EXISTS FOR (u:User) ON (u.age)",
+        "CREATE RANGE INDEX user_active_gender_age IF NOT EXISTS FOR (u:User) ON (u.is_active, u.gender, u.age)",
+    ]),
+    (3, "Unique per-user feature records", [
+        "CREATE CONSTRAINT userfeatures_user_id IF NOT EXISTS FOR (f:UserFeatures) REQUIRE f.user_id IS UNIQUE",
+    ]),
+    (4, "User locations as WGS-84 points with a point index for radius queries", [
+        "CREATE POINT INDEX user_location_point IF NOT EXISTS FOR (u:User) ON (u.location_point)",
+        """
+        MATCH (u:User)
+        WHERE u.location_point IS NULL AND u.latitude IS NOT NULL AND u.longitude IS NOT NULL
+          AND abs(toFloat(u.latitude)) <= 90 AND abs(toFloat(u.longitude)) <= 180
+        CALL {
+            WITH u
+            SET u.location_point = point({latitude: toFloat(u.latitude), longitude: toFloat(u.longitude)})
+        } IN TRANSACTIONS OF 10000 ROWS
+        """,
+    ]),
+    (5, "Denormalized birth_year/age with indexes for the preference filter", [
+        "CREATE RANGE INDEX user_birth_year IF NOT EXISTS FOR (u:User) ON (u.birth_year)",
+        "CREATE RANGE INDEX user_active_gender_birth_year IF NOT EXISTS FOR (u:User) ON (u.is_active, u.gender, u.birth_year)",
+        # toString covers birth dates stored as ISO strings, dates and datetimes alike
+        """
+        MATCH (u:User)
+        WHERE u.birth_year IS NULL AND u.birth_date IS NOT NULL
+        CALL {
+            WITH u
+            WITH u, date(left(toString(u.birth_date), 10)) AS birth_date
+            SET u.birth_year = birth_date.year,
+                u.age = duration.inMonths(birth_date, date()).years
+        } IN TRANSACTIONS OF 10000 ROWS
+        """,
+    ]),
+    (6, "Interest bitmasks over the closed interest vocabulary", [
+        # Distinct powers of two add up to their bitwise OR. Lists with an
+        # interest outside the vocabulary or a duplicate keep no mask
+        """
+        MATCH (u:User)
+        WHERE u.interest_mask IS NULL AND u.interests IS NOT NULL
+        CALL {
+            WITH u
+            WITH u, """ + cypher_bits_literal() + """ AS vocabulary
+            WITH u, [interest IN u.interests | vocabulary[interest]] AS bits
+            WHERE none(bit IN bits WHERE bit IS NULL)
+              AND all(i IN range(0, size(bits) - 1) WHERE NOT bits[i] IN bits[0..i])
+            SET u.interest_mask = reduce(mask = 0, bit IN bits | mask + bit),
+                u.interest_count = size(bits)
+        } IN TRANSACTIONS OF 10000 ROWS
+        """,
+    ]),
+]
+
 class Neo4jDatabase:
     def __init__(self):
         self._driver = None
+        # One async driver per event loop; drivers of finished loops are closed on the next connect
+        self._async_drivers: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._closing: Set[asyncio.Task] = set()
         self._superadmin_mode = os.getenv("SUPERADMIN_MODE", "False").lower() == "true"
 
+    def _pool_config(self) -> Dict[str, Any]:
+        """Connection pool settings shared by the sync and async drivers"""
+        return {
+            "max_connection_pool_size": settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+            "connection_acquisition_timeout": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+            "max_connection_lifetime": settings.NEO4J_MAX_CONNECTION_LIFETIME,
+        }
+
     def connect(self):
         if not self._driver:
             try:
                 self._driver = GraphDatabase.driver(
                     settings.NEO4J_URI,
-                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                    **self._pool_config()
                 )
             except Exception as e:
                 if self._superadmin_mode:
@@ -29,19 +108,103 @@ class Neo4jDatabase:
                     raise
         return self._driver
 
+    def connect_async(self):
+        """
+        Return the async driver bound to the running event loop.
+
+        The async driver's connections belong to the loop that created them, so
+        scripts that call asyncio.run() more than once get a fresh driver per loop.
+        The drivers of loops that have finished are closed in the background so
+        their pools do not leak.
+        """
+        loop = asyncio.get_running_loop()
+        driver = self._async_drivers.get(loop)
+        if driver is None:
+            for finished in [other for other in self._async_drivers if other.is_closed()]:
+                task = loop.create_task(self._close_driver(self._async_drivers.pop(finished)))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            driver = AsyncGraphDatabase.driver(
+                settings.NEO4J_URI,
+                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                **self._pool_config()
+            )
+            self._async_drivers[loop] = driver
+        return driver
+
+    async def _close_driver(self, driver) -> None:
+        try:
+            await driver.close()
+        except Exception as e:
+            logger.warning(f"Error closing a Neo4j async driver: {str(e)}")
+
     def close(self):
         if self._driver:
             self._driver.close()
             self._driver = None
 
-    def execute_query(self, query: str, parameters: dict = None) -> list[dict[str, Any]]:
+    async def close_async(self):
+        """Close every async driver: in its own loop when that loop still runs, here otherwise"""
+        loop = asyncio.get_running_loop()
+        drivers, self._async_drivers = self._async_drivers, {}
+        for driver_loop, driver in drivers.items():
+            if driver_loop is loop or driver_loop.is_closed() or not driver_loop.is_running():
+                await self._close_driver(driver)
+            else:
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_driver(driver), driver_loop))
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+    async def execute_query_async(
+        self,
+        query: str,
+        parameters: dict = None,
+        timeout: Optional[float] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Run a Cypher query on a pooled async session without blocking the event loop
+
+        Args:
+            query: Cypher query text
+            parameters: Query parameters
+            timeout: Per-call deadline in seconds (defaults to NEO4J_QUERY_TIMEOUT).
+                     Applied both as the server-side transaction timeout and as a
+                     client-side deadline covering connection acquisition.
+
+        Returns:
+            List of records as dictionaries
+        """
+        timeout = settings.NEO4J_QUERY_TIMEOUT if timeout is None else timeout
+
+        async def _run() -> list[dict[str, Any]]:
+            async with self.connect_async().session(database="neo4j") as session:
+                result = await session.run(Query(query, timeout=timeout), parameters or {})
+                return [dict(record) async for record in result]
+
+        try:
+            return await asyncio.wait_for(_run(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Database query exceeded {timeout}s deadline: {query[:100]}")
+            raise
+        except Exception as e:
+            logger.error(f"Database query error: {str(e)}")
+            raise
+
+    def execute_query(self, query: str, parameters: dict = None, timeout: Optional[float] = None) -> list[dict[str, Any]]:
+        """
+        Synchronous compatibility shim for scripts and non-async call sites.
+
+        Uses the same pool limits and query timeout as execute_query_async; code
+        running inside an event loop should await execute_query_async instead.
+        """
         # In superadmin mode, return mock data instead of executing real queries
         # if self._superadmin_mode:
         #     return self._mock_query_response(query, parameters or {})
         
+        timeout = settings.NEO4J_QUERY_TIMEOUT if timeout is None else timeout
         try:
             with self.connect().session(database="neo4j") as session:
-                result = session.run(query, parameters or {})
+                result = session.run(Query(query, timeout=timeout), parameters or {})
                 return [dict(record) for record in result]
         except Exception as e:
             logger.error(f"Database query error: {str(e)}")
@@ -135,28 +298,78 @@ class Neo4jDatabase:
         return result
 
 
-    def create_constraints(self):
-        """Create necessary constraints for the database"""
+    def create_constraints(self) -> List[Dict[str, Any]]:
+        """
+        Bring the database schema up to date and report the indexes that exist
+
+        Returns:
+            List of indexes as reported by SHOW INDEXES (empty in superadmin mode)
+        """
         if self._superadmin_mode:
             logger.info("Skipping constraint creation in superadmin mode")
-            return
+            return []
             
-        constraints = [
-            "CREATE CONSTRAINT user_email IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
-            "CREATE CONSTRAINT user_username IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE"
-        ]
-        
         try:
-            with self.connect().session(database="neo4j") as session:
-                for constraint in constraints:
-                    try:
-                        session.run(constraint)
-                    except Exception as e:
-                        print(f"Error creating constraint: {e}")
+            self.migrate_schema()
+            return self.get_index_report()
         except Exception as e:
             logger.error(f"Could not create constraints: {str(e)}")
-            if self._superadmin_mode:
-                logger.info("Continuing in superadmin mode despite constraint error")
+            return []
+
+    def migrate_schema(self) -> int:
+        """
+        Apply every SCHEMA_MIGRATIONS step newer than the version recorded in Neo4j.
+
+        Each step only uses IF NOT EXISTS statements or backfills guarded by a
+        WHERE clause, so re-running a step is harmless; a step's version is
+        recorded on a (:SchemaMigration) node only after all of its statements
+        succeeded, so a failed step is retried on the next startup.
+
+        Returns:
+            The schema version the database is at after migrating
+        """
+        with self.connect().session(database="neo4j") as session:
+            record = session.run(
+                "MATCH (m:SchemaMigration) RETURN coalesce(max(m.version), 0) AS version"
+            ).single()
+            current_version = record["version"] if record else 0
+
+            for version, description, statements in SCHEMA_MIGRATIONS:
+                if version <= current_version:
+                    continue
+                logger.info(f"Applying schema migration {version}: {description}")
+                for statement in statements:
+                    session.run(statement).consume()
+                session.run(
+                    """
+                    MERGE (m:SchemaMigration {version: $version})
+                    SET m.description = $description, m.applied_at = datetime()
+                    """,
+                    {"version": version, "description": description}
+                ).consume()
+                current_version = version
+
+        logger.info(f"Database schema is at version {current_version}")
+        return current_version
+
+    def get_index_report(self) -> List[Dict[str, Any]]:
+        """Log and return the indexes (including constraint-backed ones) that exist"""
+        indexes = self.execute_query(
+            """
+            SHOW INDEXES
+            YIELD name, type, entityType, labelsOrTypes, properties, state, owningConstraint
+            RETURN name, type, entityType, labelsOrTypes, properties, state, owningConstraint
+            ORDER BY name
+            """
+        )
+        for index in indexes:
+            labels = ",".join(index["labelsOrTypes"] or [])
+            properties = ",".join(index["properties"] or [])
+            logger.info(
+                f"Index {index['name']}: {index['type']} on :{labels}({properties}) "
+                f"[{index['state']}{', constraint' if index['owningConstraint'] else ''}]"
+            )
+        return indexes
                 
     def _fetch_random_users(self, count: int) -> List[Dict[str, Any]]:
         """
@@ -6,6 +6,9 @@ import requests
 from datetime import datetime
 import time
 
+from ..services.analysis_cache import analysis_cache
+from ..core.interest_bitmask import ALL_INTERESTS, INTEREST_BITS, interest_mask, mask_properties
+
 # Setup detailed logging
 logger = logging.getLogger(__name__)
 handler = logging.StreamHandler()
@@ -17,18 +20,6 @@ logger.setLevel(logging.INFO)
 # RandomUser API URL
 RANDOM_USER_API = "https://randomuser.me/api/"
 
-# Comprehensive user interests
-ALL_INTERESTS = [
-    "Travel", "Photography", "Cooking", "Fitness", "Reading", 
-    "Art", "Music", "Movies", "Gaming", "Technology", 
-    "Fashion", "Hiking", "Yoga", "Dancing", "Writing",
-    "Swimming", "Running", "Cycling", "Skiing", "Climbing",
-    "Food", "Coffee", "Wine", "Beer", "Cocktails",
-    "Science", "History", "Philosophy", "Politics", "Economics",
-    "Meditation", "Spirituality", "Volunteering", "Animals", "Nature",
-    "Cars", "Motorcycles", "DIY", "Gardening", "Painting"
-]
-
 # Personality traits for enriched user profiles
 PERSONALITY_TRAITS = ["openness", "conscientiousness", "extroversion", "agreeableness", "neuroticism"]
 
@@ -99,7 +90,7 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
     """
     from ..db.database import db
     
-    existing = db.execute_query("MATCH (u:User) RETURN u.email AS email, u.username AS username")
+    existing = await db.execute_query_async("MATCH (u:User) RETURN u.email AS email, u.username AS username")
     existing_emails    = {r["email"]    for r in existing if r.get("email")}
     existing_usernames = {r["username"] for r in existing if r.get("username")}
     start_time = time.time()
@@ -109,6 +100,10 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
         
         # Import database module here to avoid circular imports
         from ..db.database import db
+        from ..services.interest_index import interest_index
+        from ..services.minhash_index import minhash_index
+        from ..services.feature_store import feature_store
+        from ..services.geo_index import geo_index
         # Enhanced Cypher query for user batch creation with more attributes
         query = """
         UNWIND $users as user
@@ -120,14 +115,21 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
             u.gender = user.gender,
             u.birth_date = user.birth_date,
             u.age = user.age,
+            u.birth_year = user.birth_year,
             u.location = user.location,
             u.city = user.city,
             u.country = user.country,
             u.latitude = user.latitude,
             u.longitude = user.longitude,
+            u.location_point = CASE
+                WHEN abs(toFloat(user.latitude)) <= 90 AND abs(toFloat(user.longitude)) <= 180
+                THEN point({latitude: toFloat(user.latitude), longitude: toFloat(user.longitude)})
+            END,
             u.profile_photo = user.profile_photo,
             u.thumbnail_photo = user.thumbnail_photo,
             u.interests = user.interests,
+            u.interest_mask = user.interest_mask,
+            u.interest_count = user.interest_count,
             u.bio = user.bio,
             u.phone = user.phone,
             u.cell = user.cell,
@@ -182,6 +184,7 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
                         "gender": user["gender"],
                         "birth_date": birth_date,
                         "age": age,
+                        "birth_year": int(birth_date[:4]),
                         "location": f"{user['location']['city']}, {user['location']['country']}",
                         "city": user['location']['city'],
                         "country": user['location']['country'],
@@ -198,6 +201,9 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
                         "bio": f"Hi, I'm {user['name']['first']}! I'm from {user['location']['city']} and enjoy meeting new people."
                     }
                     
+                    # Interests as a bitmask over the interest vocabulary
+                    user_data.update(mask_properties(user_data["interests"]))
+                    
                     # Get personality traits
                     personality = generate_personality_traits()
                     
@@ -244,7 +250,12 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
                 if user_batch:
                     logger.debug(f"Sample user data being sent to Neo4j: {user_batch[0]}")
                     
-                db.execute_query(query, {"users": user_batch})
+                await db.execute_query_async(query, {"users": user_batch})
+                for stored_user in user_batch:
+                    interest_index.update_user(stored_user["id"], stored_user["interests"])
+                    minhash_index.update_user(stored_user["id"], interests=stored_user["interests"])
+                    geo_index.update_user(stored_user["id"], stored_user["latitude"], stored_user["longitude"])
+                await feature_store.refresh_users([stored_user["id"] for stored_user in user_batch])
                 success_count += len(user_batch)
                 logger.info(f"Batch {batch_num} stored successfully. Progress: {success_count}/{len(users)} users")
             except Exception as e:
@@ -269,7 +280,7 @@ async def store_random_users_in_neo4j(users: List[Dict[str, Any]]) -> bool:
                 WHERE u1 <> u2 AND rand() < 0.01  // 1% chance for any two users to be connected
                 MERGE (u1)-[:KNOWS]->(u2)
                 """
-                db.execute_query(friendship_query)
+                await db.execute_query_async(friendship_query)
                 logger.info("Initial relationships created successfully")
             except Exception as e:
                 logger.warning(f"Error creating initial relationships: {str(e)}")
@@ -296,7 +307,7 @@ async def populate_database_with_random_users(count: int = 1000) -> bool:
     try:
         from ..db.database import db
         user_count_query = "MATCH (u:User) RETURN count(u) as count"
-        result = db.execute_query(user_count_query)
+        result = await db.execute_query_async(user_count_query)
         existing_count = result[0]["count"] if result else 0
         
         if existing_count > 20000:
@@ -353,13 +364,20 @@ async def store_social_raw_data(user_id: str, source: str, data: Dict[str, Any])
         """
         
         blob_id = f"{user_id}_{source}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        db.execute_query(query, {
+        await db.execute_query_async(query, {
             "user_id": user_id,
             "source": source,
             "json_data": json_data,
             "blob_id": blob_id
         })
         
+        # The memoized analysis of the user's previous raw data is stale now
+        analysis_cache.invalidate_user(user_id)
+        
+        # Re-materialize the user's matching features from the new raw data
+        from ..services.feature_store import feature_store
+        await feature_store.refresh_user(user_id)
+        
         logger.info(f"Successfully stored raw data for user {user_id} from source {source}")
         return True
     except Exception as e:
@@ -379,7 +397,7 @@ async def get_user_raw_interests(user_id: str) -> Dict[str, Any]:
         RETURN b.data as data, r.source as source
         """
         
-        result = db.execute_query(query, {"user_id": user_id})
+        result = await db.execute_query_async(query, {"user_id": user_id})
         
         if not result:
             logger.info(f"No raw interest data found for user {user_id}, returning mock data")
@@ -397,6 +415,49 @@ async def get_user_raw_interests(user_id: str) -> Dict[str, Any]:
         logger.error(f"Error retrieving raw interests: {str(e)}")
         return get_mock_raw_interests()
 
+async def get_raw_interests_for_users(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieve raw social media data for many users in a single round-trip
+
+    Args:
+        user_ids: IDs of the users to fetch RawBlob data for
+
+    Returns:
+        Dictionary mapping each user ID to its data organized by source
+        (users without any RawBlob get mock data, as in get_user_raw_interests)
+    """
+    if not user_ids:
+        return {}
+
+    try:
+        # Import database module here to avoid circular imports
+        from ..db.database import db
+
+        query = """
+        UNWIND $user_ids AS user_id
+        MATCH (u:User {id: user_id})-[r:RAW_INTEREST]->(b:RawBlob)
+        RETURN user_id, b.data as data, r.source as source
+        """
+
+        result = await db.execute_query_async(query, {"user_ids": list(user_ids)})
+
+        # Organize results by user, then by source
+        interests_by_user: Dict[str, Dict[str, Any]] = {}
+        for record in result:
+            user_interests = interests_by_user.setdefault(record["user_id"], {})
+            user_interests[record["source"]] = json.loads(record["data"])
+
+        missing = [user_id for user_id in user_ids if user_id not in interests_by_user]
+        if missing:
+            logger.info(f"No raw interest data found for {len(missing)} users, using mock data")
+            for user_id in missing:
+                interests_by_user[user_id] = get_mock_raw_interests()
+
+        return interests_by_user
+    except Exception as e:
+        logger.error(f"Error retrieving raw interests in bulk: {str(e)}")
+        return {user_id: get_mock_raw_interests() for user_id in user_ids}
+
 def get_mock_raw_interests() -> Dict[str, Any]:
     """Return mock social media interests data"""
     return {
@@ -447,12 +508,16 @@ async def store_user_topics(user_id: str, topics: Dict[str, float]) -> bool:
             ON MATCH SET r.score = $score, r.updated_at = datetime()
             """
             
-            db.execute_query(query, {
+            await db.execute_query_async(query, {
                 "user_id": user_id,
                 "topic_name": topic_name,
                 "score": score
             })
         
+        # Import here to avoid circular imports
+        from ..services.minhash_index import minhash_index
+        minhash_index.update_user(user_id, topics=list(topics))
+        
         logger.info(f"Successfully stored topics for user {user_id}")
         return True
     except Exception as e:
@@ -473,7 +538,7 @@ async def get_user_topics(user_id: str) -> Dict[str, float]:
         ORDER BY r.score DESC
         """
         
-        result = db.execute_query(query, {"user_id": user_id})
+        result = await db.execute_query_async(query, {"user_id": user_id})
         
         if not result:
             logger.info(f"No topics found for user {user_id}, returning generated topics")
@@ -543,7 +608,7 @@ async def get_recommendations_for_user(user_id: str, limit: int = 10) -> List[Di
         RETURN u
         """
         
-        user_result = db.execute_query(user_query, {"user_id": user_id})
+        user_result = await db.execute_query_async(user_query, {"user_id": user_id})
         
         # If user doesn't exist in database, fall back to RandomUser API
         if not user_result:
@@ -553,14 +618,42 @@ async def get_recommendations_for_user(user_id: str, limit: int = 10) -> List[Di
         # Get the user's data
         user_data = user_result[0]["u"]
         
+        # Once the MinHash index is in use, only its approximate Jaccard
+        # neighbours are scored instead of every user
+        from ..services.minhash_index import minhash_index
+        params = {"user_id": user_id, "limit": limit}
+        candidate_filter = ""
+        if minhash_index.is_loaded and user_id in minhash_index:
+            neighbours = minhash_index.top_k(user_id, k=limit * 10)
+            if neighbours:
+                candidate_filter = "AND other.id IN $candidate_ids"
+                params["candidate_ids"] = [neighbour["id"] for neighbour in neighbours]
+        
+        # With both interest masks stored, the overlap is counted on the user's
+        # bits (Cypher has no bitwise AND: bit b of a mask is (mask / b) % 2)
+        mask = interest_mask(user_data.get("interests"))
+        params["interest_bits"] = None if mask is None else [bit for bit in INTEREST_BITS.values() if mask & bit]
+        params["interest_count"] = None if mask is None else mask.bit_count()
+        
         # Advanced Neo4j query to find compatible matches based on multiple factors
-        match_query = """
-        MATCH (u:User {id: $user_id}), (other:User)
+        match_query = f"""
+        MATCH (u:User {{id: $user_id}}), (other:User)
         WHERE other.id <> $user_id
+        {candidate_filter}
+        WITH u, other,
+             CASE
+                WHEN $interest_bits IS NOT NULL AND other.interest_mask IS NOT NULL
+                THEN [size([bit IN $interest_bits WHERE other.interest_mask / bit % 2 = 1]),
+                      $interest_count + other.interest_count]
+                ELSE [size([x IN u.interests WHERE x IN other.interests]),
+                      size(coalesce(u.interests, [])) + size(coalesce(other.interests, []))]
+             END AS overlap
         WITH u, other,
-             // Calculate interest similarity (Jaccard coefficient)
-             size([x IN u.interests WHERE x IN other.interests]) / 
-             size(u.interests + [x IN other.interests WHERE NOT x IN u.interests]) AS interest_similarity,
+             // Calculate interest similarity (Jaccard coefficient: shared / (total - shared))
+             CASE
+                WHEN overlap[1] - overlap[0] > 0 THEN toFloat(overlap[0]) / (overlap[1] - overlap[0])
+                ELSE 0.0
+             END AS interest_similarity,
              // Age compatibility (based on typical dating range)
              CASE 
                 WHEN abs(u.age - other.age) <= 5 THEN 1.0
@@ -577,15 +670,15 @@ async def get_recommendations_for_user(user_id: str, limit: int = 10) -> List[Di
         ORDER BY match_score DESC
         LIMIT $limit
         
-        RETURN other {
+        RETURN other {{
             .id, .email, .username, .full_name, .gender, .birth_date, .age,
             .location, .city, .country, .profile_photo, .interests, .bio
-        } as user_data,
+        }} as user_data,
         match_score,
         [x IN other.interests WHERE x IN u.interests] AS common_interests
         """
         
-        match_result = db.execute_query(match_query, {"user_id": user_id, "limit": limit})
+        match_result = await db.execute_query_async(match_query, params)
         
         # If no matches found in database, fall back to RandomUser API
         if not match_result:
@@ -10,9 +10,33 @@ import logging
 # Import our ML service for initialization
 from .ml.matching_service import matching_service
 from .services.ml_integration import ml_service
+from .services.interest_index import interest_index
+from .services.minhash_index import minhash_index
+from .services.user_snapshot import user_snapshot
+from .services.feature_store import feature_store
+from .services.ml_executor import ml_executor
+from .services.activity_counters import activity_counters
 
 settings = get_settings()
 
+# The event loop only keeps weak references to tasks: hold the startup ones until they finish
+background_tasks = set()
+
+
+def _on_background_done(task: asyncio.Task) -> None:
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.getLogger("uvicorn").error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+
+def start_background(coro, name: str) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference and logging its failure"""
+    task = asyncio.create_task(coro, name=name)
+    background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json"
@@ -39,19 +63,42 @@ async def startup_event():
     # Set up logging for the app
     logger = logging.getLogger("uvicorn")
     
-    # Create database constraints
+    # Apply schema migrations (constraints and indexes) and report indexes
     try:
-        db.create_constraints()
-        logger.info("Database constraints created successfully")
+        indexes = db.create_constraints()
+        logger.info(f"Database schema ready with {len(indexes)} indexes")
     except Exception as e:
         logger.error(f"Failed to create database constraints: {str(e)}")
     
+    # Build the in-process interest index used for recommendations
+    try:
+        indexed = await interest_index.load()
+        logger.info(f"Interest index built for {indexed} users")
+        
+        # Past MINHASH_MIN_USERS users recommendations use approximate neighbours
+        if indexed >= settings.MINHASH_MIN_USERS:
+            start_background(minhash_index.load(), "minhash_index.load")
+    except Exception as e:
+        logger.error(f"Failed to build interest index: {str(e)}")
+    
+    # Materialize feature records for users created before the feature store existed
+    start_background(feature_store.backfill(), "feature_store.backfill")
+    
+    # Columnar snapshot of every user; matching retrieves from it once loaded
+    user_snapshot.reload()
+    
+    # Backfill the activity counters and keep correcting their drift
+    start_background(
+        activity_counters.reconcile_periodically(settings.ACTIVITY_RECONCILE_INTERVAL_SECONDS),
+        "activity_counters.reconcile_periodically",
+    )
+    
     # Populate the database with random users if enabled
     if settings.POPULATE_DB_ON_STARTUP:
         try:
             # Check if database already has users
             query = "MATCH (u:User) RETURN count(u) as user_count"
-            result = db.execute_query(query)
+            result = await db.execute_query_async(query)
             existing_users = result[0]["user_count"] if result else 0
             
             if existing_users > 20000:
@@ -59,7 +106,10 @@ async def startup_event():
             else:
                 logger.info(f"Populating database with {settings.RANDOM_USER_COUNT} random users...")
                 # Starting population process in the background
-                asyncio.create_task(populate_database_with_random_users(settings.RANDOM_USER_COUNT))
+                start_background(
+                    populate_database_with_random_users(settings.RANDOM_USER_COUNT),
+                    "populate_database_with_random_users",
+                )
                 logger.info("User population task started in the background")
         except Exception as e:
             logger.error(f"Failed to initiate database population: {str(e)}")
@@ -86,8 +136,12 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    # Close database connection
+    for task in list(background_tasks):
+        task.cancel()
+    # Close database connections
     db.close()
+    await db.close_async()
+    ml_executor.shutdown()
 
 @app.get("/")
 async def root():
@@ -4,6 +4,8 @@ import re
 import random
 from collections import Counter
 import nltk
+from .keyword_matcher import KeywordHits, KeywordMatcher
+from .text_analysis import AnalysisContext, iter_alpha_tokens
 try:
     nltk.data.find('tokenizers/punkt')
 except LookupError:
@@ -43,9 +45,39 @@ class UserMetadataAnalyzer:
         "Sports": ["sports", "football", "soccer", "basketball", "baseball", "tennis", "athlete"]
     }
     
+    # Keywords counted towards each Big Five trait, with the score added per occurrence
+    TRAIT_KEYWORDS = {
+        # Openness: Creative language, unique words, arts/culture references
+        "openness": (["art", "music", "creative", "explore", "idea", "culture", "book", "film"], 0.02),
+        # Conscientiousness: Organization, planning, achievement words
+        "conscientiousness": (["plan", "schedule", "complete", "finish", "goal", "success", "achieve", "organize"], 0.03),
+        # Extroversion: Social words, excitement, activity
+        "extroversion": (["friend", "party", "social", "fun", "together", "event", "group", "excited"], 0.025),
+        # Agreeableness: Cooperative words, empathy, positive emotion
+        "agreeableness": (["thank", "appreciate", "help", "kind", "happy", "love", "care", "support"], 0.03),
+        # Neuroticism: Worry words, negative emotion, stress
+        "neuroticism": (["worry", "stress", "anxious", "afraid", "sad", "upset", "nervous", "fear"], 0.04)
+    }
+    
+    # Keywords related to relationship preferences
+    RELATIONSHIP_KEYWORDS = {
+        "Long-term": ["relationship", "long-term", "committed", "serious", "future", "partner"],
+        "Casual dating": ["casual", "dating", "fun", "meet", "spontaneous"],
+        "Friendship first": ["friend", "friendship", "connection", "get to know", "slow"],
+        "Adventure buddies": ["adventure", "travel", "explore", "activities", "outdoors"],
+        "Intellectual connection": ["intellectual", "conversation", "deep", "meaningful", "talk"]
+    }
+    
     def __init__(self):
         """Initialize the UserMetadataAnalyzer"""
-        pass
+        # Compile every keyword table once into a single matcher
+        keywords = []
+        for table in (self.INTEREST_KEYWORDS, self.RELATIONSHIP_KEYWORDS):
+            for words in table.values():
+                keywords.extend(words)
+        for words, _ in self.TRAIT_KEYWORDS.values():
+            keywords.extend(words)
+        self.keyword_matcher = KeywordMatcher(keywords)
     
     def analyze_user_raw_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -69,21 +101,24 @@ class UserMetadataAnalyzer:
             "relationship_preferences": []
         }
         
+        # Each source's text is joined, scanned and tokenized once and shared by every stage
+        context = AnalysisContext(self.keyword_matcher, self.STOP_WORDS)
+        
         # Process data from different sources
         try:
             # Process Twitter data if available
             if "twitter" in raw_data and "tweets" in raw_data["twitter"]:
-                twitter_features = self._analyze_twitter_data(raw_data["twitter"])
+                twitter_features = self._analyze_twitter_data(raw_data["twitter"], context)
                 self._merge_features(extracted_features, twitter_features)
                 
             # Process Instagram data if available
             if "instagram" in raw_data and "media" in raw_data["instagram"]:
-                instagram_features = self._analyze_instagram_data(raw_data["instagram"])
+                instagram_features = self._analyze_instagram_data(raw_data["instagram"], context)
                 self._merge_features(extracted_features, instagram_features)
                 
             # Process Facebook data if available
             if "facebook" in raw_data and "posts" in raw_data["facebook"]:
-                facebook_features = self._analyze_facebook_data(raw_data["facebook"])
+                facebook_features = self._analyze_facebook_data(raw_data["facebook"], context)
                 self._merge_features(extracted_features, facebook_features)
                 
             # Generate personality traits if not enough data
@@ -91,7 +126,7 @@ class UserMetadataAnalyzer:
                 extracted_features["personality_traits"] = self._generate_personality_traits()
                 
             # Extract relationship preferences
-            extracted_features["relationship_preferences"] = self._extract_relationship_preferences(raw_data)
+            extracted_features["relationship_preferences"] = self._extract_relationship_preferences(raw_data, context)
             
             logger.info(f"Extracted {len(extracted_features['interests'])} interests and {len(extracted_features['topics'])} topics")
             
@@ -101,12 +136,13 @@ class UserMetadataAnalyzer:
             # Generate default features in case of error
             return self._generate_default_features()
             
-    def _analyze_twitter_data(self, twitter_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_twitter_data(self, twitter_data: Dict[str, Any], context: Optional[AnalysisContext] = None) -> Dict[str, Any]:
         """
         Analyze Twitter data to extract features
         
         Args:
             twitter_data: Dictionary containing Twitter data
+            context: Analysis context the Twitter document is added to
             
         Returns:
             Dictionary of extracted features from Twitter
@@ -128,16 +164,19 @@ class UserMetadataAnalyzer:
                 return features
                 
             # Analyze tweet content
-            all_text = " ".join(tweet_texts).lower()
+            if context is None:
+                context = AnalysisContext(self.keyword_matcher, self.STOP_WORDS)
+            document = context.add_document("twitter", tweet_texts)
+            all_text = document.text
             
             # Extract interests from text
-            features["interests"] = self._extract_interests_from_text(all_text)
+            features["interests"] = self._extract_interests_from_text(all_text, document.keyword_hits)
             
             # Analyze topics and their frequencies
-            features["topics"] = self._extract_topics_from_text(all_text)
+            features["topics"] = self._extract_topics_from_text(all_text, document.token_counts)
             
             # Estimate personality traits from tweet style
-            features["personality_traits"] = self._estimate_personality_from_text(all_text)
+            features["personality_traits"] = self._estimate_personality_from_text(all_text, document.keyword_hits)
             
             # Activity level based on tweet frequency
             features["activity_level"] = min(1.0, len(tweets) / 20.0)  # Scale up to 1.0
@@ -160,12 +199,13 @@ class UserMetadataAnalyzer:
             logger.warning(f"Error analyzing Twitter data: {str(e)}")
             return features
     
-    def _analyze_instagram_data(self, instagram_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_instagram_data(self, instagram_data: Dict[str, Any], context: Optional[AnalysisContext] = None) -> Dict[str, Any]:
         """
         Analyze Instagram data to extract features
         
         Args:
             instagram_data: Dictionary containing Instagram data
+            context: Analysis context the Instagram document is added to
             
         Returns:
             Dictionary of extracted features from Instagram
@@ -187,16 +227,19 @@ class UserMetadataAnalyzer:
                 return features
                 
             # Analyze caption content
-            all_text = " ".join(captions).lower()
+            if context is None:
+                context = AnalysisContext(self.keyword_matcher, self.STOP_WORDS)
+            document = context.add_document("instagram", captions)
+            all_text = document.text
             
             # Extract interests from captions
-            features["interests"] = self._extract_interests_from_text(all_text)
+            features["interests"] = self._extract_interests_from_text(all_text, document.keyword_hits)
             
             # Analyze topics and their frequencies
-            features["topics"] = self._extract_topics_from_text(all_text)
+            features["topics"] = self._extract_topics_from_text(all_text, document.token_counts)
             
             # Estimate personality traits
-            features["personality_traits"] = self._estimate_personality_from_text(all_text)
+            features["personality_traits"] = self._estimate_personality_from_text(all_text, document.keyword_hits)
             
             # Activity level based on post frequency
             features["activity_level"] = min(1.0, len(media_items) / 15.0)  # Scale up to 1.0
@@ -217,12 +260,13 @@ class UserMetadataAnalyzer:
             logger.warning(f"Error analyzing Instagram data: {str(e)}")
             return features
     
-    def _analyze_facebook_data(self, facebook_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_facebook_data(self, facebook_data: Dict[str, Any], context: Optional[AnalysisContext] = None) -> Dict[str, Any]:
         """
         Analyze Facebook data to extract features
         
         Args:
             facebook_data: Dictionary containing Facebook data
+            context: Analysis context the Facebook document is added to
             
         Returns:
             Dictionary of extracted features from Facebook
@@ -244,16 +288,19 @@ class UserMetadataAnalyzer:
                 return features
                 
             # Analyze message content
-            all_text = " ".join(messages).lower()
+            if context is None:
+                context = AnalysisContext(self.keyword_matcher, self.STOP_WORDS)
+            document = context.add_document("facebook", messages)
+            all_text = document.text
             
             # Extract interests from messages
-            features["interests"] = self._extract_interests_from_text(all_text)
+            features["interests"] = self._extract_interests_from_text(all_text, document.keyword_hits)
             
             # Analyze topics and their frequencies
-            features["topics"] = self._extract_topics_from_text(all_text)
+            features["topics"] = self._extract_topics_from_text(all_text, document.token_counts)
             
             # Estimate personality traits
-            features["personality_traits"] = self._estimate_personality_from_text(all_text)
+            features["personality_traits"] = self._estimate_personality_from_text(all_text, document.keyword_hits)
             
             # Activity level based on post frequency
             features["activity_level"] = min(1.0, len(posts) / 10.0)  # Scale up to 1.0
@@ -273,43 +320,47 @@ class UserMetadataAnalyzer:
             logger.warning(f"Error analyzing Facebook data: {str(e)}")
             return features
     
-    def _extract_interests_from_text(self, text: str) -> List[str]:
+    def _extract_interests_from_text(self, text: str, keyword_hits: Optional[KeywordHits] = None) -> List[str]:
         """
         Extract interests from text using keyword matching
         
         Args:
             text: Text to analyze
+            keyword_hits: Keyword scan of the text, scanned here if not given
             
         Returns:
             List of identified interests
         """
+        if keyword_hits is None:
+            keyword_hits = self.keyword_matcher.scan(text)
         interests = []
         
-        # Check each interest category
+        # Check each interest category for a keyword as a whole word or hashtag
         for interest, keywords in self.INTEREST_KEYWORDS.items():
             for keyword in keywords:
-                if f" {keyword} " in f" {text} " or f"#{keyword}" in text:
+                if keyword_hits.is_word(keyword) or keyword_hits.is_hashtag(keyword):
                     interests.append(interest)
                     break  # Only add each interest once
         
         return list(set(interests))  # Remove duplicates
     
-    def _extract_topics_from_text(self, text: str) -> Dict[str, float]:
+    def _extract_topics_from_text(self, text: str, word_counts: Optional[Counter] = None) -> Dict[str, float]:
         """
         Extract topics and their relative importance from text
         
         Args:
             text: Text to analyze
+            word_counts: Counts of the text's alphabetic, non stop word tokens,
+                tokenized here if not given
             
         Returns:
             Dictionary mapping topics to their relative importance (0-1)
         """
-        # Tokenize and remove stop words
-        tokens = nltk.word_tokenize(text.lower())
-        tokens = [token for token in tokens if token.isalpha() and token not in self.STOP_WORDS]
-        
-        # Count word frequencies
-        word_counts = Counter(tokens)
+        # Tokenize, remove stop words and count word frequencies
+        if word_counts is None:
+            word_counts = Counter(
+                token for token in iter_alpha_tokens(text.lower()) if token not in self.STOP_WORDS
+            )
         total_words = sum(word_counts.values())
         
         if total_words == 0:
@@ -332,13 +383,14 @@ class UserMetadataAnalyzer:
         # Return top topics
         return dict(sorted(topics.items(), key=lambda x: x[1], reverse=True)[:8])
     
-    def _estimate_personality_from_text(self, text: str) -> Dict[str, float]:
+    def _estimate_personality_from_text(self, text: str, keyword_hits: Optional[KeywordHits] = None) -> Dict[str, float]:
         """
         Estimate Big Five personality traits from text
         This is a simplified implementation - in a real app, this would use NLP and ML models
         
         Args:
             text: Text to analyze
+            keyword_hits: Keyword scan of the text, scanned here if not given
             
         Returns:
             Dictionary of Big Five personality traits with scores (0-1)
@@ -352,73 +404,35 @@ class UserMetadataAnalyzer:
             "neuroticism": 0.5
         }
         
-        # Simple heuristics for traits
-        # Openness: Creative language, unique words, arts/culture references
-        arts_keywords = ["art", "music", "creative", "explore", "idea", "culture", "book", "film"]
-        arts_count = sum(text.count(word) for word in arts_keywords)
-        traits["openness"] = min(0.9, 0.5 + arts_count * 0.02)
-        
-        # Conscientiousness: Organization, planning, achievement words
-        plan_keywords = ["plan", "schedule", "complete", "finish", "goal", "success", "achieve", "organize"]
-        plan_count = sum(text.count(word) for word in plan_keywords)
-        traits["conscientiousness"] = min(0.9, 0.5 + plan_count * 0.03)
-        
-        # Extroversion: Social words, excitement, activity
-        social_keywords = ["friend", "party", "social", "fun", "together", "event", "group", "excited"]
-        social_count = sum(text.count(word) for word in social_keywords)
-        traits["extroversion"] = min(0.9, 0.5 + social_count * 0.025)
-        
-        # Agreeableness: Cooperative words, empathy, positive emotion
-        agree_keywords = ["thank", "appreciate", "help", "kind", "happy", "love", "care", "support"]
-        agree_count = sum(text.count(word) for word in agree_keywords)
-        traits["agreeableness"] = min(0.9, 0.5 + agree_count * 0.03)
-        
-        # Neuroticism: Worry words, negative emotion, stress
-        worry_keywords = ["worry", "stress", "anxious", "afraid", "sad", "upset", "nervous", "fear"]
-        worry_count = sum(text.count(word) for word in worry_keywords)
-        traits["neuroticism"] = min(0.9, 0.5 + worry_count * 0.04)
+        # Simple heuristics for traits: each keyword occurrence raises the trait score
+        if keyword_hits is None:
+            keyword_hits = self.keyword_matcher.scan(text)
+        for trait, (keywords, weight) in self.TRAIT_KEYWORDS.items():
+            keyword_count = sum(keyword_hits.count(word) for word in keywords)
+            traits[trait] = min(0.9, 0.5 + keyword_count * weight)
         
         return traits
         
-    def _extract_relationship_preferences(self, raw_data: Dict[str, Any]) -> List[str]:
+    def _extract_relationship_preferences(self, raw_data: Dict[str, Any], context: Optional[AnalysisContext] = None) -> List[str]:
         """
         Extract relationship preferences from user data
         
         Args:
             raw_data: Dictionary of raw user data
+            context: Analysis context holding the already joined source documents,
+                built from raw_data if not given
             
         Returns:
             List of relationship preferences
         """
         preferences = []
         
-        # Combine all text for analysis
-        all_text = ""
+        if context is None:
+            context = self._build_context(raw_data)
         
-        if "twitter" in raw_data and "tweets" in raw_data["twitter"]:
-            all_text += " ".join([tweet.get("text", "") for tweet in raw_data["twitter"]["tweets"]])
-            
-        if "instagram" in raw_data and "media" in raw_data["instagram"] and "data" in raw_data["instagram"]["media"]:
-            all_text += " ".join([item.get("caption", "") for item in raw_data["instagram"]["media"]["data"]])
-            
-        if "facebook" in raw_data and "posts" in raw_data["facebook"] and "data" in raw_data["facebook"]["posts"]:
-            all_text += " ".join([post.get("message", "") for post in raw_data["facebook"]["posts"]["data"]])
-        
-        # Convert to lowercase
-        all_text = all_text.lower()
-        
-        # Check for relationship preference keywords
-        relationship_keywords = {
-            "Long-term": ["relationship", "long-term", "committed", "serious", "future", "partner"],
-            "Casual dating": ["casual", "dating", "fun", "meet", "spontaneous"],
-            "Friendship first": ["friend", "friendship", "connection", "get to know", "slow"],
-            "Adventure buddies": ["adventure", "travel", "explore", "activities", "outdoors"],
-            "Intellectual connection": ["intellectual", "conversation", "deep", "meaningful", "talk"]
-        }
-        
-        # Add preferences based on keyword frequency
-        for pref, keywords in relationship_keywords.items():
-            if any(keyword in all_text for keyword in keywords):
+        # Add preferences based on relationship preference keywords in any source
+        for pref, keywords in self.RELATIONSHIP_KEYWORDS.items():
+            if any(context.contains_keyword(keyword) for keyword in keywords):
                 preferences.append(pref)
         
         # If no preferences detected, add default ones
@@ -427,6 +441,31 @@ class UserMetadataAnalyzer:
             
         return preferences
     
+    def _build_context(self, raw_data: Dict[str, Any]) -> AnalysisContext:
+        """
+        Build an analysis context with one document per source of raw data
+        
+        Args:
+            raw_data: Dictionary of raw user data
+            
+        Returns:
+            AnalysisContext with the twitter, instagram and facebook documents
+        """
+        context = AnalysisContext(self.keyword_matcher, self.STOP_WORDS)
+        
+        if "twitter" in raw_data and "tweets" in raw_data["twitter"]:
+            context.add_document("twitter", [tweet.get("text", "") for tweet in raw_data["twitter"]["tweets"] if "text" in tweet])
+            
+        if "instagram" in raw_data and "media" in raw_data["instagram"]:
+            media_items = raw_data["instagram"].get("media", {}).get("data", [])
+            context.add_document("instagram", [item.get("caption", "") for item in media_items if "caption" in item])
+            
+        if "facebook" in raw_data and "posts" in raw_data["facebook"]:
+            posts = raw_data["facebook"].get("posts", {}).get("data", [])
+            context.add_document("facebook", [post.get("message", "") for post in posts if "message" in post])
+        
+        return context
+    
     def _merge_features(self, target: Dict[str, Any], source: Dict[str, Any]) -> None:
         """
         Merge source features into target features
@@ -0,0 +1,153 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..services.geo_index import haversine_km
+
+# Stages of MatchingService.get_matches_for_user, in order
+STAGES = ("retrieve", "filter", "shortlist", "score", "rerank")
+
+
+class _StageStats:
+    __slots__ = ("calls", "items_in", "items_out", "seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        calls = max(1, self.calls)
+        return {
+            "calls": self.calls,
+            "avg_in": round(self.items_in / calls, 1),
+            "avg_out": round(self.items_out / calls, 1),
+            "avg_ms": round(self.seconds / calls * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class PipelineStats:
+    """Per-stage call counts, candidate counts in and out, and timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {stage: _StageStats() for stage in STAGES}
+
+    @contextmanager
+    def stage(self, name: str, items_in: int) -> Iterator[Dict[str, int]]:
+        """
+        Time a stage; the caller sets result["out"] to the number of candidates it kept
+
+        Args:
+            name: One of STAGES
+            items_in: Number of candidates entering the stage
+        """
+        result = {"out": 0}
+        started = time.perf_counter()
+        try:
+            yield result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._stages[name]
+                stats.calls += 1
+                stats.items_in += items_in
+                stats.items_out += result["out"]
+                stats.seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stages.items()}
+
+
+def _jaccard(first: set, second: set) -> float:
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def shortlist(
+    user_interests: List[str],
+    origin: Optional[Tuple[float, float]],
+    radius_km: Optional[float],
+    candidates: List[Dict[str, Any]],
+    size: int,
+    interest_weight: float,
+    location_weight: float,
+) -> List[Dict[str, Any]]:
+    """
+    Keep the candidates worth a full compatibility score
+
+    Candidates are pre-ranked on the two components that need no analyzed
+    features, interest overlap and proximity, weighted like the full model.
+
+    Args:
+        user_interests: The searching user's interests
+        origin: The searching user's (latitude, longitude), if located
+        radius_km: Search radius the proximity is relative to (default 1000 km)
+        candidates: Retrieved candidates with "interests" and "coordinates"
+        size: Number of candidates to keep
+        interest_weight: Weight of the interest overlap
+        location_weight: Weight of the proximity
+
+    Returns:
+        The best `size` candidates, best first (retrieval order on ties)
+    """
+    mine = set(user_interests or [])
+    scale = radius_km or 1000.0
+
+    def cheap_score(position: int) -> Tuple[float, int]:
+        candidate = candidates[position]
+        score = interest_weight * _jaccard(mine, set(candidate.get("interests") or []))
+        coordinates = candidate.get("coordinates")
+        if origin is not None and coordinates is not None:
+            proximity = 1.0 - haversine_km(*origin, *coordinates) / scale
+            score += location_weight * max(0.0, proximity)
+        return score, -position
+
+    best = heapq.nlargest(size, range(len(candidates)), key=cheap_score)
+    return [candidates[position] for position in best]
+
+
+def diversity_rerank(
+    scored: List[Dict[str, Any]],
+    interests: List[List[str]],
+    limit: int,
+    diversity: float,
+) -> List[int]:
+    """
+    Reorder fully scored candidates so the top of the list is not one interest cluster
+
+    Greedy maximal marginal relevance: each pick maximizes its match score
+    minus `diversity` times its highest interest Jaccard with the candidates
+    already picked. With diversity 0 the model order is kept.
+
+    Args:
+        scored: Compatibility dicts, best first
+        interests: Interests of each entry of `scored`
+        limit: Number of candidates to return
+        diversity: Weight of the redundancy penalty
+
+    Returns:
+        Positions into `scored`, in final order
+    """
+    limit = min(limit, len(scored))
+    if diversity <= 0 or limit <= 1:
+        return list(range(limit))
+
+    interest_sets = [set(entry or []) for entry in interests]
+    remaining = list(range(len(scored)))
+    redundancy = [0.0] * len(scored)
+    picked: List[int] = []
+    while remaining and len(picked) < limit:
+        best = max(remaining, key=lambda i: (scored[i]["match_score"] - diversity * redundancy[i], -i))
+        picked.append(best)
+        remaining.remove(best)
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], _jaccard(interest_sets[i], interest_sets[best]))
+    return picked
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List
+import re
+
+
+class KeywordHits:
+    """
+    Occurrences of every keyword of a KeywordMatcher in one text
+
+    The query methods reproduce the plain string checks the analyzer used to
+    run once per keyword, so results are identical to scanning the text again.
+    """
+
+    def __init__(self, text: str, positions: Dict[str, List[int]]):
+        self.text = text
+        self.positions = positions
+
+    def contains(self, keyword: str) -> bool:
+        """Same as `keyword in text`"""
+        return keyword in self.positions
+
+    def count(self, keyword: str) -> int:
+        """Same as `text.count(keyword)` (non-overlapping occurrences)"""
+        count = 0
+        next_free = 0
+        for start in self.positions.get(keyword, ()):
+            if start >= next_free:
+                count += 1
+                next_free = start + len(keyword)
+        return count
+
+    def is_word(self, keyword: str) -> bool:
+        """Same as `f" {keyword} " in f" {text} "`"""
+        text = self.text
+        for start in self.positions.get(keyword, ()):
+            end = start + len(keyword)
+            if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                return True
+        return False
+
+    def is_hashtag(self, keyword: str) -> bool:
+        """Same as `f"#{keyword}" in text`"""
+        return any(start > 0 and self.text[start - 1] == "#" for start in self.positions.get(keyword, ()))
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Build a regex matching the longest keyword at a position from a trie of the keywords
+
+    Shared prefixes are factored out ("art(?:ist)?"), so the regex engine follows
+    one branch per character instead of trying every keyword in turn.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional suffix: prefer the longer keyword when this node ends one
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a fixed set of keywords in a single regex pass.
+
+    The keywords are compiled once into one trie-shaped regex inside a lookahead,
+    so overlapping occurrences are reported. The regex only reports the longest
+    keyword starting at a position; the shorter keywords starting there are
+    exactly its prefixes, which are precomputed.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        unique = sorted({keyword for keyword in keywords if keyword}, key=lambda kw: (-len(kw), kw))
+        self.keywords = unique
+        self._pattern = re.compile(f"(?=({_trie_pattern(unique)}))")
+        self._prefixes = {
+            keyword: [other for other in unique if keyword.startswith(other)]
+            for keyword in unique
+        }
+
+    def scan(self, text: str) -> KeywordHits:
+        """
+        Find the start positions of every keyword occurrence in text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            KeywordHits for the text
+        """
+        positions: Dict[str, List[int]] = {}
+        if self.keywords:
+            for match in self._pattern.finditer(text):
+                start = match.start()
+                for keyword in self._prefixes[match.group(1)]:
+                    positions.setdefault(keyword, []).append(start)
+        return KeywordHits(text, positions)
@@ -1,10 +1,23 @@
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
+import json
 from datetime import datetime
 
-from .models import EnhancedMatchingModel
+from pydantic import ValidationError
+
+from .models.compatibility import EnhancedMatchingModel
 from .analyzer import UserMetadataAnalyzer
+from .candidate_pipeline import PipelineStats, diversity_rerank, shortlist
+from .scoring_queue import ScoringQueue
+from ..core.config import get_settings
+from ..models.user import UserPreferences
+from ..services.feature_store import analysis_features, feature_store
+from ..services.geo_index import geo_index, parse_coordinates, search_radius_km
+from ..services.recommendation_cache import recommendation_cache
+from ..services.activity_counters import activity_counters
+from ..services.seen_set import SeenSet, seen_sets
+from ..services.user_snapshot import user_snapshot
 
 # Setup detailed logging
 logger = logging.getLogger(__name__)
@@ -14,6 +27,23 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+settings = get_settings()
+
+
+def parse_preferences(preferences: Any) -> Optional[UserPreferences]:
+    """Stored preferences (dict or JSON string) as UserPreferences, or None when missing or invalid"""
+    if isinstance(preferences, str):
+        try:
+            preferences = json.loads(preferences)
+        except ValueError:
+            return None
+    if not isinstance(preferences, dict):
+        return None
+    try:
+        return UserPreferences(**preferences)
+    except ValidationError:
+        return None
+
 class MatchingService:
     """
     Service that provides matching recommendations based on user profiles,
@@ -24,12 +54,30 @@ class MatchingService:
         """Initialize the MatchingService with required components"""
         self.matching_model = EnhancedMatchingModel()
         self.metadata_analyzer = UserMetadataAnalyzer()
+        self.pipeline_stats = PipelineStats()
+        self.scoring_queue = ScoringQueue(
+            self.matching_model.score_requests,
+            max_items=settings.SCORING_BATCH_MAX_ITEMS,
+            max_wait_ms=settings.SCORING_BATCH_MAX_WAIT_MS,
+        )
         logger.info("MatchingService initialized with EnhancedMatchingModel and UserMetadataAnalyzer")
     
     async def get_matches_for_user(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get enhanced matches for a user based on compatibility scores
         
+        Candidates go through staged budgets so the work per request stays
+        bounded however many users there are:
+        
+        1. retrieve: up to MATCH_RETRIEVAL_POOL light candidates from the
+           indexed geo and preference predicates, most shared interests first
+           (every matching user once the in-memory user snapshot is loaded)
+        2. filter: drop inactive and already-seen users
+        3. shortlist: keep the MATCH_SHORTLIST_SIZE best on interest overlap and proximity
+        4. score: hydrate the short-list and run the full EnhancedMatchingModel,
+           micro-batched with concurrent requests, keeping the best MATCH_RERANK_WINDOW
+        5. rerank: diversify the final `limit` by interests
+        
         Args:
             user_id: ID of the user to find matches for
             limit: Maximum number of matches to return
@@ -42,7 +90,6 @@ class MatchingService:
             
             # Import database module here to avoid circular imports
             from ..db.database import db
-            from ..db.neo4j_client import get_user_raw_interests
             
             # Get the user's data from Neo4j
             user_query = """
@@ -50,62 +97,83 @@ class MatchingService:
             RETURN u
             """
             
-            user_result = db.execute_query(user_query, {"user_id": user_id})
+            user_result = await db.execute_query_async(user_query, {"user_id": user_id})
             
             if not user_result:
                 logger.warning(f"User {user_id} not found in database")
                 return await self._get_fallback_recommendations(limit)
                 
             user_data = user_result[0]["u"]
+            origin = parse_coordinates(user_data.get("latitude"), user_data.get("longitude"))
+            radius_km = search_radius_km(user_data.get("preferences"))
+            seen = await seen_sets.get(user_id)
             
-            # Get potential matches from Neo4j
-            # Find all users of compatible gender and not the user themselves
-            potential_matches_query = """
-            MATCH (u:User {id: $user_id}), (other:User)
-            WHERE other.id <> $user_id
-            RETURN other
-            LIMIT 100
-            """
-            
-            potential_matches = db.execute_query(potential_matches_query, {"user_id": user_id})
+            await user_snapshot.ensure_loaded()
+            if user_snapshot.is_loaded:
+                candidates = self._shortlist_from_snapshot(user_data, origin, radius_km, seen)
+            else:
+                candidates = await self._shortlist_from_graph(user_data, origin, radius_km, seen)
             
-            if not potential_matches:
+            if not candidates:
                 logger.warning(f"No potential matches found for user {user_id}")
                 return await self._get_fallback_recommendations(limit)
                 
-            logger.info(f"Found {len(potential_matches)} potential matches for user {user_id}")
-            
-            # Get user's raw social media data for better interests analysis
-            user_raw_data = await get_user_raw_interests(user_id)
-            
-            # Analyze user metadata to extract interests and traits
-            user_features = self.metadata_analyzer.analyze_user_raw_data(user_raw_data)
+            logger.info(f"Short-listed {len(candidates)} potential matches for user {user_id}")
             
-            # Enrich user data with analyzed features
-            enriched_user_data = {**user_data, **user_features}
-            
-            # Calculate compatibility scores for each potential match
-            scored_matches = []
-            for match in potential_matches:
-                match_data = match["other"]
+            with self.pipeline_stats.stage("score", len(candidates)) as stage:
+                # Hydrate only the short-list, keeping its order
+                nodes = {
+                    record["id"]: record["other"]
+                    for record in await db.execute_query_async(
+                        """
+                        UNWIND $ids AS id
+                        MATCH (other:User {id: id})
+                        RETURN other.id AS id, other
+                        """,
+                        {"ids": [candidate["id"] for candidate in candidates]},
+                    )
+                }
+                potential_matches = [nodes[candidate["id"]] for candidate in candidates if candidate["id"] in nodes]
                 
-                # Get match's raw data for better interest analysis
-                match_raw_data = await get_user_raw_interests(match_data["id"])
+                # Read the materialized features of the user and every candidate in one round-trip
+                features = await feature_store.get_many(
+                    [user_id] + [match["id"] for match in potential_matches]
+                )
                 
-                # Analyze match metadata
-                match_features = self.metadata_analyzer.analyze_user_raw_data(match_raw_data)
+                # Enrich user data with the interests and traits analyzed from social data
+                enriched_user_data = {**user_data, **analysis_features(features.get(user_id))}
                 
-                # Enrich match data with analyzed features
-                enriched_match_data = {**match_data, **match_features}
+                # Enrich every potential match with its analyzed features
+                enriched_matches = [
+                    {**match, **analysis_features(features.get(match["id"]))}
+                    for match in potential_matches
+                ]
                 
-                # Calculate compatibility
-                compatibility = self.matching_model.calculate_overall_compatibility(
+                # Score the short-list off the event loop, in one vectorized pass
+                # with the other requests scoring at the same time
+                top_scores = await self.scoring_queue.score(
                     enriched_user_data,
-                    enriched_match_data
+                    enriched_matches,
+                    max(limit, settings.MATCH_RERANK_WINDOW),
                 )
+                stage["out"] = len(top_scores)
+            
+            with self.pipeline_stats.stage("rerank", len(top_scores)) as stage:
+                order = diversity_rerank(
+                    top_scores,
+                    [potential_matches[compatibility["index"]].get("interests") for compatibility in top_scores],
+                    limit,
+                    settings.MATCH_RERANK_DIVERSITY,
+                )
+                stage["out"] = len(order)
+            
+            top_matches = []
+            for position in order:
+                compatibility = top_scores[position]
+                match_data = potential_matches[compatibility["index"]]
                 
                 # Create match record with all relevant data
-                match_record = {
+                top_matches.append({
                     "id": match_data["id"],
                     "full_name": match_data.get("full_name", "Unknown"),
                     "bio": match_data.get("bio", ""),
@@ -116,15 +184,8 @@ class MatchingService:
                     "match_score": compatibility["match_score"],
                     "common_interests": compatibility["common_interests"],
                     "compatibility_details": compatibility["component_scores"]
-                }
-                
-                scored_matches.append(match_record)
-            
-            # Sort matches by compatibility score (descending)
-            scored_matches.sort(key=lambda x: x["match_score"], reverse=True)
+                })
             
-            # Return top matches
-            top_matches = scored_matches[:limit]
             logger.info(f"Returning {len(top_matches)} matches for user {user_id}")
             
             return top_matches
@@ -132,6 +193,164 @@ class MatchingService:
             logger.error(f"Error getting matches for user {user_id}: {str(e)}")
             return await self._get_fallback_recommendations(limit)
     
+    async def _shortlist_from_graph(
+        self,
+        user_data: Dict[str, Any],
+        origin: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        seen: SeenSet,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve, filter and shortlist stages with retrieval from Neo4j
+        
+        Args:
+            user_data: The searching user's node
+            origin: The user's (latitude, longitude), if located
+            radius_km: The user's search radius, if bounded
+            seen: The user's seen-set
+            
+        Returns:
+            The short-listed candidate rows, best first
+        """
+        with self.pipeline_stats.stage("retrieve", 0) as stage:
+            candidates = await self._retrieve_candidates(user_data, origin, radius_km, len(seen))
+            stage["out"] = len(candidates)
+        
+        with self.pipeline_stats.stage("filter", len(candidates)) as stage:
+            candidates = [
+                candidate for candidate in candidates
+                if candidate["is_active"] is not False and candidate["id"] not in seen
+            ]
+            stage["out"] = len(candidates)
+        
+        with self.pipeline_stats.stage("shortlist", len(candidates)) as stage:
+            candidates = shortlist(
+                list(user_data.get("interests") or []),
+                origin,
+                radius_km,
+                candidates,
+                settings.MATCH_SHORTLIST_SIZE,
+                self.matching_model.interest_weight,
+                self.matching_model.location_weight,
+            )
+            stage["out"] = len(candidates)
+        return candidates
+    
+    def _shortlist_from_snapshot(
+        self,
+        user_data: Dict[str, Any],
+        origin: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        seen: SeenSet,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve, filter and shortlist stages as vectorized passes over the user snapshot
+        
+        The same predicates and cheap score as _shortlist_from_graph, but over
+        every user in memory, so retrieval is not capped at MATCH_RETRIEVAL_POOL.
+        
+        Args:
+            user_data: The searching user's node
+            origin: The user's (latitude, longitude), if located
+            radius_km: The user's search radius, if bounded
+            seen: The user's seen-set
+            
+        Returns:
+            The short-listed candidate rows, best first
+        """
+        with self.pipeline_stats.stage("retrieve", 0) as stage:
+            rows = user_snapshot.retrieve(
+                user_data["id"], origin, radius_km, parse_preferences(user_data.get("preferences"))
+            )
+            stage["out"] = len(rows)
+        
+        with self.pipeline_stats.stage("filter", len(rows)) as stage:
+            rows = user_snapshot.filter(rows, seen)
+            stage["out"] = len(rows)
+        
+        with self.pipeline_stats.stage("shortlist", len(rows)) as stage:
+            candidates = user_snapshot.shortlist(
+                rows,
+                list(user_data.get("interests") or []),
+                origin,
+                radius_km,
+                settings.MATCH_SHORTLIST_SIZE,
+                self.matching_model.interest_weight,
+                self.matching_model.location_weight,
+            )
+            stage["out"] = len(candidates)
+        return candidates
+    
+    async def _retrieve_candidates(
+        self,
+        user_data: Dict[str, Any],
+        origin: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        seen_count: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieval stage: a bounded pool of light candidate rows from indexed predicates
+        
+        Args:
+            user_data: The searching user's node
+            origin: The user's (latitude, longitude), if located
+            radius_km: The user's search radius, if bounded
+            seen_count: Size of the user's seen-set; the pool is enlarged by it
+                so already-seen users filtered next cannot crowd it out
+            
+        Returns:
+            List of {"id", "interests", "coordinates", "is_active"} dicts,
+            most shared interests first
+        """
+        # Import here to avoid circular imports
+        from ..db.database import db
+        from ..services.matching import build_preference_filter
+        
+        params = {
+            "user_id": user_data["id"],
+            "interests": list(user_data.get("interests") or []),
+            "pool_size": settings.MATCH_RETRIEVAL_POOL + seen_count,
+        }
+        
+        # Only users within the search radius when the user has a location
+        radius_filter = ""
+        if origin is not None and radius_km is not None:
+            predicate, geo_params = await geo_index.radius_filter("other", *origin, radius_km, exclude_id=user_data["id"])
+            radius_filter = f"AND {predicate}"
+            params.update(geo_params)
+        
+        # Gender and age preferences on the (is_active, gender, birth_year) index
+        preference_filter = ""
+        preferences = parse_preferences(user_data.get("preferences"))
+        if preferences is not None:
+            preference_filter, preference_params = build_preference_filter(preferences, variable="other")
+            params.update(preference_params)
+        
+        records = await db.execute_query_async(
+            f"""
+            MATCH (other:User)
+            WHERE other.id <> $user_id
+            {radius_filter}
+            {preference_filter}
+            WITH other, size([interest IN coalesce(other.interests, []) WHERE interest IN $interests]) AS shared
+            ORDER BY shared DESC
+            LIMIT $pool_size
+            RETURN other.id AS id, other.interests AS interests, other.latitude AS latitude,
+                   other.longitude AS longitude, other.is_active AS is_active
+            """,
+            params,
+        )
+        return [
+            {
+                "id": record["id"],
+                "interests": record["interests"] or [],
+                "coordinates": parse_coordinates(record["latitude"], record["longitude"]),
+                "is_active": record["is_active"],
+            }
+            for record in records
+            if record["id"]
+        ]
+    
     async def _get_fallback_recommendations(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get fallback recommendations when primary matching fails
@@ -157,7 +376,11 @@ class MatchingService:
     
     async def update_user_match_statistics(self, user_id: str) -> Dict[str, Any]:
         """
-        Update match statistics for a user
+        Recompute a user's match statistics from the graph
+
+        Swipes keep the statistics current incrementally, so this is only
+        needed to repair a single user; drift is corrected for everyone by
+        the periodic activity counter reconciliation.
 
         Args:
             user_id: ID of the user to update statistics for
@@ -166,64 +389,14 @@ class MatchingService:
             Dictionary of updated statistics
         """
         try:
-            from ..db.database import db
-
-            # 1) Likes vs. dislikes sent
-            history_query = """
-            MATCH (u:User {id: $user_id})-[r:LIKED|DISLIKED]->(other:User)
-            RETURN type(r) AS action, count(r) AS cnt
-            """
-            history = db.execute_query(history_query, {"user_id": user_id})
-            likes = sum(r["cnt"] for r in history if r["action"] == "LIKED")
-            dislikes = sum(r["cnt"] for r in history if r["action"] == "DISLIKED")
-
-            # 2) Mutual matches
-            mutual_query = """
-            MATCH (u:User {id: $user_id})-[:LIKED]->(o:User)-[:LIKED]->(u)
-            RETURN count(o) AS cnt
-            """
-            mutual = db.execute_query(mutual_query, {"user_id": user_id})
-            mutual_matches = mutual[0]["cnt"] if mutual else 0
-
-            # 3) Incoming likes (not yet responded)
-            incoming_query = """
-            MATCH (o:User)-[:LIKED]->(u:User {id: $user_id})
-            WHERE NOT (u)-[:LIKED|DISLIKED]->(o)
-            RETURN count(o) AS cnt
-            """
-            incoming = db.execute_query(incoming_query, {"user_id": user_id})
-            incoming_likes = incoming[0]["cnt"] if incoming else 0
-
-            # 4) Match rate
-            match_rate = round(mutual_matches / max(1, likes), 2) if likes > 0 else 0.0
-
-            # 5) Persist each stat as its own primitive property
-            update_query = """
-            MATCH (u:User {id: $user_id})
-            SET u.likes_sent            = $likes_sent,
-                u.dislikes_sent         = $dislikes_sent,
-                u.mutual_matches        = $mutual_matches,
-                u.incoming_likes        = $incoming_likes,
-                u.match_rate            = $match_rate,
-                u.statistics_updated_at = datetime()
-            """
-            params = {
-                "user_id":         user_id,
-                "likes_sent":      likes,
-                "dislikes_sent":   dislikes,
-                "mutual_matches":  mutual_matches,
-                "incoming_likes":  incoming_likes,
-                "match_rate":      match_rate
-            }
-            db.execute_query(update_query, params)
-
+            stats = await activity_counters.recount_match_statistics(user_id) or {}
             logger.info(f"Updated match statistics for user {user_id}")
             return {
-                "likes_sent":      likes,
-                "dislikes_sent":   dislikes,
-                "mutual_matches":  mutual_matches,
-                "incoming_likes":  incoming_likes,
-                "match_rate":      match_rate,
+                "likes_sent":      stats.get("likes_sent", 0),
+                "dislikes_sent":   stats.get("dislikes_sent", 0),
+                "mutual_matches":  stats.get("mutual_matches", 0),
+                "incoming_likes":  stats.get("incoming_likes", 0),
+                "match_rate":      stats.get("match_rate", 0.0),
                 "updated_at":      datetime.now().isoformat()
             }
 
@@ -239,6 +412,56 @@ class MatchingService:
                 "error":          str(e)
             }
 
+    async def record_swipe(self, user_id: str, target_id: str, interaction_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Record a like or dislike, updating match statistics and mutual matches in the same transaction
+        
+        Args:
+            user_id: ID of the swiping user
+            target_id: ID of the swiped user
+            interaction_type: LIKED or DISLIKED
+            
+        Returns:
+            {"created", "is_match", **the swiping user's match statistics}, or None if a user is missing
+        """
+        result = await activity_counters.record_swipe(user_id, target_id, interaction_type)
+        if result is not None:
+            seen_sets.add(user_id, target_id)
+            if result["is_match"]:
+                # The mutual match also created MATCHED from the target back to the user
+                seen_sets.add(target_id, user_id)
+        
+        # The user's cached recommendations may now include a swiped profile
+        recommendation_cache.invalidate_user(user_id)
+        
+        if result and result["is_match"] and result["created"]:
+            logger.info(f"Created mutual match between {user_id} and {target_id}")
+        return result
+    
+    async def record_swipes(self, user_id: str, swipes: List[tuple]) -> Dict[str, Any]:
+        """
+        Record an ordered batch of likes and dislikes in one transaction
+        
+        Args:
+            user_id: ID of the swiping user
+            swipes: (target_id, "LIKED" | "DISLIKED") pairs in swipe order
+            
+        Returns:
+            {"results": per-swipe outcomes in input order, "statistics": the user's match statistics}
+        """
+        batch = await activity_counters.record_swipes(user_id, swipes)
+        for item in batch["results"]:
+            if item["status"] in ("created", "unchanged"):
+                seen_sets.add(user_id, item["target_id"])
+                if item["is_match"]:
+                    seen_sets.add(item["target_id"], user_id)
+        
+        # The user's cached recommendations may now include swiped profiles
+        recommendation_cache.invalidate_user(user_id)
+        
+        matches = sum(1 for item in batch["results"] if item["is_match"] and item["status"] == "created")
+        logger.info(f"Recorded {len(swipes)} swipes from {user_id}, {matches} new mutual matches")
+        return batch
     
     async def record_user_interaction(self, user_id: str, target_id: str, interaction_type: str) -> bool:
         """
@@ -264,9 +487,11 @@ class MatchingService:
                 
             logger.info(f"Recording {interaction_type} interaction from {user_id} to {target_id}")
             
-            # Create the relationship
-            if interaction_type != "MATCHED":
-                # For LIKED, DISLIKED, BLOCKED, REPORTED
+            if interaction_type in ("LIKED", "DISLIKED"):
+                # Statistics deltas and mutual matches are applied in the swipe's own transaction
+                await self.record_swipe(user_id, target_id, interaction_type)
+            elif interaction_type != "MATCHED":
+                # For BLOCKED, REPORTED
                 query = f"""
                 MATCH (u:User {{id: $user_id}}), (t:User {{id: $target_id}})
                 MERGE (u)-[r:{interaction_type}]->(t)
@@ -274,48 +499,15 @@ class MatchingService:
                 ON MATCH SET r.updated_at = datetime()
                 """
                 
-                db.execute_query(query, {
-                    "user_id": user_id,
-                    "target_id": target_id
-                })
-            
-            # If this is a LIKE, check if it creates a match
-            if interaction_type == "LIKED":
-                match_query = """
-                MATCH (u:User {id: $user_id})-[:LIKED]->(t:User {id: $target_id}),
-                      (t)-[:LIKED]->(u)
-                RETURN count(*) > 0 as is_match
-                """
-                
-                match_result = db.execute_query(match_query, {
+                await db.execute_query_async(query, {
                     "user_id": user_id,
                     "target_id": target_id
                 })
                 
-                is_match = match_result[0]["is_match"] if match_result else False
+                seen_sets.add(user_id, target_id)
                 
-                if is_match:
-                    # Create MATCHED relationship in both directions
-                    match_create_query = """
-                    MATCH (u:User {id: $user_id}), (t:User {id: $target_id})
-                    MERGE (u)-[r1:MATCHED]->(t)
-                    MERGE (t)-[r2:MATCHED]->(u)
-                    ON CREATE SET r1.created_at = datetime(), r2.created_at = datetime()
-                    ON MATCH SET r1.updated_at = datetime(), r2.updated_at = datetime()
-                    """
-                    
-                    db.execute_query(match_create_query, {
-                        "user_id": user_id,
-                        "target_id": target_id
-                    })
-                    
-                    logger.info(f"Created mutual match between {user_id} and {target_id}")
-                    
-                    # Update both users' match statistics
-                    await self.update_user_match_statistics(user_id)
-                    await self.update_user_match_statistics(target_id)
-                    
-                    return True
+                # The user's cached recommendations may now include a swiped profile
+                recommendation_cache.invalidate_user(user_id)
             
             return True
         except Exception as e:
@@ -1,18 +1,24 @@
 import joblib
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BaseModel:
     @classmethod
-    def load_model(cls, model_path: str) -> 'BaseModel':
-        """Load a saved model from disk."""
+    def load_model(cls, model_path: str, mmap_mode: Optional[str] = "r") -> 'BaseModel':
+        """
+        Load a saved model from disk.
+
+        The model's NumPy arrays are memory-mapped read-only from the (uncompressed)
+        artifact by default, so every worker process loading it shares one copy
+        through the page cache. Pass mmap_mode=None for a private, writable copy.
+        """
         try:
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Model file not found: {model_path}")
-            return joblib.load(model_path)
+            return joblib.load(model_path, mmap_mode=mmap_mode)
         except Exception as e:
             logger.error(f"Error loading model from {model_path}: {e}")
             raise
@@ -0,0 +1,471 @@
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional, Tuple, Union
+import logging
+import math
+from datetime import datetime
+import numpy as np
+
+from ...core.interest_bitmask import interest_mask, popcount
+
+# Setup detailed logging
+logger = logging.getLogger(__name__)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+
+def _set_mask(interests) -> int:
+    """Bitmask of a collection's distinct interests, or -1 when it has no mask"""
+    mask = interest_mask(dict.fromkeys(interests))
+    return -1 if mask is None else mask
+
+class EnhancedMatchingModel(BaseModel):
+    """
+    Enhanced matching model for SammySwipe that calculates compatibility scores
+    based on multiple factors including interests, location, and personality traits.
+    """
+    
+    # Model parameters and weights
+    interest_weight: float = 0.4
+    location_weight: float = 0.2
+    age_weight: float = 0.1
+    personality_weight: float = 0.3
+    
+    # Personality compatibility matrix (how well traits complement each other)
+    personality_compatibility: Dict[str, Dict[str, float]] = {
+        "openness": {"openness": 0.8, "conscientiousness": 0.5, "extroversion": 0.7, "agreeableness": 0.6, "neuroticism": 0.3},
+        "conscientiousness": {"openness": 0.5, "conscientiousness": 0.8, "extroversion": 0.4, "agreeableness": 0.7, "neuroticism": 0.3},
+        "extroversion": {"openness": 0.7, "conscientiousness": 0.4, "extroversion": 0.6, "agreeableness": 0.8, "neuroticism": 0.3},
+        "agreeableness": {"openness": 0.6, "conscientiousness": 0.7, "extroversion": 0.8, "agreeableness": 0.9, "neuroticism": 0.4},
+        "neuroticism": {"openness": 0.3, "conscientiousness": 0.3, "extroversion": 0.3, "agreeableness": 0.4, "neuroticism": 0.2}
+    }
+    
+    class Config:
+        arbitrary_types_allowed = True
+    
+    def calculate_interest_compatibility(self, user_interests: List[str], other_interests: List[str]) -> float:
+        """
+        Calculate interest compatibility using the Jaccard similarity coefficient
+        
+        Args:
+            user_interests: List of the user's interests
+            other_interests: List of the other user's interests
+            
+        Returns:
+            Float between 0 and 1 representing interest compatibility
+        """
+        if not user_interests or not other_interests:
+            return 0.0
+            
+        # Convert to sets for easier operations
+        user_set = set(user_interests)
+        other_set = set(other_interests)
+        
+        # Jaccard similarity: intersection size / union size
+        intersection_size = len(user_set.intersection(other_set))
+        union_size = len(user_set.union(other_set))
+        
+        if union_size == 0:
+            return 0.0
+            
+        return intersection_size / union_size
+    
+    def calculate_location_compatibility(self, user_location: Dict[str, Any], other_location: Dict[str, Any]) -> float:
+        """
+        Calculate location compatibility based on distance
+        
+        Args:
+            user_location: Dict with lat/long for the user
+            other_location: Dict with lat/long for the other user
+            
+        Returns:
+            Float between 0 and 1 representing location compatibility (1 = close, 0 = far)
+        """
+        # Default to medium compatibility if location data is missing
+        if not user_location or not other_location:
+            return 0.5
+            
+        try:
+            # Extract coordinates
+            user_lat = float(user_location.get("latitude", 0))
+            user_long = float(user_location.get("longitude", 0))
+            other_lat = float(other_location.get("latitude", 0))
+            other_long = float(other_location.get("longitude", 0))
+            
+            # Calculate Haversine distance (distance between two points on a sphere)
+            R = 6371  # Earth radius in km
+            
+            # Convert to radians
+            lat1, lon1 = math.radians(user_lat), math.radians(user_long)
+            lat2, lon2 = math.radians(other_lat), math.radians(other_long)
+            
+            # Haversine formula
+            dlon = lon2 - lon1
+            dlat = lat2 - lat1
+            a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+            distance = R * c
+            
+            # Convert distance to compatibility score (closer = higher score)
+            # Max compatibility (1.0) at 0km, min (0.1) at 100km or more
+            max_distance = 100.0  # km
+            compatibility = max(0.1, 1.0 - min(distance / max_distance, 0.9))
+            
+            return compatibility
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Error calculating location compatibility: {e}")
+            return 0.5
+    
+    def calculate_age_compatibility(self, user_age: int, other_age: int) -> float:
+        """
+        Calculate age compatibility based on age difference
+        
+        Args:
+            user_age: Age of the user
+            other_age: Age of the other user
+            
+        Returns:
+            Float between 0 and 1 representing age compatibility
+        """
+        if not user_age or not other_age:
+            return 0.5
+            
+        # Calculate age difference
+        age_diff = abs(user_age - other_age)
+        
+        # Convert to compatibility score
+        # 0-3 years: 1.0-0.9
+        # 4-7 years: 0.8-0.6
+        # 8-15 years: 0.5-0.3
+        # 16+ years: 0.2
+        if age_diff <= 3:
+            return 1.0 - (age_diff * 0.03)
+        elif age_diff <= 7:
+            return 0.8 - ((age_diff - 4) * 0.05)
+        elif age_diff <= 15:
+            return 0.5 - ((age_diff - 8) * 0.025)
+        else:
+            return 0.2
+    
+    def calculate_personality_compatibility(self, user_traits: Dict[str, float], other_traits: Dict[str, float]) -> float:
+        """
+        Calculate personality compatibility based on the Big Five personality traits
+        
+        Args:
+            user_traits: Dict of the user's Big Five personality traits and scores
+            other_traits: Dict of the other user's Big Five personality traits and scores
+            
+        Returns:
+            Float between 0 and 1 representing personality compatibility
+        """
+        if not user_traits or not other_traits:
+            return 0.5
+            
+        # Calculate weighted compatibility for each trait
+        total_weight = 0
+        weighted_compatibility = 0
+        
+        for user_trait, user_score in user_traits.items():
+            if user_trait in self.personality_compatibility and user_trait in other_traits:
+                other_score = other_traits[user_trait]
+                
+                # Get compatibility factor from matrix
+                compatibility_factor = self.personality_compatibility[user_trait][user_trait]
+                
+                # Calculate similarity (1 - absolute difference)
+                trait_similarity = 1 - abs(user_score - other_score)
+                
+                # Apply compatibility factor
+                trait_compatibility = trait_similarity * compatibility_factor
+                
+                # Weight higher for extreme traits (closer to 0 or 1)
+                trait_importance = 0.5 + abs(user_score - 0.5)
+                
+                weighted_compatibility += trait_compatibility * trait_importance
+                total_weight += trait_importance
+        
+        if total_weight == 0:
+            return 0.5
+            
+        return weighted_compatibility / total_weight
+    
+    def calculate_overall_compatibility(
+        self,
+        user_data: Dict[str, Any],
+        other_user_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Calculate overall compatibility between two users, with detailed scores
+        
+        Args:
+            user_data: Dict containing the user's profile data
+            other_user_data: Dict containing the other user's profile data
+            
+        Returns:
+            Dict with overall match score and component scores
+        """
+        logger.debug(f"Calculating compatibility between {user_data.get('full_name', 'Unknown')} and {other_user_data.get('full_name', 'Unknown')}")
+        
+        # Calculate individual component scores
+        interest_score = self.calculate_interest_compatibility(
+            user_data.get("interests", []),
+            other_user_data.get("interests", [])
+        )
+        
+        location_score = self.calculate_location_compatibility(
+            user_data.get("coordinates", {}),
+            other_user_data.get("coordinates", {})
+        )
+        
+        age_score = self.calculate_age_compatibility(
+            user_data.get("age", 0),
+            other_user_data.get("age", 0)
+        )
+        
+        personality_score = self.calculate_personality_compatibility(
+            user_data.get("personality_traits", {}),
+            other_user_data.get("personality_traits", {})
+        )
+        
+        # Calculate weighted overall score
+        overall_score = (
+            interest_score * self.interest_weight +
+            location_score * self.location_weight +
+            age_score * self.age_weight +
+            personality_score * self.personality_weight
+        )
+        
+        # Ensure score is between 0.4 and 0.95 for better user experience
+        # (avoiding extremely low or perfect scores)
+        overall_score = max(0.4, min(0.95, overall_score))
+        
+        # Round to 2 decimal places
+        overall_score = round(overall_score, 2)
+        
+        # Calculate common interests
+        user_interests = set(user_data.get("interests", []))
+        other_interests = set(other_user_data.get("interests", []))
+        common_interests = list(user_interests.intersection(other_interests))
+        
+        logger.debug(f"Match score: {overall_score} (Interests: {interest_score:.2f}, Location: {location_score:.2f}, Age: {age_score:.2f}, Personality: {personality_score:.2f})")
+        
+        return {
+            "match_score": overall_score,
+            "component_scores": {
+                "interest_score": round(interest_score, 2),
+                "location_score": round(location_score, 2),
+                "age_score": round(age_score, 2),
+                "personality_score": round(personality_score, 2)
+            },
+            "common_interests": common_interests
+        }
+
+    def score_batch(
+        self,
+        user_data: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score many candidates against one user with vectorized NumPy expressions
+        
+        Candidates are packed into column arrays (interest overlap with the user's
+        interests, lat/lon, age and the Big Five trait columns) and the four component
+        scores are computed for all of them at once. Only the top_k winners are then
+        materialized through calculate_overall_compatibility, so the returned scores,
+        component scores and common interests are identical to the per-pair path.
+        
+        Args:
+            user_data: Dict containing the user's profile data
+            candidates: List of dicts containing the candidates' profile data
+            top_k: Number of best candidates to return (all candidates if None)
+            
+        Returns:
+            List of compatibility dicts (same shape as calculate_overall_compatibility)
+            with an extra "index" key into candidates, ordered by match_score descending
+            and by candidate order on ties
+        """
+        return self.score_requests([(user_data, candidates, top_k)])[0]
+    
+    def score_requests(
+        self,
+        requests: List[Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[int]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Score the candidates of several users in one vectorized pass
+        
+        The candidates of every request are concatenated into one set of column
+        arrays, each row carrying its own user's values, so concurrent requests
+        share the NumPy work instead of paying its per-call overhead each.
+        
+        Args:
+            requests: (user_data, candidates, top_k) tuples, as taken by score_batch
+            
+        Returns:
+            The score_batch result of each request, in request order
+        """
+        sizes = [len(candidates) for _, candidates, _ in requests]
+        users = [user_data for user_data, _, _ in requests]
+        rows = [candidate for _, candidates, _ in requests for candidate in candidates]
+        if not rows:
+            return [[] for _ in requests]
+        owner = np.repeat(np.arange(len(requests)), sizes)
+        
+        overall = (
+            self._batch_interest_scores(users, owner, rows) * self.interest_weight +
+            self._batch_location_scores(users, owner, rows) * self.location_weight +
+            self._batch_age_scores(users, owner, rows) * self.age_weight +
+            self._batch_personality_scores(users, owner, rows) * self.personality_weight
+        )
+        overall = np.minimum(0.95, np.maximum(0.4, overall))
+        
+        # Rank on the same 2-decimal scores the per-pair path produces. Values sitting
+        # on a rounding boundary are re-scored through the scalar path so that
+        # floating-point noise in the vectorized math can never change the ranking.
+        scaled = overall * 100
+        cents = np.rint(scaled).astype(np.int64)
+        ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9)
+        for i in ambiguous:
+            score = self.calculate_overall_compatibility(users[owner[i]], rows[i])["match_score"]
+            cents[i] = int(round(score * 100))
+        
+        results = []
+        start = 0
+        for (user_data, candidates, top_k), n in zip(requests, sizes):
+            segment = cents[start:start + n]
+            start += n
+            k = n if top_k is None else max(0, min(top_k, n))
+            if k == 0:
+                results.append([])
+                continue
+            
+            # Higher score first, earlier candidate first on ties (like a stable sort)
+            order_key = segment * n + (n - 1 - np.arange(n, dtype=np.int64))
+            if k < n:
+                top = np.argpartition(-order_key, k - 1)[:k]
+            else:
+                top = np.arange(n)
+            top = top[np.argsort(-order_key[top])]
+            
+            scored = []
+            for i in top.tolist():
+                compatibility = self.calculate_overall_compatibility(user_data, candidates[i])
+                compatibility["index"] = i
+                scored.append(compatibility)
+            results.append(scored)
+        return results
+    
+    def _batch_interest_scores(self, users: List[Dict[str, Any]], owner: np.ndarray, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Vectorized calculate_interest_compatibility: shared and distinct interest counts per row"""
+        n = len(rows)
+        user_sets = [set(user_data.get("interests", []) or []) for user_data in users]
+        user_sizes = np.array([len(interests) for interests in user_sets], dtype=np.int64)
+        # Masks of the distinct interests (-1 when one is outside the vocabulary)
+        user_masks = np.array([_set_mask(interests) for interests in user_sets], dtype=np.int64)
+        masks = np.array([_set_mask(candidate.get("interests", []) or []) for candidate in rows], dtype=np.int64)
+        
+        owner_masks = user_masks[owner]
+        maskable = (masks >= 0) & (owner_masks >= 0)
+        shared = np.where(maskable, popcount(masks & owner_masks), 0)
+        sizes = np.where(maskable, popcount(masks), 0)
+        for row in np.flatnonzero(~maskable).tolist():
+            other_set = set(rows[row].get("interests", []) or [])
+            sizes[row] = len(other_set)
+            shared[row] = len(other_set & user_sets[owner[row]])
+        
+        union = user_sizes[owner] + sizes - shared
+        scores = np.zeros(n)
+        # Like the scalar path, 0 when either side has no interests
+        has_interests = (sizes > 0) & (user_sizes[owner] > 0)
+        scores[has_interests] = shared[has_interests] / union[has_interests]
+        return scores
+    
+    def _batch_location_scores(self, users: List[Dict[str, Any]], owner: np.ndarray, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Vectorized calculate_location_compatibility (haversine over lat/lon columns)"""
+        n = len(rows)
+        user_lats = np.zeros(len(users))
+        user_longs = np.zeros(len(users))
+        user_valid = np.zeros(len(users), dtype=bool)
+        for index, user_data in enumerate(users):
+            user_location = user_data.get("coordinates", {})
+            if not user_location:
+                continue
+            try:
+                user_lats[index] = float(user_location.get("latitude", 0))
+                user_longs[index] = float(user_location.get("longitude", 0))
+                user_valid[index] = True
+            except (ValueError, TypeError):
+                continue
+        
+        lats = np.zeros(n)
+        longs = np.zeros(n)
+        valid = user_valid[owner]
+        for row, candidate in enumerate(rows):
+            if not valid[row]:
+                continue
+            other_location = candidate.get("coordinates", {})
+            if not other_location:
+                valid[row] = False
+                continue
+            try:
+                lats[row] = float(other_location.get("latitude", 0))
+                longs[row] = float(other_location.get("longitude", 0))
+            except (ValueError, TypeError):
+                valid[row] = False
+        
+        R = 6371  # Earth radius in km
+        lat1, lon1 = np.radians(user_lats[owner[valid]]), np.radians(user_longs[owner[valid]])
+        lat2, lon2 = np.radians(lats[valid]), np.radians(longs[valid])
+        dlon = lon2 - lon1
+        dlat = lat2 - lat1
+        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+        distance = R * c
+        
+        max_distance = 100.0  # km
+        scores = np.full(n, 0.5)
+        scores[valid] = np.maximum(0.1, 1.0 - np.minimum(distance / max_distance, 0.9))
+        return scores
+    
+    def _batch_age_scores(self, users: List[Dict[str, Any]], owner: np.ndarray, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Vectorized calculate_age_compatibility"""
+        user_ages = np.array([user_data.get("age", 0) or np.nan for user_data in users], dtype=float)[owner]
+        ages = np.array([candidate.get("age", 0) or np.nan for candidate in rows], dtype=float)
+        age_diff = np.abs(user_ages - ages)
+        scores = np.select(
+            [age_diff <= 3, age_diff <= 7, age_diff <= 15],
+            [1.0 - (age_diff * 0.03), 0.8 - ((age_diff - 4) * 0.05), 0.5 - ((age_diff - 8) * 0.025)],
+            default=0.2
+        )
+        scores[np.isnan(age_diff)] = 0.5
+        return scores
+    
+    def _batch_personality_scores(self, users: List[Dict[str, Any]], owner: np.ndarray, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Vectorized calculate_personality_compatibility over the five trait columns"""
+        n = len(rows)
+        traits = list(self.personality_compatibility)
+        
+        # Trait columns of each row's user and of the candidate; NaN marks a missing trait
+        user_traits = [user_data.get("personality_traits", {}) or {} for user_data in users]
+        user_columns = np.array(
+            [[values.get(trait, np.nan) for trait in traits] for values in user_traits], dtype=float
+        ).reshape(len(users), len(traits))[owner]
+        candidate_traits = [candidate.get("personality_traits", {}) or {} for candidate in rows]
+        columns = np.array(
+            [[values.get(trait, np.nan) for trait in traits] for values in candidate_traits], dtype=float
+        ).reshape(n, len(traits))
+        has_traits = np.array([bool(values) for values in user_traits], dtype=bool)[owner]
+        has_traits &= np.array([bool(values) for values in candidate_traits], dtype=bool)
+        
+        present = ~np.isnan(user_columns) & ~np.isnan(columns)
+        factors = np.array([self.personality_compatibility[trait][trait] for trait in traits])
+        trait_compatibility = (1 - np.abs(user_columns - columns)) * factors
+        trait_importance = 0.5 + np.abs(user_columns - 0.5)
+        weighted_compatibility = np.where(present, trait_compatibility * trait_importance, 0.0).sum(axis=1)
+        total_weight = np.where(present, trait_importance, 0.0).sum(axis=1)
+        
+        scores = np.full(n, 0.5)
+        scored = has_traits & (total_weight != 0)
+        scores[scored] = weighted_compatibility[scored] / total_weight[scored]
+        return scores
@@ -44,17 +44,10 @@ class UserMetadataAnalyzer(BaseModel):
             # Get cluster assignment
             cluster = self.cluster_model.predict(X)[0]
             
-            # Calculate activity score
-            activity_score = self._calculate_activity_score(user_data)
-            
-            # Calculate profile completeness
-            completeness = self._calculate_profile_completeness(user_data)
-            
+            # Activity score, profile completeness and engagement level
             return {
                 "cluster": int(cluster),
-                "activity_score": float(activity_score),
-                "profile_completeness": float(completeness),
-                "engagement_level": self._get_engagement_level(activity_score)
+                **compute_profile_features(user_data)
             }
         except Exception as e:
             logger.error(f"Error analyzing user metadata: {e}")
@@ -84,7 +77,8 @@ class UserMetadataAnalyzer(BaseModel):
         
         return texts
 
-    def _calculate_activity_score(self, user_data: Dict[str, Any]) -> float:
+    @staticmethod
+    def _calculate_activity_score(user_data: Dict[str, Any]) -> float:
         """Calculate user activity score based on available data."""
         score = 0.0
         num_factors = 0
@@ -113,7 +107,8 @@ class UserMetadataAnalyzer(BaseModel):
         # Return average score over available factors
         return score / num_factors if num_factors > 0 else 0.0
 
-    def _calculate_profile_completeness(self, user_data: Dict[str, Any]) -> float:
+    @staticmethod
+    def _calculate_profile_completeness(user_data: Dict[str, Any]) -> float:
         """Calculate profile completeness score based on likely available fields."""
         # Adjust this list based on fields reliably present in your Neo4j User nodes
         # Removed birth_date (often derived), full_name (may not be essential)
@@ -140,7 +135,8 @@ class UserMetadataAnalyzer(BaseModel):
         # logger.debug(f"Completeness for user {user_data.get('id', '?')}: {completed_count}/{total_fields} = {completeness:.2f}")
         return completeness
 
-    def _get_engagement_level(self, activity_score: float) -> str:
+    @staticmethod
+    def _get_engagement_level(activity_score: float) -> str:
         """Get user engagement level based on activity score."""
         # These thresholds might need tuning based on observed activity scores
         if activity_score >= 0.7: # Adjusted threshold example
@@ -148,4 +144,14 @@ class UserMetadataAnalyzer(BaseModel):
         elif activity_score >= 0.3: # Adjusted threshold example
             return "medium"
         else:
-            return "low" 
\ No newline at end of file
+            return "low"
+
+
+def compute_profile_features(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Profile features that need no fitted model: activity score, completeness and engagement level."""
+    activity_score = UserMetadataAnalyzer._calculate_activity_score(user_data)
+    return {
+        "activity_score": float(activity_score),
+        "profile_completeness": float(UserMetadataAnalyzer._calculate_profile_completeness(user_data)),
+        "engagement_level": UserMetadataAnalyzer._get_engagement_level(activity_score)
+    }
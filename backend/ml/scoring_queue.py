@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ..services.ml_executor import MLExecutorSaturated, ml_executor
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("user_data", "candidates", "top_k", "future", "queued_at")
+
+    def __init__(self, user_data: Dict[str, Any], candidates: List[Dict[str, Any]], top_k: Optional[int], future: asyncio.Future):
+        self.user_data = user_data
+        self.candidates = candidates
+        self.top_k = top_k
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class ScoringQueue:
+    """
+    Micro-batching queue in front of a batch scorer.
+
+    Concurrent matching requests each score a short-list of a few hundred
+    candidates, paying the executor hand-off and the NumPy per-call overhead
+    every time. The queue holds requests for at most `max_wait_ms`, or until
+    `max_items` candidates are waiting, and scores them all in one
+    EnhancedMatchingModel.score_requests call on the ML thread pool (a batch is
+    too small to pay for pickling it to the process pool); each request's result
+    is delivered to its own awaiting future. With max_wait_ms 0 every
+    request is scored on its own. When a batch fails, its requests are scored
+    again one by one so only the requests that fail on their own get the error.
+    """
+
+    def __init__(self, scorer: Callable, max_items: int, max_wait_ms: float):
+        self.scorer = scorer
+        self.max_items = max_items
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[_Pending] = []
+        self._pending_items = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+        self.size_flushes = 0
+        self.failed = 0
+        self.retried = 0
+        self.max_batch_requests = 0
+        self.queue_seconds = 0.0
+        self.score_seconds = 0.0
+
+    async def score(
+        self,
+        user_data: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        top_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Score a user's candidates as part of the next batch
+
+        Args:
+            user_data: The user's (enriched) profile data
+            candidates: The candidates' (enriched) profile data
+            top_k: Number of best candidates to return
+
+        Returns:
+            The same result as score_batch(user_data, candidates, top_k)
+
+        Raises:
+            MLExecutorSaturated: If the executor rejected the batch
+        """
+        if not candidates:
+            return []
+        loop = asyncio.get_running_loop()
+        pending = _Pending(user_data, candidates, top_k, loop.create_future())
+        self._pending.append(pending)
+        self._pending_items += len(candidates)
+
+        if self.max_wait_ms <= 0 or self._pending_items >= self.max_items:
+            if self.max_wait_ms > 0:
+                self.size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+        return await pending.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_items = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        items = sum(len(pending.candidates) for pending in batch)
+        try:
+            results = await ml_executor.run_thread(
+                self.scorer,
+                [(pending.user_data, pending.candidates, pending.top_k) for pending in batch],
+            )
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning(f"Scoring batch of {len(batch)} requests failed: {e}")
+            if len(batch) == 1 or isinstance(e, MLExecutorSaturated):
+                # Not a bad request: every request of the batch gets the error
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+            else:
+                await asyncio.gather(*(self._run_alone(pending) for pending in batch))
+            return
+
+        finished = time.perf_counter()
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.items += items
+            self.max_batch_requests = max(self.max_batch_requests, len(batch))
+            self.queue_seconds += sum(started - pending.queued_at for pending in batch)
+            self.score_seconds += finished - started
+
+    async def _run_alone(self, pending: _Pending) -> None:
+        """Score one request of a failed batch on its own"""
+        with self._lock:
+            self.retried += 1
+        try:
+            results = await ml_executor.run_thread(
+                self.scorer,
+                [(pending.user_data, pending.candidates, pending.top_k)],
+            )
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        if not pending.future.done():
+            pending.future.set_result(results[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch sizes, time spent waiting for a batch and scoring throughput"""
+        with self._lock:
+            batches = max(1, self.batches)
+            return {
+                "max_items": self.max_items,
+                "max_wait_ms": self.max_wait_ms,
+                "queued_requests": len(self._pending),
+                "batches": self.batches,
+                "requests": self.requests,
+                "items": self.items,
+                "failed_batches": self.failed,
+                "retried_requests": self.retried,
+                "size_flushes": self.size_flushes,
+                "avg_batch_requests": round(self.requests / batches, 2),
+                "max_batch_requests": self.max_batch_requests,
+                "avg_batch_items": round(self.items / batches, 1),
+                "avg_queue_ms": round(self.queue_seconds / max(1, self.requests) * 1000, 2),
+                "avg_score_ms": round(self.score_seconds / batches * 1000, 2),
+                "items_per_second": round(self.items / self.score_seconds, 1) if self.score_seconds else 0.0,
+            }
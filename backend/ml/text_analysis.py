@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, List, Optional
+from collections import Counter
+import re
+
+from .keyword_matcher import KeywordHits, KeywordMatcher
+
+# Characters the NLTK word tokenizer always splits off as their own tokens
+_SPLIT_CHARS = "\\s«“‘„`»”’\";@#$%&\u2012-\u2015?!*()\\[\\]{}<>"
+
+# A run of text between split characters. Commas and colons only split before a
+# non-digit, and dots / dashes / quotes only when repeated ("...", "--", "''").
+_RUN_RE = re.compile(
+    f"(?:[^{_SPLIT_CHARS},:.'\\-]|[,:](?=\\d)|(?<!\\.)\\.(?!\\.)|(?<!-)-(?!-)|(?<!')'(?!'))+"
+)
+
+# Clitics split off the end of a word ("it's" -> "it", "'s"; "don't" -> "do", "n't")
+_CLITIC_RE = re.compile(r"(?<=[^'])(?:'s|'m|'d|'ll|'re|'ve|n't|')$")
+
+# A leading quote is split off unless it starts a clitic itself
+_LEADING_CLITIC_RE = re.compile(r"'(?:re|ve|ll|m|t|s|d|n)\b")
+
+# Contractions split into two words
+_CONTRACTIONS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+
+def iter_alpha_tokens(text: str) -> Iterable[str]:
+    """
+    Yield the alphabetic word tokens of a text in one regex pass
+
+    Produces the same alphabetic tokens as `nltk.word_tokenize` for social media
+    text (punctuation, hashtags, mentions, clitics and contractions are split the
+    same way), without its dozens of substitution passes over the text. Tokens
+    with digits, inner hyphens or dots are not alphabetic and are skipped.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Iterator over alphabetic tokens
+    """
+    for match in _RUN_RE.finditer(text):
+        run = match.group()
+        if not run.isalpha():
+            if run.endswith(".") and len(run) > 1:
+                run = run[:-1]  # sentence-final period
+            if run.startswith("'") and not _LEADING_CLITIC_RE.match(run):
+                run = run[1:]
+            run = _CLITIC_RE.sub("", run)
+            if not run.isalpha():
+                continue
+        contraction = _CONTRACTIONS.get(run)
+        if contraction is not None:
+            yield from contraction
+        else:
+            yield run
+
+
+class AnalysisDocument:
+    """
+    One source's text, joined and lowercased once, with its derived views
+
+    The keyword scan and the token counts are computed on first use and shared
+    by interest, topic, personality and relationship preference extraction.
+    """
+
+    def __init__(self, text: str, keyword_matcher: KeywordMatcher, stop_words: Iterable[str]):
+        self.text = text
+        self._keyword_matcher = keyword_matcher
+        self._stop_words = stop_words
+        self._keyword_hits: Optional[KeywordHits] = None
+        self._token_counts: Optional[Counter] = None
+
+    @property
+    def keyword_hits(self) -> KeywordHits:
+        """Occurrences of every analyzer keyword in the text"""
+        if self._keyword_hits is None:
+            self._keyword_hits = self._keyword_matcher.scan(self.text)
+        return self._keyword_hits
+
+    @property
+    def token_counts(self) -> Counter:
+        """Counts of the alphabetic, non stop word tokens of the text"""
+        if self._token_counts is None:
+            stop_words = self._stop_words
+            self._token_counts = Counter(
+                token for token in iter_alpha_tokens(self.text) if token not in stop_words
+            )
+        return self._token_counts
+
+
+class AnalysisContext:
+    """
+    Per-call state of UserMetadataAnalyzer.analyze_user_raw_data
+
+    Holds one AnalysisDocument per social source so every extraction stage
+    reuses the same joined text, keyword scan and token counts.
+    """
+
+    def __init__(self, keyword_matcher: KeywordMatcher, stop_words: Iterable[str]):
+        self.keyword_matcher = keyword_matcher
+        self.stop_words = stop_words
+        self.documents: Dict[str, AnalysisDocument] = {}
+
+    def add_document(self, source: str, texts: List[str]) -> AnalysisDocument:
+        """
+        Join and lowercase the texts of a source into a document
+
+        Args:
+            source: Source name (e.g. "twitter")
+            texts: Texts of the source's posts
+
+        Returns:
+            The source's AnalysisDocument
+        """
+        document = AnalysisDocument(" ".join(texts).lower(), self.keyword_matcher, self.stop_words)
+        self.documents[source] = document
+        return document
+
+    def contains_keyword(self, keyword: str) -> bool:
+        """Whether any source document contains a keyword"""
+        return any(document.keyword_hits.contains(keyword) for document in self.documents.values())
@@ -3,7 +3,7 @@ import logging
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 import random
-from ml.models.user_metadata import UserMetadataAnalyzer
+from ml.models.user_metadata import UserMetadataAnalyzer, compute_profile_features
 from ml.models.enhanced_matching import EnhancedMatchingModel
 
 logging.basicConfig(level=logging.INFO)
@@ -48,15 +48,10 @@ def generate_test_data(num_users: int = 100) -> tuple:
             if random.random() < 0.3:  # 30% chance of match
                 match = {
                     "user": users[i],
-                    "user_metadata": {
-                        "activity_score": (users[i]["login_frequency"] + users[i]["profile_updates"]) / 2,
-                        "profile_completeness": len([x for x in [users[i]["bio"], users[i]["interests"], users[i]["location"], users[i]["profile_photo"]] if x]) / 4
-                    },
+                    # Same derivation as the serving feature store, so training and serving features agree
+                    "user_metadata": compute_profile_features(users[i]),
                     "candidate": users[j],
-                    "candidate_metadata": {
-                        "activity_score": (users[j]["login_frequency"] + users[j]["profile_updates"]) / 2,
-                        "profile_completeness": len([x for x in [users[j]["bio"], users[j]["interests"], users[j]["location"], users[j]["profile_photo"]] if x]) / 4
-                    },
+                    "candidate_metadata": compute_profile_features(users[j]),
                     "is_match": True
                 }
                 matches.append(match)
@@ -55,6 +55,23 @@ class UserPreferences(BaseModel):
     max_distance: Optional[int] = Field(None, ge=1, le=1000)
     interests_weight: float = Field(default=0.5, ge=0, le=1)
     
+class SwipeAction(str, Enum):
+    LIKE = "like"
+    DISLIKE = "dislike"
+
+class Swipe(BaseModel):
+    target_id: str
+    action: SwipeAction
+
+class SwipeBatch(BaseModel):
+    swipes: List[Swipe] = Field(min_length=1, max_length=100)
+    
+class DeckPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+    prefetch: bool = False
+    remaining: int = 0
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark the latency of creating a match.
+
+Creates temporary users and times two ways of handling POST /matches/{user_id}:
+the sequential round-trips the endpoint used to make (existence check,
+duplicate check, score lookup, MERGE, reciprocity check and acceptance, mutual
+check) and the single write transaction of services.matching.create_match.
+Reports p50/p95/p99/max latency for both, then deletes the temporary users.
+"""
+
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+# Add the repository root to the path so the backend package can be imported
+root_dir = Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
+
+from backend.db.database import db
+from backend.services.matching import create_match
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BENCH_PREFIX = "bench-match-"
+
+
+async def sequential_create_match(me: str, them: str) -> dict:
+    """The round-trip sequence of the endpoint before create_match became one transaction"""
+    if (await db.execute_query_async("MATCH (u:User {id:$them}) RETURN count(u) AS c", {"them": them}))[0]["c"] == 0:
+        return {"error": "not found"}
+    if await db.execute_query_async(
+        "MATCH (u1:User {id:$me})-[r:MATCHED]->(u2:User {id:$them}) RETURN r", {"me": me, "them": them}
+    ):
+        return {"is_new": False}
+    score_rec = await db.execute_query_async(
+        "MATCH (u:User {id:$them}) RETURN coalesce(u.match_score, 0.75) AS s", {"them": them}
+    )
+    await db.execute_query_async(
+        """
+        MATCH (u1:User {id:$me}), (u2:User {id:$them})
+        MERGE (u1)-[r:MATCHED]->(u2)
+        ON CREATE SET r.created_at = datetime(), r.status = 'pending'
+        SET r.score = $score
+        RETURN r
+        """,
+        {"me": me, "them": them, "score": score_rec[0]["s"]},
+    )
+    if await db.execute_query_async(
+        "MATCH (u1:User {id:$me})<-[r:MATCHED {status:'pending'}]-(u2:User {id:$them}) RETURN r",
+        {"me": me, "them": them},
+    ):
+        await db.execute_query_async(
+            """
+            MATCH (a:User {id:$me})-[r1:MATCHED]->(b:User {id:$them}), (b)-[r2:MATCHED]->(a)
+            SET r1.status = 'accepted', r1.accepted_at = datetime(),
+                r2.status = 'accepted', r2.accepted_at = datetime()
+            """,
+            {"me": me, "them": them},
+        )
+    mutual = await db.execute_query_async(
+        """
+        MATCH (a:User {id:$me})-[:MATCHED {status:'accepted'}]->(b:User {id:$them}),
+              (b)-[:MATCHED {status:'accepted'}]->(a)
+        RETURN count(*) > 0 AS is_mutual
+        """,
+        {"me": me, "them": them},
+    )
+    return {"is_new": True, "is_mutual": mutual[0]["is_mutual"]}
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": ordered[-1] * 1000}
+
+
+async def run(pairs: int, concurrency: int) -> None:
+    ids = [f"{BENCH_PREFIX}{uuid.uuid4()}" for _ in range(pairs * 4)]
+    await db.execute_query_async(
+        "UNWIND $ids AS id CREATE (:User {id: id, match_score: 0.8, is_active: true})", {"ids": ids}
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(fn, me: str, them: str) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await fn(me, them)
+            return time.perf_counter() - started
+
+    try:
+        results = {}
+        for name, fn, offset in (
+            ("sequential round-trips", sequential_create_match, 0),
+            ("single transaction", create_match, pairs * 2),
+        ):
+            users = ids[offset:offset + pairs * 2]
+            # Every second pair likes back, so half of the writes detect reciprocity
+            swipes = [(users[2 * i], users[2 * i + 1]) for i in range(pairs)]
+            swipes += [(users[2 * i + 1], users[2 * i]) for i in range(0, pairs, 2)]
+            samples = []
+            for batch in (swipes[:pairs], swipes[pairs:]):
+                samples += await asyncio.gather(*(timed(fn, me, them) for me, them in batch))
+            results[name] = percentiles(samples)
+
+        for name, stats in results.items():
+            logger.info(
+                f"{name:>22}: p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms, "
+                f"p99 {stats['p99']:.1f} ms, max {stats['max']:.1f} ms"
+            )
+    finally:
+        await db.execute_query_async(
+            "MATCH (u:User) WHERE u.id STARTS WITH $prefix DETACH DELETE u", {"prefix": BENCH_PREFIX}
+        )
+        await db.close_async()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark match creation latency")
+    parser.add_argument("--pairs", type=int, default=500, help="Number of user pairs per variant")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent requests")
+    args = parser.parse_args()
+    asyncio.run(run(args.pairs, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
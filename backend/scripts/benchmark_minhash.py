@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MinHash/LSH neighbour index against exact Jaccard.
+
+Builds the index from Neo4j (or from --synthetic generated users), then for a
+sample of users compares the approximate top-k of minhash_index.top_k with the
+exact top-k of a full scan over the same interest/topic sets. Reports recall@k
+(tie-aware: an approximate neighbour counts if it is at least as similar as the
+exact k-th one), p50/p95 latency of both, and the average number of candidates
+the LSH buckets returned. With --cypher the exact interest Jaccard query is
+also timed against Neo4j.
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+# Add the repository root to the path so the backend package can be imported
+root_dir = Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
+
+from backend.db.database import db
+from backend.db.neo4j_client import ALL_INTERESTS, generate_mock_topics
+from backend.services.minhash_index import MinHashIndex, jaccard
+from backend.core.config import get_settings
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+EXACT_QUERY = """
+MATCH (me:User {id: $user_id}), (other:User)
+WHERE other.id <> $user_id
+WITH other,
+     size([x IN me.interests WHERE x IN other.interests]) * 1.0 /
+     size(me.interests + [x IN other.interests WHERE NOT x IN me.interests]) AS similarity
+ORDER BY similarity DESC
+LIMIT $k
+RETURN other.id AS id, similarity
+"""
+
+
+def exact_top_k(index: MinHashIndex, user_id: str, k: int) -> list:
+    """Exact top-k by a full scan over the index's token sets"""
+    tokens = index._tokens[user_id]
+    scored = [
+        (jaccard(tokens, other_tokens), other_id)
+        for other_id, other_tokens in index._tokens.items()
+        if other_id != user_id
+    ]
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+def build_synthetic(index: MinHashIndex, users: int) -> None:
+    for i in range(users):
+        index.update_user(
+            f"synthetic-{i}",
+            interests=random.sample(ALL_INTERESTS, random.randint(3, 7)),
+            topics=list(generate_mock_topics()),
+        )
+
+
+async def run(args) -> None:
+    settings = get_settings()
+    index = MinHashIndex(
+        bands=args.bands or settings.MINHASH_BANDS,
+        rows=args.rows or settings.MINHASH_ROWS,
+        max_candidates=settings.MINHASH_MAX_CANDIDATES,
+    )
+    started = time.perf_counter()
+    if args.synthetic:
+        build_synthetic(index, args.synthetic)
+    else:
+        await index.load()
+    logger.info(f"Indexed {len(index)} users in {time.perf_counter() - started:.1f} s")
+
+    sample = random.sample([user_id for user_id, tokens in index._tokens.items() if tokens], args.queries)
+    recalls, lsh_times, exact_times, cypher_times = [], [], [], []
+    for user_id in sample:
+        started = time.perf_counter()
+        approximate = index.top_k(user_id, k=args.k)
+        lsh_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        exact = exact_top_k(index, user_id, args.k)
+        exact_times.append(time.perf_counter() - started)
+
+        if exact:
+            kth = exact[-1][0]
+            hits = sum(1 for item in approximate if jaccard(index._tokens[user_id], index._tokens[item["id"]]) >= kth)
+            recalls.append(hits / len(exact))
+
+        if args.cypher:
+            started = time.perf_counter()
+            await db.execute_query_async(EXACT_QUERY, {"user_id": user_id, "k": args.k})
+            cypher_times.append(time.perf_counter() - started)
+
+    stats = index.stats()
+    logger.info(
+        f"bands={stats['bands']} rows={stats['rows']}: recall@{args.k} {sum(recalls) / len(recalls):.3f}, "
+        f"{stats['avg_candidates']:.0f} candidates per query ({stats['avg_candidates'] / len(index):.1%} of users)"
+    )
+    for name, samples in (("LSH", lsh_times), ("exact scan", exact_times), ("exact Cypher", cypher_times)):
+        if samples:
+            logger.info(f"{name:>12}: p50 {percentile(samples, 0.5):.2f} ms, p95 {percentile(samples, 0.95):.2f} ms")
+
+    if not args.synthetic or args.cypher:
+        await db.close_async()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MinHash/LSH recall and latency")
+    parser.add_argument("--synthetic", type=int, default=0, help="Index this many generated users instead of Neo4j")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled query users")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--bands", type=int, default=0, help="Override MINHASH_BANDS")
+    parser.add_argument("--rows", type=int, default=0, help="Override MINHASH_ROWS")
+    parser.add_argument("--cypher", action="store_true", help="Also time the exact Jaccard Cypher query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the matching preference filter with PROFILE.
+
+Profiles the candidate filter of services/matching.get_matches as it is built
+today (index-backed is_active / gender / birth_year predicates) against the
+previous per-row `datetime(u.birth_date).year` filter, and reports the
+database hits, rows and operators of both plans.
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add the repository root to the path so the backend package can be imported
+root_dir = Path(__file__).parent.parent.parent
+sys.path.append(str(root_dir))
+
+from backend.db.database import db
+from backend.models.user import UserPreferences
+from backend.services.matching import build_preference_filter
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DATETIME_FILTER_QUERY = """
+MATCH (u:User)
+WHERE u.email <> $email
+AND u.is_active = true
+AND u.gender IN $preferred_gender
+AND datetime(u.birth_date).year <= datetime().year - $min_age
+AND datetime(u.birth_date).year >= datetime().year - $max_age
+RETURN count(u) AS candidates
+"""
+
+
+def summarize_profile(plan) -> dict:
+    """Total db hits and the operators of a PROFILE plan tree"""
+    db_hits = plan.get("dbHits", 0)
+    operators = [plan.get("operatorType", "?")]
+    for child in plan.get("children", []):
+        child_summary = summarize_profile(child)
+        db_hits += child_summary["db_hits"]
+        operators.extend(child_summary["operators"])
+    return {"db_hits": db_hits, "operators": operators}
+
+
+def profile(query: str, params: dict) -> dict:
+    with db.connect().session(database="neo4j") as session:
+        result = session.run("PROFILE " + query, params)
+        rows = [dict(record) for record in result]
+        summary = summarize_profile(result.consume().profile)
+    summary["candidates"] = rows[0]["candidates"] if rows else 0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PROFILE the matching preference filter")
+    parser.add_argument("--min-age", type=int, default=25)
+    parser.add_argument("--max-age", type=int, default=35)
+    parser.add_argument("--gender", nargs="+", default=["female"])
+    parser.add_argument("--email", default="nobody@example.com")
+    args = parser.parse_args()
+
+    db.create_constraints()
+
+    preferences = UserPreferences(min_age=args.min_age, max_age=args.max_age, preferred_gender=args.gender)
+    predicates, params = build_preference_filter(preferences)
+    indexed_query = f"""
+    MATCH (u:User)
+    WHERE u.email <> $email
+    {predicates}
+    RETURN count(u) AS candidates
+    """
+    params["email"] = args.email
+
+    results = {
+        "datetime(birth_date)": profile(DATETIME_FILTER_QUERY, {
+            "email": args.email,
+            "preferred_gender": args.gender,
+            "min_age": args.min_age,
+            "max_age": args.max_age,
+        }),
+        "indexed birth_year": profile(indexed_query, params),
+    }
+
+    for name, summary in results.items():
+        logger.info(
+            f"{name:>22}: {summary['db_hits']:>9} db hits, {summary['candidates']} candidates, "
+            f"plan: {' <- '.join(summary['operators'])}"
+        )
+    if results["datetime(birth_date)"]["candidates"] != results["indexed birth_year"]["candidates"]:
+        logger.warning("Candidate counts differ: users without birth_year need schema migration 5")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from ..db.database import db
+
+logger = logging.getLogger(__name__)
+
+# Match statistics kept on User nodes
+MATCH_STATISTICS = ("likes_sent", "dislikes_sent", "mutual_matches", "incoming_likes", "match_rate")
+
+# Recount of a user's match statistics from its LIKED/DISLIKED relationships (expects `u` in scope)
+_RECOUNT_MATCH_STATISTICS = """
+CALL {
+    WITH u
+    RETURN count { (u)-[:LIKED]->(:User) } AS likes_sent,
+           count { (u)-[:DISLIKED]->(:User) } AS dislikes_sent,
+           count { (u)-[:LIKED]->(o:User)-[:LIKED]->(u) } AS mutual_matches,
+           count { (o:User)-[:LIKED]->(u) WHERE NOT (u)-[:LIKED|DISLIKED]->(o) } AS incoming_likes
+}
+WITH *, CASE WHEN likes_sent > 0 THEN round(toFloat(mutual_matches) / likes_sent, 2) ELSE 0.0 END AS match_rate
+"""
+
+
+class ActivityCounters:
+    """
+    Denormalized activity counters on User nodes.
+
+    Matching reads `matches_count`, `message_count` and `avg_message_length`
+    straight off each candidate instead of expanding its MATCHED and SENT
+    relationships on every request. Writers keep the counters current:
+
+    - sending a chat message increments the sender's `message_count` and
+      `message_chars` (total content length) and recomputes
+      `avg_message_length`;
+    - creating an outgoing MATCHED relationship increments `matches_count`;
+    - a like or dislike applies deltas to the match statistics of both users
+      (`likes_sent`, `dislikes_sent`, `mutual_matches`, `incoming_likes`,
+      `match_rate`) in the transaction that records it.
+
+    Relationships written outside those paths (imports, manual edits) make the
+    counters drift, so `reconcile` recounts them from the graph in id-ordered
+    batches and rewrites only the users whose counters are wrong. It runs in
+    the background every ACTIVITY_RECONCILE_INTERVAL_SECONDS.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.scanned = 0
+        self.corrected = 0
+        self.last_run_corrected: Optional[int] = None
+
+    async def record_message(self, sender_id: str, receiver_id: str, content: str) -> bool:
+        """
+        Store a chat message and update the sender's message counters
+
+        Args:
+            sender_id: ID of the sending user
+            receiver_id: ID of the receiving user
+            content: Message text
+
+        Returns:
+            Whether both users exist and the message was stored
+        """
+        result = await db.execute_query_async(
+            """
+            MATCH (sender:User {id: $sender_id}), (receiver:User {id: $receiver_id})
+            CREATE (sender)-[r:SENT {
+                content: $content,
+                sent_at: datetime(),
+                read: false
+            }]->(receiver)
+            WITH sender, r,
+                 coalesce(sender.message_count, 0) + 1 AS message_count,
+                 coalesce(sender.message_chars, 0) + size($content) AS message_chars
+            SET sender.message_count = message_count,
+                sender.message_chars = message_chars,
+                sender.avg_message_length = toFloat(message_chars) / message_count
+            RETURN r
+            """,
+            {"sender_id": sender_id, "receiver_id": receiver_id, "content": content},
+        )
+        return bool(result)
+
+    async def record_swipe(self, user_id: str, target_id: str, interaction_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Record one like or dislike (see `record_swipes`)
+
+        Returns:
+            {"created", "is_match", **the swiping user's match statistics}, or
+            None when the target does not exist
+        """
+        batch = await self.record_swipes(user_id, [(target_id, interaction_type)])
+        item = batch["results"][0]
+        if item["status"] == "not_found":
+            return None
+        return {"created": item["status"] == "created", "is_match": item["is_match"], **batch["statistics"]}
+
+    async def record_swipes(self, user_id: str, swipes: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Record an ordered batch of likes and dislikes in one transaction
+
+        Every swipe applies its deltas to the target's match statistics, a new
+        like of a user who already liked back also creates the MATCHED
+        relationships in both directions, and the swiping user's statistics
+        are updated once with the summed deltas of the batch. Deltas only apply
+        when the relationship is new, so retried swipes are no-ops.
+
+        Args:
+            user_id: ID of the swiping user
+            swipes: (target_id, "LIKED" | "DISLIKED") pairs in swipe order
+
+        Returns:
+            {"results": per-swipe {"target_id", "action", "status", "is_match"}
+            in input order, "statistics": the swiping user's match statistics}.
+            status is "created", "unchanged" (already recorded), "duplicate"
+            (target swiped earlier in the batch) or "not_found".
+
+        Raises:
+            ValueError: If an action is not LIKED or DISLIKED
+        """
+        results: List[Dict[str, Any]] = []
+        rows: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        for index, (target_id, action) in enumerate(swipes):
+            if action not in ("LIKED", "DISLIKED"):
+                raise ValueError(f"Not a swipe: {action}")
+            results.append({"target_id": target_id, "action": action, "status": "not_found", "is_match": False})
+            # A target's relationships are only checked once per transaction, so one swipe per target
+            if target_id in seen or target_id == user_id:
+                results[-1]["status"] = "duplicate" if target_id in seen else "not_found"
+                continue
+            seen.add(target_id)
+            rows.append({"index": index, "target_id": target_id, "is_like": action == "LIKED"})
+
+        result = []
+        if rows:
+            result = await db.execute_query_async(
+                """
+                MATCH (u:User {id: $user_id})
+                UNWIND $swipes AS swipe
+                MATCH (t:User {id: swipe.target_id})
+                WITH u, t, swipe.index AS index, swipe.is_like AS is_like
+                WITH u, t, index, is_like,
+                     CASE WHEN is_like THEN EXISTS { (u)-[:LIKED]->(t) }
+                          ELSE EXISTS { (u)-[:DISLIKED]->(t) } END AS existed,
+                     EXISTS { (u)-[:LIKED|DISLIKED]->(t) } AS responded,
+                     EXISTS { (t)-[:LIKED]->(u) } AS liked_back,
+                     EXISTS { (t)-[:LIKED|DISLIKED]->(u) } AS target_responded
+                FOREACH (_ IN CASE WHEN is_like THEN [1] ELSE [] END |
+                    MERGE (u)-[r:LIKED]->(t)
+                    ON CREATE SET r.created_at = datetime()
+                    ON MATCH SET r.updated_at = datetime()
+                )
+                FOREACH (_ IN CASE WHEN is_like THEN [] ELSE [1] END |
+                    MERGE (u)-[r:DISLIKED]->(t)
+                    ON CREATE SET r.created_at = datetime()
+                    ON MATCH SET r.updated_at = datetime()
+                )
+                WITH u, t, index, NOT existed AS created, is_like, responded, liked_back, target_responded
+                WITH u, t, index, created, is_like AND liked_back AS is_match,
+                     CASE WHEN created AND is_like THEN 1 ELSE 0 END AS new_like,
+                     CASE WHEN created AND NOT is_like THEN 1 ELSE 0 END AS new_dislike,
+                     CASE WHEN created AND is_like AND liked_back THEN 1 ELSE 0 END AS new_mutual,
+                     CASE WHEN created AND NOT responded AND liked_back THEN 1 ELSE 0 END AS answered_incoming,
+                     CASE WHEN created AND is_like AND NOT target_responded THEN 1 ELSE 0 END AS new_incoming
+                SET t.mutual_matches = coalesce(t.mutual_matches, 0) + new_mutual,
+                    t.incoming_likes = coalesce(t.incoming_likes, 0) + new_incoming
+                SET t.match_rate = CASE WHEN coalesce(t.likes_sent, 0) > 0
+                        THEN round(toFloat(t.mutual_matches) / t.likes_sent, 2) ELSE 0.0 END,
+                    t.statistics_updated_at = datetime()
+                FOREACH (_ IN CASE WHEN is_match THEN [1] ELSE [] END |
+                    MERGE (u)-[r1:MATCHED]->(t)
+                    ON CREATE SET r1.created_at = datetime(), u.matches_count = coalesce(u.matches_count, 0) + 1
+                    ON MATCH SET r1.updated_at = datetime()
+                    MERGE (t)-[r2:MATCHED]->(u)
+                    ON CREATE SET r2.created_at = datetime(), t.matches_count = coalesce(t.matches_count, 0) + 1
+                    ON MATCH SET r2.updated_at = datetime()
+                )
+                WITH u,
+                     collect({index: index, created: created, is_match: is_match}) AS recorded,
+                     sum(new_like) AS new_likes,
+                     sum(new_dislike) AS new_dislikes,
+                     sum(new_mutual) AS new_mutuals,
+                     sum(answered_incoming) AS answered
+                SET u.likes_sent = coalesce(u.likes_sent, 0) + new_likes,
+                    u.dislikes_sent = coalesce(u.dislikes_sent, 0) + new_dislikes,
+                    u.mutual_matches = coalesce(u.mutual_matches, 0) + new_mutuals,
+                    u.incoming_likes = coalesce(u.incoming_likes, 0) - answered
+                SET u.match_rate = CASE WHEN u.likes_sent > 0
+                        THEN round(toFloat(u.mutual_matches) / u.likes_sent, 2) ELSE 0.0 END,
+                    u.statistics_updated_at = datetime()
+                RETURN recorded,
+                       u.likes_sent AS likes_sent, u.dislikes_sent AS dislikes_sent,
+                       u.mutual_matches AS mutual_matches, u.incoming_likes AS incoming_likes,
+                       u.match_rate AS match_rate
+                """,
+                {"user_id": user_id, "swipes": rows},
+            )
+
+        if result:
+            for item in result[0]["recorded"]:
+                results[item["index"]]["status"] = "created" if item["created"] else "unchanged"
+                results[item["index"]]["is_match"] = item["is_match"]
+            statistics = {name: result[0][name] for name in MATCH_STATISTICS}
+        else:
+            # Nothing was recorded (unknown targets only), so the statistics did not change
+            statistics = await self.get_match_statistics(user_id)
+            statistics.pop("updated_at", None)
+
+        return {"results": results, "statistics": statistics}
+
+    async def get_match_statistics(self, user_id: str) -> Dict[str, Any]:
+        """Read a user's stored match statistics (zeros for counters never written)"""
+        result = await db.execute_query_async(
+            "MATCH (u:User {id: $user_id}) RETURN u{.likes_sent, .dislikes_sent, .mutual_matches, "
+            ".incoming_likes, .match_rate, .statistics_updated_at} AS stats",
+            {"user_id": user_id},
+        )
+        stored = result[0]["stats"] if result else {}
+        statistics = {name: stored.get(name) or 0 for name in MATCH_STATISTICS}
+        statistics["match_rate"] = float(statistics["match_rate"])
+        statistics["updated_at"] = str(stored["statistics_updated_at"]) if stored.get("statistics_updated_at") else None
+        return statistics
+
+    async def recount_match_statistics(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recompute and store one user's match statistics from the graph
+
+        Args:
+            user_id: ID of the user to recount
+
+        Returns:
+            The recounted statistics, or None when the user does not exist
+        """
+        result = await db.execute_query_async(
+            "MATCH (u:User {id: $user_id})"
+            + _RECOUNT_MATCH_STATISTICS
+            + """
+            SET u.likes_sent = likes_sent,
+                u.dislikes_sent = dislikes_sent,
+                u.mutual_matches = mutual_matches,
+                u.incoming_likes = incoming_likes,
+                u.match_rate = match_rate,
+                u.statistics_updated_at = datetime()
+            RETURN likes_sent, dislikes_sent, mutual_matches, incoming_likes, match_rate
+            """,
+            {"user_id": user_id},
+        )
+        return result[0] if result else None
+
+    async def reconcile(self, batch_size: int = 500) -> int:
+        """
+        Recount every user's activity counters from the graph and fix drifted ones
+
+        Args:
+            batch_size: Number of users recounted per transaction
+
+        Returns:
+            Number of users whose counters were corrected
+        """
+        corrected = 0
+        after = ""
+        while True:
+            rows = await db.execute_query_async(
+                """
+                MATCH (u:User) WHERE u.id > $after
+                WITH u ORDER BY u.id LIMIT $batch_size
+                CALL {
+                    WITH u
+                    OPTIONAL MATCH (u)-[s:SENT]->()
+                    RETURN count(s) AS message_count, coalesce(sum(size(s.content)), 0) AS message_chars
+                }
+                WITH u, message_count, message_chars, count { (u)-[:MATCHED]->() } AS matches_count
+                """
+                + _RECOUNT_MATCH_STATISTICS
+                + """
+                WITH u, matches_count, message_count, message_chars,
+                     likes_sent, dislikes_sent, mutual_matches, incoming_likes, match_rate,
+                     coalesce(u.matches_count, -1) <> matches_count
+                     OR coalesce(u.message_count, -1) <> message_count
+                     OR coalesce(u.message_chars, -1) <> message_chars
+                     OR coalesce(u.likes_sent, -1) <> likes_sent
+                     OR coalesce(u.dislikes_sent, -1) <> dislikes_sent
+                     OR coalesce(u.mutual_matches, -1) <> mutual_matches
+                     OR coalesce(u.incoming_likes, -1) <> incoming_likes
+                     OR coalesce(u.match_rate, -1.0) <> match_rate AS drifted
+                FOREACH (_ IN CASE WHEN drifted THEN [1] ELSE [] END |
+                    SET u.matches_count = matches_count,
+                        u.message_count = message_count,
+                        u.message_chars = message_chars,
+                        u.avg_message_length = CASE message_count
+                            WHEN 0 THEN null
+                            ELSE toFloat(message_chars) / message_count
+                        END,
+                        u.likes_sent = likes_sent,
+                        u.dislikes_sent = dislikes_sent,
+                        u.mutual_matches = mutual_matches,
+                        u.incoming_likes = incoming_likes,
+                        u.match_rate = match_rate,
+                        u.statistics_updated_at = datetime()
+                )
+                RETURN max(u.id) AS last_id, count(u) AS scanned,
+                       sum(CASE WHEN drifted THEN 1 ELSE 0 END) AS corrected
+                """,
+                {"after": after, "batch_size": batch_size},
+            )
+            if not rows or not rows[0]["scanned"]:
+                break
+            corrected += rows[0]["corrected"]
+            self.scanned += rows[0]["scanned"]
+            after = rows[0]["last_id"]
+
+        self.runs += 1
+        self.corrected += corrected
+        self.last_run_corrected = corrected
+        if corrected:
+            logger.warning(f"Activity counter reconciliation corrected {corrected} users")
+        else:
+            logger.info("Activity counter reconciliation found no drift")
+        return corrected
+
+    async def reconcile_periodically(self, interval_seconds: float) -> None:
+        """Run `reconcile` now and then every interval_seconds until cancelled"""
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Activity counter reconciliation failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reconcile_runs": self.runs,
+            "users_scanned": self.scanned,
+            "users_corrected": self.corrected,
+            "last_run_corrected": self.last_run_corrected,
+        }
+
+
+# Global activity counters instance
+activity_counters = ActivityCounters()
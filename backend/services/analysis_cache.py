@@ -0,0 +1,249 @@
+from typing import Any, Callable, Dict, Optional, Set
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def raw_data_hash(raw_data: Dict[str, Any]) -> str:
+    """Stable content hash of a raw social data payload (key order independent)"""
+    payload = json.dumps(raw_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Memoizes UserMetadataAnalyzer.analyze_user_raw_data by the content hash of the raw data.
+
+    The analysis only depends on the RawBlob contents, so candidates whose social
+    data has not changed are not re-analyzed on every matching request. Entries
+    are kept in a bounded LRU and, when a directory is configured, written to disk
+    as JSON so they survive restarts; the files are pruned least recently used
+    first past the same max_entries. Random fallback traits are memoized too, which
+    keeps a user's features stable between requests.
+    """
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory or None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Keys of the persisted entries, least recently used first
+        self._disk: "OrderedDict[str, None]" = OrderedDict()
+        # Key of each user's last analysis, and the users of each key, while the key is cached
+        self._user_keys: Dict[str, str] = {}
+        self._key_users: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Analysis cache directory {self.directory} unavailable, caching in memory only: {e}")
+                self.directory = None
+        if self.directory:
+            self._disk = self._scan_directory()
+            self._prune_disk()
+
+    def get_or_compute(
+        self,
+        raw_data: Dict[str, Any],
+        compute: Callable[[Dict[str, Any]], Dict[str, Any]],
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Return the memoized analysis of raw data, computing it on a miss
+
+        Args:
+            raw_data: Raw social data of a user, organized by source
+            compute: Function analyzing the raw data
+            user_id: Owner of the raw data, so its entry can be invalidated
+
+        Returns:
+            Extracted features (shared between callers, must not be mutated)
+        """
+        key = raw_data_hash(raw_data)
+
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                self._set_user_key(user_id, key)
+                self.hits += 1
+                return features
+
+        features = self._load(key)
+        if features is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._store(key, features, user_id)
+            return features
+
+        with self._lock:
+            self.misses += 1
+        features = compute(raw_data)
+        self._store(key, features, user_id)
+        self._save(key, features)
+        return features
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop the analysis of a user's previous raw data (after a new RawBlob is stored)"""
+        with self._lock:
+            key = self._user_keys.pop(user_id, None)
+            if key is None:
+                return
+            users = self._key_users.get(key, set())
+            users.discard(user_id)
+            if users:
+                # Other users have the same raw data: their analysis stays
+                return
+            self._key_users.pop(key, None)
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+            persisted = key in self._disk
+            self._disk.pop(key, None)
+        if persisted:
+            self._remove_file(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._key_users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "disk_entries": len(self._disk),
+                "tracked_users": len(self._user_keys),
+                "persistent": self.directory is not None,
+            }
+
+    def _store(self, key: str, features: Dict[str, Any], user_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            self._set_user_key(user_id, key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if evicted not in self._disk:
+                    self._forget_key(evicted)
+                self.evictions += 1
+
+    def _set_user_key(self, user_id: Optional[str], key: str) -> None:
+        """Record the key of a user's analysis (lock held)"""
+        if not user_id:
+            return
+        previous = self._user_keys.get(user_id)
+        if previous is not None and previous != key:
+            users = self._key_users.get(previous)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._key_users[previous]
+        self._user_keys[user_id] = key
+        self._key_users.setdefault(key, set()).add(user_id)
+
+    def _forget_key(self, key: str) -> None:
+        """Drop the user mappings of a key leaving the cache (lock held)"""
+        for user_id in self._key_users.pop(key, ()):
+            self._user_keys.pop(user_id, None)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan_directory(self) -> "OrderedDict[str, None]":
+        """Persisted keys, oldest file first"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as listing:
+                for entry in listing:
+                    if entry.name.endswith(".json"):
+                        try:
+                            entries.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+                        except OSError:
+                            pass
+        except OSError as e:
+            logger.warning(f"Could not list analysis cache directory {self.directory}: {e}")
+        return OrderedDict((key, None) for _, key in sorted(entries))
+
+    def _prune_disk(self) -> None:
+        """Delete the least recently used files past max_entries"""
+        with self._lock:
+            pruned = []
+            while len(self._disk) > self.max_entries:
+                key, _ = self._disk.popitem(last=False)
+                if key not in self._entries:
+                    self._forget_key(key)
+                pruned.append(key)
+        for key in pruned:
+            self._remove_file(key)
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                features = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._disk.pop(key, None)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable analysis cache entry {key}: {e}")
+            return None
+        with self._lock:
+            # Also files written by another process sharing the directory
+            self._disk[key] = None
+            self._disk.move_to_end(key)
+        return features
+
+    def _save(self, key: str, features: Dict[str, Any]) -> None:
+        if not self.directory:
+            return
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(features, f)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not persist analysis cache entry {key}: {e}")
+            return
+        with self._lock:
+            self._disk[key] = None
+            self._disk.move_to_end(key)
+        self._prune_disk()
+
+
+# Global analysis cache instance
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    directory=settings.ANALYSIS_CACHE_DIR,
+)
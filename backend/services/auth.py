@@ -116,7 +116,7 @@ async def get_current_user(
     MATCH (u:User {email:$email})
     RETURN u
     """
-    result = db.execute_query(query, {"email": token_data.email})
+    result = await db.execute_query_async(query, {"email": token_data.email})
     if not result:
         raise credentials_exception
 
@@ -0,0 +1,78 @@
+from typing import Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundReload:
+    """
+    Single-flight reloads of an in-process copy of Neo4j data.
+
+    Subclasses implement `_load` (a full rebuild returning the number of
+    loaded users) and `refresh_seconds`. Concurrent loads share one in-flight
+    task, so requests racing the startup load wait for it instead of starting
+    their own full scan. Once loaded, a copy older than refresh_seconds is
+    rebuilt by a background task while requests keep reading the stale copy:
+    no request pays for a rebuild. A failed background rebuild is retried
+    refresh_seconds after it started.
+    """
+
+    _loaded_at: Optional[float] = None
+    _load_task: Optional[asyncio.Task] = None
+    _load_started_at: Optional[float] = None
+
+    @property
+    def refresh_seconds(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    async def _load(self) -> int:
+        raise NotImplementedError
+
+    async def load(self) -> int:
+        """
+        (Re)build now, or wait for the rebuild already in flight
+
+        Returns:
+            Number of loaded users
+        """
+        # Shielded: a cancelled request must not cancel a load other callers share
+        return await asyncio.shield(self.reload())
+
+    def reload(self) -> asyncio.Task:
+        """Start a rebuild in the background unless one is in flight, and return its task"""
+        loop = asyncio.get_running_loop()
+        task = self._load_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._load_started_at = time.monotonic()
+            task = loop.create_task(self._load())
+            task.add_done_callback(self._load_done)
+            self._load_task = task
+        return task
+
+    async def ensure_loaded(self, wait: bool = True) -> None:
+        """
+        Load the copy if it was never loaded, and refresh it in the background when stale
+
+        Args:
+            wait: Wait for the first load; otherwise it is only started
+        """
+        if self._loaded_at is None and wait:
+            await self.load()
+        elif self.is_stale and (
+            self._load_started_at is None or time.monotonic() - self._load_started_at > self.refresh_seconds
+        ):
+            self.reload()
+
+    def _load_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"{type(self).__name__} reload failed: {task.exception()}")
@@ -0,0 +1,186 @@
+from typing import Any, Container, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import base64
+import binascii
+import logging
+import threading
+import time
+import uuid
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class InvalidCursor(ValueError):
+    """Raised when a deck cursor cannot be decoded"""
+
+
+class _Deck:
+    __slots__ = ("deck_id", "items", "expires_at")
+
+    def __init__(self, deck_id: str, items: List[Any], expires_at: float):
+        self.deck_id = deck_id
+        self.items = items
+        self.expires_at = expires_at
+
+
+def encode_cursor(deck_id: str, offset: int) -> str:
+    """Opaque cursor pointing at a position in a stored deck"""
+    return base64.urlsafe_b64encode(f"{deck_id}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        (deck_id, offset)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        deck_id, offset = decoded.split(":")
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid deck cursor: {cursor!r}") from e
+    if offset < 0:
+        raise InvalidCursor(f"Invalid deck cursor: {cursor!r}")
+    return deck_id, offset
+
+
+class DeckStore:
+    """
+    Server-side store of ranked recommendation decks, paged by cursor.
+
+    A deck is ranked once (DECK_SIZE users) and kept per user; clients page
+    through it with the opaque cursor returned by each page, so swiping costs a
+    lookup per page instead of a re-rank. Swipes do not invalidate a deck:
+    profiles in the user's seen-set are skipped while a page is read. A deck is
+    dropped when the user's profile or preferences change, after DECK_TTL_SECONDS,
+    or when the least recently used decks are evicted past DECK_MAX_USERS; a
+    cursor into a dropped deck then starts a freshly ranked one.
+    """
+
+    def __init__(self, ttl_seconds: float, max_users: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._decks: "OrderedDict[str, _Deck]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.builds = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def current(self, user_id: str) -> Optional[str]:
+        """Id of the user's live deck, or None"""
+        with self._lock:
+            deck = self._live(user_id)
+            return deck.deck_id if deck is not None else None
+
+    def store(self, user_id: str, items: List[Any]) -> str:
+        """
+        Store a newly ranked deck for a user, replacing the previous one
+
+        Args:
+            user_id: ID of the user the deck was ranked for
+            items: Ranked items, best first
+
+        Returns:
+            Id of the new deck
+        """
+        deck_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._decks[user_id] = _Deck(deck_id, list(items), time.monotonic() + self.ttl_seconds)
+            self._decks.move_to_end(user_id)
+            self.builds += 1
+            while len(self._decks) > self.max_users:
+                self._decks.popitem(last=False)
+                self.evictions += 1
+        return deck_id
+
+    def page(
+        self,
+        user_id: str,
+        deck_id: str,
+        offset: int,
+        size: int,
+        exclude: Optional[Container[str]] = None,
+        key: str = "id",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read a page of a stored deck
+
+        Args:
+            user_id: ID of the user paging the deck
+            deck_id: Id of the deck the cursor points into
+            offset: Position in the deck to read from
+            size: Maximum number of items to return
+            exclude: Ids to skip (the user's seen-set)
+            key: Attribute or key holding an item's user id
+
+        Returns:
+            {"items", "next_cursor", "remaining"}, or None when the deck is gone
+            (invalidated, expired, replaced) or exhausted and must be re-ranked
+        """
+        with self._lock:
+            deck = self._live(user_id)
+            if deck is None or deck.deck_id != deck_id or offset >= len(deck.items):
+                return None
+            self._decks.move_to_end(user_id)
+            self.pages += 1
+
+            items = []
+            position = offset
+            while position < len(deck.items) and len(items) < size:
+                item = deck.items[position]
+                position += 1
+                item_id = item.get(key) if isinstance(item, dict) else getattr(item, key)
+                if exclude is None or item_id not in exclude:
+                    items.append(item)
+
+            remaining = len(deck.items) - position
+            return {
+                "items": items,
+                "next_cursor": encode_cursor(deck_id, position) if items or remaining else None,
+                "remaining": remaining,
+            }
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop a user's deck (after a profile or preference change)"""
+        with self._lock:
+            if self._decks.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._decks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "decks": len(self._decks),
+                "items": sum(len(deck.items) for deck in self._decks.values()),
+                "builds": self.builds,
+                "pages": self.pages,
+                "pages_per_build": round(self.pages / self.builds, 2) if self.builds else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _live(self, user_id: str) -> Optional[_Deck]:
+        deck = self._decks.get(user_id)
+        if deck is not None and deck.expires_at <= time.monotonic():
+            del self._decks[user_id]
+            return None
+        return deck
+
+
+# Global deck store instance
+deck_store = DeckStore(
+    ttl_seconds=settings.DECK_TTL_SECONDS,
+    max_users=settings.DECK_MAX_USERS,
+)
@@ -0,0 +1,303 @@
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from ..core.config import get_settings
+from ..db.database import db
+from .analysis_cache import analysis_cache, raw_data_hash
+from .geo_index import parse_coordinates
+from .ml_executor import ml_executor
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Bump when the shape or derivation of a feature record changes; older records are recomputed
+FEATURE_VERSION = 1
+
+# Fields produced by UserMetadataAnalyzer.analyze_user_raw_data, merged over the User node for scoring
+ANALYSIS_FIELDS = (
+    "interests",
+    "topics",
+    "personality_traits",
+    "activity_level",
+    "communication_style",
+    "relationship_preferences",
+)
+
+
+def analysis_features(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The analyzed social features of a feature record, as merged over the User node for scoring"""
+    if not record:
+        return {}
+    return {field: record[field] for field in ANALYSIS_FIELDS if field in record}
+
+
+class FeatureStore:
+    """
+    Materialized per-user matching features.
+
+    Matching used to re-derive a user's features (analyzed interests and traits,
+    activity and completeness scores, cluster id, coordinates) from the User node
+    and its RawBlobs on every request. The feature store computes them once on
+    write (registration, profile update, social ingest) into a versioned JSON
+    record on a (:UserFeatures) node, and readers fetch the records of a whole
+    candidate set in one query. Missing or outdated records are computed on read,
+    and `backfill` fills them in for existing users. Recently read records are
+    kept in process for FEATURE_STORE_CACHE_SECONDS.
+    """
+
+    def __init__(self, cache_seconds: float, max_cached: int):
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._cluster_model = None
+        self._cluster_model_loaded = False
+        self.reads = 0
+        self.computed = 0
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the feature record of a user, computing it if missing or outdated"""
+        records = await self.get_many([user_id])
+        return records.get(user_id)
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the feature records of many users in one round-trip
+
+        Args:
+            user_ids: IDs of the users to read features for
+
+        Returns:
+            Dictionary mapping each existing user ID to its feature record
+        """
+        records: Dict[str, Dict[str, Any]] = {}
+        to_fetch = []
+        for user_id in dict.fromkeys(user_ids):
+            record = self.get_cached(user_id)
+            if record is not None:
+                records[user_id] = record
+            else:
+                to_fetch.append(user_id)
+
+        if to_fetch:
+            result = await db.execute_query_async(
+                """
+                UNWIND $user_ids AS user_id
+                MATCH (f:UserFeatures {user_id: user_id})
+                WHERE f.version = $version
+                RETURN user_id, f.data AS data
+                """,
+                {"user_ids": to_fetch, "version": FEATURE_VERSION},
+            )
+            for row in result:
+                record = json.loads(row["data"])
+                records[row["user_id"]] = record
+                self._remember(row["user_id"], record)
+            self.reads += len(to_fetch)
+
+            missing = [user_id for user_id in to_fetch if user_id not in records]
+            if missing:
+                records.update(await self.refresh_users(missing))
+
+        return records
+
+    def get_cached(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a user's feature record if it was read recently in this process"""
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is None:
+                return None
+            record, stored_at = cached
+            if time.monotonic() - stored_at > self.cache_seconds:
+                del self._cache[user_id]
+                return None
+            self._cache.move_to_end(user_id)
+            return record
+
+    async def refresh_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Recompute and persist the feature record of a user (after a profile or social data write)"""
+        records = await self.refresh_users([user_id])
+        return records.get(user_id)
+
+    async def refresh_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Recompute and persist the feature records of many users
+
+        Args:
+            user_ids: IDs of the users to recompute
+
+        Returns:
+            Dictionary mapping each existing user ID to its new feature record
+        """
+        if not user_ids:
+            return {}
+
+        # Import here to avoid circular imports
+        from ..db.neo4j_client import get_raw_interests_for_users
+        from ..ml.matching_service import matching_service
+
+        try:
+            users = await db.execute_query_async(
+                "UNWIND $user_ids AS user_id MATCH (u:User {id: user_id}) RETURN u",
+                {"user_ids": list(user_ids)},
+            )
+            users = [row["u"] for row in users]
+            raw_by_user = await get_raw_interests_for_users([user["id"] for user in users])
+
+            def build_records() -> Dict[str, Dict[str, Any]]:
+                built = {}
+                for user in users:
+                    # One malformed profile must not cost the rest of the batch its records
+                    try:
+                        raw_data = raw_by_user[user["id"]]
+                        analysis = analysis_cache.get_or_compute(
+                            raw_data, matching_service.metadata_analyzer.analyze_user_raw_data, user_id=user["id"]
+                        )
+                        built[user["id"]] = self.build_record(user, analysis, raw_data_hash(raw_data))
+                    except Exception as e:
+                        logger.error(f"Error computing features for user {user['id']}: {str(e)}")
+                return built
+
+            # Analysis is CPU-bound: keep it off the event loop
+            records = await ml_executor.run_thread(build_records)
+
+            if records:
+                await db.execute_query_async(
+                    """
+                    UNWIND $records AS record
+                    MATCH (u:User {id: record.user_id})
+                    MERGE (u)-[:HAS_FEATURES]->(f:UserFeatures {user_id: record.user_id})
+                    SET f.version = $version, f.data = record.data, f.updated_at = datetime()
+                    """,
+                    {
+                        "records": [
+                            {"user_id": user_id, "data": json.dumps(record)}
+                            for user_id, record in records.items()
+                        ],
+                        "version": FEATURE_VERSION,
+                    },
+                )
+                for user_id, record in records.items():
+                    self._remember(user_id, record)
+                self.computed += len(records)
+
+                # Every profile write ends here: keep the columnar snapshot current
+                # (also while it is first loaded, so the load can re-apply the writes it missed)
+                from .user_snapshot import user_snapshot
+                for user in users:
+                    user_snapshot.update_user(user, records.get(user["id"]))
+
+            return records
+        except Exception as e:
+            logger.error(f"Error refreshing features for {len(user_ids)} users: {str(e)}")
+            return {}
+
+    def build_record(self, user: Dict[str, Any], analysis: Dict[str, Any], raw_hash: str) -> Dict[str, Any]:
+        """
+        Assemble the feature record of a user
+
+        Args:
+            user: User node properties
+            analysis: Output of UserMetadataAnalyzer.analyze_user_raw_data for the user's raw data
+            raw_hash: Content hash of the raw data the analysis was computed from
+
+        Returns:
+            Versioned feature record
+        """
+        # Import here to avoid circular imports
+        from ..ml.models.user_metadata import compute_profile_features
+
+        record = {"version": FEATURE_VERSION, "user_id": user.get("id")}
+        for field in ANALYSIS_FIELDS:
+            if field in analysis:
+                record[field] = analysis[field]
+
+        record.update(compute_profile_features(user))
+        record["cluster"] = self._predict_cluster(user)
+
+        coordinates = parse_coordinates(user.get("latitude"), user.get("longitude"))
+        if coordinates is not None:
+            record["coordinates"] = {"latitude": coordinates[0], "longitude": coordinates[1]}
+        else:
+            record["coordinates"] = None
+
+        record["raw_data_hash"] = raw_hash
+        record["updated_at"] = datetime.now().isoformat()
+        return record
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget the in-process copy of a user's record"""
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    async def backfill(self, batch_size: int = 200) -> int:
+        """
+        Compute feature records for every user without an up-to-date one
+
+        Args:
+            batch_size: Number of users recomputed per round-trip
+
+        Returns:
+            Number of records written
+        """
+        written = 0
+        while True:
+            rows = await db.execute_query_async(
+                """
+                MATCH (u:User) WHERE u.id IS NOT NULL
+                OPTIONAL MATCH (u)-[:HAS_FEATURES]->(f:UserFeatures)
+                WITH u, f WHERE f IS NULL OR f.version <> $version
+                RETURN u.id AS id
+                LIMIT $batch_size
+                """,
+                {"version": FEATURE_VERSION, "batch_size": batch_size},
+            )
+            if not rows:
+                break
+            records = await self.refresh_users([row["id"] for row in rows])
+            if not records:
+                logger.warning("Feature backfill stopped: a batch could not be computed")
+                break
+            written += len(records)
+        logger.info(f"Feature backfill wrote {written} records")
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = len(self._cache)
+        return {"version": FEATURE_VERSION, "cached": cached, "reads": self.reads, "computed": self.computed}
+
+    def _remember(self, user_id: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[user_id] = (record, time.monotonic())
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _predict_cluster(self, user: Dict[str, Any]) -> Optional[int]:
+        """Cluster id from the trained metadata analyzer, or None when no model is available"""
+        if not self._cluster_model_loaded:
+            self._cluster_model_loaded = True
+            try:
+                # Import here to avoid circular imports
+                from ..ml.models.user_metadata import UserMetadataAnalyzer
+                path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ml", "models", "metadata_analyzer.joblib")
+                self._cluster_model = UserMetadataAnalyzer.load_model(path)
+            except Exception as e:
+                logger.info(f"No trained metadata analyzer available, feature records have no cluster: {e}")
+        if self._cluster_model is None:
+            return None
+        return self._cluster_model.analyze_user(user).get("cluster")
+
+
+# Global feature store instance
+feature_store = FeatureStore(
+    cache_seconds=settings.FEATURE_STORE_CACHE_SECONDS,
+    max_cached=settings.FEATURE_STORE_MAX_CACHED,
+)
@@ -0,0 +1,266 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import json
+import logging
+import math
+import threading
+import time
+
+from ..core.config import get_settings
+from ..db.database import db
+from .background_reload import BackgroundReload
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EARTH_RADIUS_KM = 6371.0
+
+# Name of the point index created by schema migration 4
+POINT_INDEX_NAME = "user_location_point"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers between two WGS-84 coordinates"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coordinates(latitude: Any, longitude: Any) -> Optional[Tuple[float, float]]:
+    """
+    Parse stored latitude/longitude values (RandomUser stores them as strings)
+
+    Returns:
+        (latitude, longitude) floats, or None when missing or out of range
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        return None
+    return latitude, longitude
+
+
+def search_radius_km(preferences: Any) -> Optional[float]:
+    """
+    Candidate search radius of a user
+
+    Args:
+        preferences: The user's stored preferences (dict, JSON string or None)
+
+    Returns:
+        The preferred max_distance in km, else MATCH_DEFAULT_RADIUS_KM, or None when unbounded
+    """
+    if isinstance(preferences, str):
+        try:
+            preferences = json.loads(preferences)
+        except ValueError:
+            preferences = None
+    max_distance = preferences.get("max_distance") if isinstance(preferences, dict) else None
+    radius = max_distance or settings.MATCH_DEFAULT_RADIUS_KM
+    return float(radius) if radius and radius > 0 else None
+
+
+class GeoIndex(BackgroundReload):
+    """
+    Radius-bounded candidate retrieval.
+
+    Candidate queries restrict users to a search radius with a `point.distance`
+    predicate served by the `user_location_point` point index. When that index
+    is not online (migration not applied yet, or a server without point index
+    support), the radius is answered from an in-process grid instead: users are
+    bucketed into equal-angle cells (the cells of a precision-3 geohash, about
+    156 km wide at the equator), a query only visits the cells overlapping the
+    radius' bounding box, and the query runs on the matching user ids.
+    """
+
+    def __init__(self, cell_degrees: float = 1.40625):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._coordinates: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._point_index_ready: Optional[bool] = None
+        self._point_index_checked_at = 0.0
+        self.point_queries = 0
+        self.grid_queries = 0
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.GEO_INDEX_REFRESH_SECONDS
+
+    def __len__(self) -> int:
+        return len(self._coordinates)
+
+    async def _load(self) -> int:
+        """(Re)build the grid from the coordinates of every User node in Neo4j"""
+        records = await db.execute_query_async(
+            """
+            MATCH (u:User) WHERE u.id IS NOT NULL AND u.latitude IS NOT NULL AND u.longitude IS NOT NULL
+            RETURN u.id AS id, u.latitude AS latitude, u.longitude AS longitude
+            """
+        )
+
+        cells: Dict[Tuple[int, int], Set[str]] = {}
+        coordinates: Dict[str, Tuple[float, float]] = {}
+        for record in records:
+            point = parse_coordinates(record["latitude"], record["longitude"])
+            if point is None:
+                continue
+            coordinates[record["id"]] = point
+            cells.setdefault(self._cell(*point), set()).add(record["id"])
+
+        with self._lock:
+            self._cells = cells
+            self._coordinates = coordinates
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Geo index loaded with {len(coordinates)} located users in {len(cells)} cells")
+        return len(coordinates)
+
+    def update_user(self, user_id: str, latitude: Any, longitude: Any) -> None:
+        """Insert, move or (without valid coordinates) drop a user in the grid"""
+        if not user_id:
+            return
+        point = parse_coordinates(latitude, longitude)
+        with self._lock:
+            self._remove(user_id)
+            if point is not None:
+                self._coordinates[user_id] = point
+                self._cells.setdefault(self._cell(*point), set()).add(user_id)
+
+    def remove_user(self, user_id: str) -> None:
+        """Drop a user from the grid"""
+        with self._lock:
+            self._remove(user_id)
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        exclude_id: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Users within a radius of a point, nearest first
+
+        Args:
+            latitude: Latitude of the center
+            longitude: Longitude of the center
+            radius_km: Search radius in kilometers
+            exclude_id: User to leave out (usually the searching user)
+
+        Returns:
+            List of (user_id, distance_km) tuples sorted by distance
+        """
+        lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+        min_lat, max_lat = latitude - lat_span, latitude + lat_span
+        columns = int(round(360.0 / self.cell_degrees))
+        cos_lat = math.cos(math.radians(min(89.9, max(abs(min_lat), abs(max_lat)))))
+        if max_lat >= 90.0 or min_lat <= -90.0 or lat_span / cos_lat >= 180.0:
+            # The box reaches a pole or wraps the globe: every column
+            lon_cells = range(columns)
+        else:
+            lon_span = lat_span / cos_lat
+            first = math.floor((longitude - lon_span + 180.0) / self.cell_degrees)
+            last = math.floor((longitude + lon_span + 180.0) / self.cell_degrees)
+            lon_cells = sorted({column % columns for column in range(first, last + 1)})
+        lat_cells = range(
+            math.floor((max(-90.0, min_lat) + 90.0) / self.cell_degrees),
+            math.floor((min(90.0, max_lat) + 90.0) / self.cell_degrees) + 1,
+        )
+
+        results = []
+        with self._lock:
+            for row in lat_cells:
+                for column in lon_cells:
+                    for user_id in self._cells.get((row, column), ()):
+                        if user_id == exclude_id:
+                            continue
+                        other_lat, other_lon = self._coordinates[user_id]
+                        distance = haversine_km(latitude, longitude, other_lat, other_lon)
+                        if distance <= radius_km:
+                            results.append((user_id, distance))
+        results.sort(key=lambda item: item[1])
+        return results
+
+    async def point_index_ready(self) -> bool:
+        """Whether the Neo4j point index is online (checked at most every GEO_INDEX_REFRESH_SECONDS)"""
+        now = time.monotonic()
+        if self._point_index_ready is None or now - self._point_index_checked_at > settings.GEO_INDEX_REFRESH_SECONDS:
+            try:
+                rows = await db.execute_query_async(
+                    "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state",
+                    {"name": POINT_INDEX_NAME},
+                )
+                self._point_index_ready = bool(rows) and rows[0]["state"] == "ONLINE"
+            except Exception as e:
+                logger.warning(f"Could not check the point index, using the in-process geo index: {e}")
+                self._point_index_ready = False
+            self._point_index_checked_at = now
+        return self._point_index_ready
+
+    async def radius_filter(
+        self,
+        variable: str,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        exclude_id: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Cypher predicate restricting a user variable to a search radius
+
+        Args:
+            variable: Name of the (:User) variable in the query
+            latitude: Latitude of the center
+            longitude: Longitude of the center
+            radius_km: Search radius in kilometers
+            exclude_id: User to leave out of the in-process lookup
+
+        Returns:
+            (predicate, parameters) to AND into the query's WHERE clause
+        """
+        if await self.point_index_ready():
+            self.point_queries += 1
+            return (
+                f"point.distance({variable}.location_point, "
+                "point({latitude: $geo_latitude, longitude: $geo_longitude})) <= $geo_radius_m",
+                {"geo_latitude": latitude, "geo_longitude": longitude, "geo_radius_m": radius_km * 1000.0},
+            )
+
+        await self.ensure_loaded()
+        self.grid_queries += 1
+        nearby = self.within(latitude, longitude, radius_km, exclude_id=exclude_id)
+        return f"{variable}.id IN $geo_ids", {"geo_ids": [user_id for user_id, _ in nearby]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "located_users": len(self._coordinates),
+                "cells": len(self._cells),
+                "point_index_ready": self._point_index_ready,
+                "point_queries": self.point_queries,
+                "grid_queries": self.grid_queries,
+            }
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        columns = int(round(360.0 / self.cell_degrees))
+        row = math.floor((latitude + 90.0) / self.cell_degrees)
+        column = math.floor((longitude + 180.0) / self.cell_degrees) % columns
+        return row, column
+
+    def _remove(self, user_id: str) -> None:
+        point = self._coordinates.pop(user_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self._cells[cell]
+
+
+# Global geo index instance
+geo_index = GeoIndex()
@@ -0,0 +1,197 @@
+from typing import Any, Container, Dict, Iterable, List, Optional, Set
+from decimal import Decimal, ROUND_HALF_UP
+import heapq
+import logging
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..core.interest_bitmask import interest_mask, popcount
+from ..db.database import db
+from .background_reload import BackgroundReload
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def cypher_round(value: float, places: int = 2) -> float:
+    """Round half-up like Cypher's round(value, places) (Python's round() is half-even)"""
+    return float(Decimal(repr(value)).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP))
+
+
+class InterestIndex(BackgroundReload):
+    """
+    In-process inverted index from interest to the ids of the users holding it.
+
+    Jaccard recommendations only need to look at users sharing at least one
+    interest with the caller, so a query merges the caller's posting lists
+    instead of scanning every User node. The index is loaded from Neo4j on first
+    use, updated on registration / profile update, and fully rebuilt in the
+    background every INTEREST_INDEX_REFRESH_SECONDS to pick up writes made by
+    other workers.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._interests: Dict[str, List[str]] = {}
+        # Interest bitmasks (None when a user's interests have no mask)
+        self._masks: Dict[str, Optional[int]] = {}
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.INTEREST_INDEX_REFRESH_SECONDS
+
+    def __len__(self) -> int:
+        return len(self._interests)
+
+    async def _load(self) -> int:
+        """(Re)build the index from every User node in Neo4j"""
+        records = await db.execute_query_async(
+            "MATCH (u:User) WHERE u.id IS NOT NULL RETURN u.id AS id, u.interests AS interests"
+        )
+
+        postings: Dict[str, Set[str]] = {}
+        interests_by_user: Dict[str, List[str]] = {}
+        masks: Dict[str, Optional[int]] = {}
+        for record in records:
+            interests = list(record["interests"] or [])
+            interests_by_user[record["id"]] = interests
+            masks[record["id"]] = interest_mask(interests)
+            for interest in set(interests):
+                postings.setdefault(interest, set()).add(record["id"])
+
+        with self._lock:
+            self._postings = postings
+            self._interests = interests_by_user
+            self._masks = masks
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Interest index loaded with {len(interests_by_user)} users and {len(postings)} interests")
+        return len(interests_by_user)
+
+    def get_interests(self, user_id: str) -> Optional[List[str]]:
+        """Return the indexed interests of a user, or None if the user is not indexed"""
+        with self._lock:
+            interests = self._interests.get(user_id)
+            return list(interests) if interests is not None else None
+
+    def update_user(self, user_id: str, interests: Optional[Iterable[str]]) -> None:
+        """Insert or replace a user's interests in the index"""
+        if not user_id:
+            return
+        interests = list(interests or [])
+        with self._lock:
+            self._remove_postings(user_id)
+            self._interests[user_id] = interests
+            self._masks[user_id] = interest_mask(interests)
+            for interest in set(interests):
+                self._postings.setdefault(interest, set()).add(user_id)
+
+    def remove_user(self, user_id: str) -> None:
+        """Drop a user from the index"""
+        with self._lock:
+            self._remove_postings(user_id)
+            self._interests.pop(user_id, None)
+            self._masks.pop(user_id, None)
+
+    def _remove_postings(self, user_id: str) -> None:
+        for interest in set(self._interests.get(user_id, [])):
+            posting = self._postings.get(interest)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._postings[interest]
+
+    def top_k(
+        self,
+        user_id: str,
+        interests: List[str],
+        k: int = 10,
+        exclude: Optional[Container[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Exact top-k Jaccard neighbours of a user over interests
+
+        Mirrors the recommendation Cypher: shared interests keep the caller's
+        order, the union counts list sizes, and ties on similarity are broken
+        by the number of shared interests. Candidates whose interests have a
+        bitmask are scored with one vectorized popcount; the others compare
+        lists. When fewer than k users share an interest the result is padded
+        with zero-similarity users.
+
+        Args:
+            user_id: ID of the user to exclude from the results
+            interests: The user's interests
+            k: Number of neighbours to return
+            exclude: Users to leave out before scoring (e.g. the user's seen-set)
+
+        Returns:
+            List of {"id", "shared_interests", "similarity"} dicts, best first
+        """
+        interests = list(interests or [])
+        with self._lock:
+            candidate_ids: Set[str] = set()
+            for interest in set(interests):
+                candidate_ids |= self._postings.get(interest, set())
+            candidate_ids.discard(user_id)
+            if exclude is not None:
+                candidate_ids = {candidate_id for candidate_id in candidate_ids if candidate_id not in exclude}
+
+            # A mask only exists for duplicate-free lists inside the vocabulary,
+            # so popcounts reproduce the list arithmetic exactly
+            user_mask = interest_mask(interests)
+            masked = []
+            if user_mask is not None:
+                masked = [candidate_id for candidate_id in candidate_ids if self._masks.get(candidate_id) is not None]
+
+            mask_scores = {}
+            if masked:
+                masks = np.fromiter((self._masks[candidate_id] for candidate_id in masked), dtype=np.int64, count=len(masked))
+                shared_counts = popcount(masks & user_mask)
+                union_sizes = len(interests) + popcount(masks) - shared_counts
+                jaccards = shared_counts / np.maximum(union_sizes, 1)
+                mask_scores = dict(zip(masked, zip(jaccards.tolist(), shared_counts.tolist())))
+
+            # Scored in candidate order so ties keep the order they had before
+            scored = []
+            for candidate_id in candidate_ids:
+                if candidate_id in mask_scores:
+                    jaccard, shared_count = mask_scores[candidate_id]
+                else:
+                    candidate_interests = self._interests.get(candidate_id, [])
+                    candidate_set = set(candidate_interests)
+                    shared_count = sum(1 for i in interests if i in candidate_set)
+                    union_size = len(interests) + len(candidate_interests) - shared_count
+                    jaccard = shared_count / union_size if union_size else 0.0
+                scored.append((jaccard, shared_count, candidate_id))
+
+            top = heapq.nlargest(k, scored, key=lambda item: (item[0], item[1]))
+            results = []
+            for jaccard, _, candidate_id in top:
+                candidate_set = set(self._interests.get(candidate_id, []))
+                results.append({
+                    "id": candidate_id,
+                    "shared_interests": [i for i in interests if i in candidate_set],
+                    "similarity": cypher_round(jaccard),
+                })
+
+            if len(results) < k:
+                for other_id in self._interests:
+                    if len(results) >= k:
+                        break
+                    if (
+                        other_id != user_id
+                        and other_id not in candidate_ids
+                        and (exclude is None or other_id not in exclude)
+                    ):
+                        results.append({"id": other_id, "shared_interests": [], "similarity": 0.0})
+
+        return results
+
+
+# Global interest index instance
+interest_index = InterestIndex()
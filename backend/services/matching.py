@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import requests
 
@@ -6,6 +6,7 @@ from backend.db.neo4j_client import RANDOM_USER_API
 from ..models.user import UserInDB, UserPreferences
 from ..db.database import db
 from .ml_integration import ml_service
+from .geo_index import geo_index, parse_coordinates, search_radius_km
 import numpy as np
 from datetime import datetime, timedelta
 import os
@@ -18,6 +19,54 @@ def calculate_age(birth_date: datetime) -> int:
         age -= 1
     return age
 
+def birth_year_of(birth_date: Any) -> Optional[int]:
+    """Year of a birth date given as a datetime/date or an ISO string (as RandomUser returns it)"""
+    if birth_date is None:
+        return None
+    if hasattr(birth_date, "year"):
+        return int(birth_date.year)
+    try:
+        return int(str(birth_date)[:4])
+    except ValueError:
+        return None
+
+def build_preference_filter(
+    preferences: UserPreferences,
+    variable: str = "u",
+    today: Optional[datetime] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build index-backed Cypher predicates for a user's matching preferences
+
+    The age range is compared on the denormalized `birth_year` property, so
+    `is_active`, `gender` and `birth_year` are all plain property predicates
+    that the (is_active, gender, birth_year) composite index can serve instead
+    of converting every node's birth_date to a datetime. Ages are compared by
+    year, the same as `datetime(birth_date).year <= datetime().year - min_age`.
+
+    Args:
+        preferences: The searching user's preferences
+        variable: Name of the (:User) variable in the query
+        today: Reference date for the age range (defaults to now)
+
+    Returns:
+        (predicates, parameters); the predicates start with "AND" and can be
+        appended to an existing WHERE clause
+    """
+    current_year = (today or datetime.now()).year
+    predicates = [f"AND {variable}.is_active = true"]
+    params: Dict[str, Any] = {
+        "min_birth_year": current_year - preferences.max_age,
+        "max_birth_year": current_year - preferences.min_age,
+    }
+    
+    if preferences.preferred_gender:
+        predicates.append(f"AND {variable}.gender IN $preferred_gender")
+        params["preferred_gender"] = [g.value for g in preferences.preferred_gender]
+    
+    predicates.append(f"AND {variable}.birth_year >= $min_birth_year AND {variable}.birth_year <= $max_birth_year")
+    return "\n".join(predicates) + "\n", params
+
 def calculate_interest_similarity(user_interests: List[str], candidate_interests: List[str]) -> float:
     if not user_interests or not candidate_interests:
         return 0.0
@@ -32,7 +81,7 @@ def calculate_interest_similarity(user_interests: List[str], candidate_interests
     
     return intersection / union if union > 0 else 0.0
 
-def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -> List[Dict[str, Any]]:
+async def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -> List[Dict[str, Any]]:
     # Check if in superadmin mode
     superadmin_mode = os.getenv("SUPERADMIN_MODE", "False").lower() == "true"
     
@@ -40,38 +89,33 @@ def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -
         # Generate mock matches data
         return generate_mock_matches(limit)
         
-    user_age = calculate_age(user.birth_date)
-    
-    # Build the Cypher query based on preferences
+    # Build the Cypher query with the preferences pushed down into indexed predicates
     query = """
     MATCH (u:User)
     WHERE u.email <> $email
-    AND u.is_active = true
     """
     
     params = {"email": user.email}
     
-    # Add gender preference filter if specified
-    if preferences.preferred_gender:
-        query += "AND u.gender IN $preferred_gender "
-        params["preferred_gender"] = [g.value for g in preferences.preferred_gender]
+    preference_filter, preference_params = build_preference_filter(preferences)
+    query += preference_filter
+    params.update(preference_params)
     
-    # Add age range filter
-    query += """
-    AND datetime(u.birth_date).year <= datetime().year - $min_age
-    AND datetime(u.birth_date).year >= datetime().year - $max_age
-    """
-    params.update({
-        "min_age": preferences.min_age,
-        "max_age": preferences.max_age
-    })
+    # Only load users within max_distance (or the default search radius) of a located user
+    radius_km = search_radius_km(preferences.dict())
+    if radius_km is not None:
+        me = await db.execute_query_async(
+            "MATCH (me:User {email: $email}) RETURN me.latitude AS latitude, me.longitude AS longitude",
+            {"email": user.email},
+        )
+        origin = parse_coordinates(me[0]["latitude"], me[0]["longitude"]) if me else None
+        if origin is not None:
+            predicate, geo_params = await geo_index.radius_filter("u", *origin, radius_km, exclude_id=user.id)
+            query += f"AND {predicate}\n"
+            params.update(geo_params)
     
-    # Get potential matches
+    # Get potential matches with their denormalized activity counters
     query += """
-    WITH u,
-         count { (u)-[:MATCHED]->() } as matches_count,
-         count { (u)-[:SENT]->() } as message_count,
-         avg(size((u)-[:SENT]->().content)) as avg_message_length
     RETURN {
         id: u.id,
         email: u.email,
@@ -83,9 +127,9 @@ def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -
         interests: u.interests,
         location: u.location,
         profile_photo: u.profile_photo,
-        matches_count: matches_count,
-        message_count: message_count,
-        avg_message_length: avg_message_length,
+        matches_count: coalesce(u.matches_count, 0),
+        message_count: coalesce(u.message_count, 0),
+        avg_message_length: u.avg_message_length,
         login_frequency: u.login_frequency,
         profile_updates: u.profile_updates,
         reported_count: coalesce(u.reported_count, 0),
@@ -93,7 +137,7 @@ def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -
     } as user_data
     """
     
-    results = db.execute_query(query, params)
+    results = await db.execute_query_async(query, params)
     
     if not results:
         return []
@@ -101,7 +145,7 @@ def get_matches(user: UserInDB, preferences: UserPreferences, limit: int = 10) -
     candidates = [result["user_data"] for result in results]
     
     # Use enhanced ML-based matching
-    matches = ml_service.get_enhanced_matches(user, preferences, candidates)
+    matches = await ml_service.get_enhanced_matches_async(user, preferences, candidates)
     
     if not matches:
         # Fallback to basic matching if ML service fails
@@ -177,46 +221,54 @@ def generate_mock_matches(count: int = 10) -> List[Dict[str, Any]]:
     matches.sort(key=lambda x: x["match_score"], reverse=True)
     return matches
 
-def create_match(user_id: str, matched_user_id: str, match_score: float) -> Dict[str, Any]:
+async def create_match(user_id: str, matched_user_id: str) -> Optional[Dict[str, Any]]:
     """
-    Creates or updates (:User {id:user_id})-[:MATCHED]->(:User {id:matched_user_id})
+    Creates (:User {id:user_id})-[:MATCHED]->(:User {id:matched_user_id}) in one write transaction
     Always writes to Neo4j, even in SUPERADMIN_MODE, so downstream queries work.
+    
+    The same query validates that both users exist, leaves an existing
+    relationship untouched, scores a new one from the target's stored
+    match_score (0.75 when missing) and, when the target already has a
+    pending MATCHED back to the user, accepts both edges.
+    
+    Args:
+        user_id: ID of the user creating the match
+        matched_user_id: ID of the target user
+        
+    Returns:
+        {"relationship", "is_new", "is_mutual"}, or None if either user does not exist
     """
     cypher = """
     MATCH (u1:User {id:$user_id}), (u2:User {id:$matched_user_id})
+    OPTIONAL MATCH (u1)-[existing:MATCHED]->(u2)
+    WITH u1, u2, existing IS NULL AS is_new
     MERGE (u1)-[r:MATCHED]->(u2)
     ON CREATE SET
         r.created_at = datetime(),
-        r.status     = 'pending'
-    SET  r.score = $match_score  
-    RETURN r
+        r.status     = 'pending',
+        r.score      = coalesce(u2.match_score, 0.75),
+        u1.matches_count = coalesce(u1.matches_count, 0) + 1
+    WITH u1, u2, r, is_new
+    OPTIONAL MATCH (u2)-[back:MATCHED]->(u1)
+    WITH r, back, is_new, is_new AND back IS NOT NULL AND back.status = 'pending' AS reciprocated
+    FOREACH (_ IN CASE WHEN reciprocated THEN [1] ELSE [] END |
+        SET r.status = 'accepted', r.accepted_at = datetime(),
+            back.status = 'accepted', back.accepted_at = datetime()
+    )
+    RETURN r, is_new,
+           r.status = 'accepted' AND coalesce(back.status = 'accepted', false) AS is_mutual
     """
-    result = db.execute_query(
+    result = await db.execute_query_async(
         cypher,
-        {"user_id": user_id, "matched_user_id": matched_user_id, "match_score": match_score},
+        {"user_id": user_id, "matched_user_id": matched_user_id},
     )
-    rel = result[0]["r"]
-
-    # ------------------------------------------------------------------ #
-    # 2. if the *other* user already liked us → mark both as accepted    #
-    # ------------------------------------------------------------------ #
-    mutual_q = """
-    MATCH (u1:User {id:$user_id})<-[r:MATCHED {status:'pending'}]-
-          (u2:User {id:$matched_user_id})
-    RETURN r
-    """
-    if db.execute_query(mutual_q, {"user_id": user_id, "matched_user_id": matched_user_id}):
-        db.execute_query(
-            """
-            MATCH (a:User {id:$user_id})-[r1:MATCHED]->(b:User {id:$matched_user_id}),
-                  (b)-[r2:MATCHED]->(a)
-            SET   r1.status = 'accepted', r1.accepted_at = datetime(),
-                  r2.status = 'accepted', r2.accepted_at = datetime()
-            """,
-            {"user_id": user_id, "matched_user_id": matched_user_id},
-        )
-
-    return rel
+    if not result:
+        return None
+    return {
+        "relationship": result[0]["r"],
+        "is_new": result[0]["is_new"],
+        "is_mutual": result[0]["is_mutual"],
+    }
 
 
 def accept_match(user_id: str, matched_user_id: str) -> Dict[str, Any]:
@@ -0,0 +1,257 @@
+from typing import Any, Container, Dict, Iterable, List, Optional, Set
+from collections import Counter
+import hashlib
+import heapq
+import logging
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..db.database import db
+from .background_reload import BackgroundReload
+from .interest_index import cypher_round
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Modulus of the universal hash family (a Mersenne prime). Multipliers are drawn
+# from all of [1, p) so a * x + b wraps around p: with a small multiplier every
+# hash function would keep the token with the smallest hash as its minimum
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _token_hash(token: str) -> int:
+    """Hash of a token below MERSENNE_PRIME, stable across processes"""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little") % MERSENNE_PRIME
+
+
+def user_tokens(interests: Optional[Iterable[str]], topics: Optional[Iterable[str]]) -> Set[str]:
+    """The set a user's similarity is computed over: interests and HAS_TOPIC topics"""
+    return {f"i:{interest}" for interest in interests or []} | {f"t:{topic}" for topic in topics or []}
+
+
+def jaccard(first: Set[str], second: Set[str]) -> float:
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+class MinHashIndex(BackgroundReload):
+    """
+    Approximate Jaccard neighbour index over interests and topics.
+
+    Each user's token set (interests plus HAS_TOPIC topics) gets a MinHash
+    signature of bands * rows values, and each band of the signature is hashed
+    into a bucket. Users sharing a bucket in any band are candidates, so a query
+    only visits its own buckets instead of every user: a pair with Jaccard
+    similarity s collides with probability 1 - (1 - s^rows)^bands. The
+    MINHASH_MAX_CANDIDATES candidates colliding in the most bands are then
+    ranked by their exact Jaccard similarity.
+
+    Only token sets and bucket membership are kept; signatures are recomputed
+    when a user is updated. The index is rebuilt in the background every
+    MINHASH_REFRESH_SECONDS to pick up writes made by other workers; requests
+    never wait for a load and fall back to the exact index until the first
+    one is done.
+    """
+
+    def __init__(self, bands: int, rows: int, max_candidates: int, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        rng = np.random.default_rng(seed)
+        # a, b and token hashes below 2^31 keep a * x + b below 2^64
+        self._a = rng.integers(1, MERSENNE_PRIME, size=bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=bands * rows, dtype=np.uint64)
+        self._tokens: Dict[str, Set[str]] = {}
+        self._interests: Dict[str, List[str]] = {}
+        self._topics: Dict[str, List[str]] = {}
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self.queries = 0
+        self.candidates_scored = 0
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.MINHASH_REFRESH_SECONDS
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._tokens
+
+    def band_keys(self, tokens: Set[str]) -> List[int]:
+        """
+        Bucket key of every band of a token set's MinHash signature
+
+        Args:
+            tokens: Non-empty token set
+
+        Returns:
+            One key per band
+        """
+        hashes = np.fromiter((_token_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+        signature = ((np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME).min(axis=1)
+        return [hash(band.tobytes()) for band in signature.reshape(self.bands, self.rows)]
+
+    async def _load(self) -> int:
+        """(Re)build the index from every User node and its topics in Neo4j"""
+        # Import here to avoid circular imports
+        from .ml_executor import ml_executor
+
+        records = await db.execute_query_async(
+            """
+            MATCH (u:User) WHERE u.id IS NOT NULL
+            RETURN u.id AS id, u.interests AS interests,
+                   [(u)-[:HAS_TOPIC]->(t:Topic) | t.name] AS topics
+            """
+        )
+
+        def build():
+            tokens, interests, topics = {}, {}, {}
+            buckets: List[Dict[int, Set[str]]] = [{} for _ in range(self.bands)]
+            for record in records:
+                user_id = record["id"]
+                interests[user_id] = list(record["interests"] or [])
+                topics[user_id] = list(record["topics"] or [])
+                tokens[user_id] = user_tokens(interests[user_id], topics[user_id])
+                if tokens[user_id]:
+                    for band, key in enumerate(self.band_keys(tokens[user_id])):
+                        buckets[band].setdefault(key, set()).add(user_id)
+            return tokens, interests, topics, buckets
+
+        # Signing every user is CPU-bound: keep it off the event loop
+        tokens, interests, topics, buckets = await ml_executor.run_thread(build)
+
+        with self._lock:
+            self._tokens, self._interests, self._topics, self._buckets = tokens, interests, topics, buckets
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"MinHash index loaded with {len(tokens)} users in {self.bands} bands of {self.rows} rows")
+        return len(tokens)
+
+    def update_user(
+        self,
+        user_id: str,
+        interests: Optional[Iterable[str]] = None,
+        topics: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Insert or re-sign a user
+
+        Args:
+            user_id: ID of the user
+            interests: New interests (None keeps the indexed ones)
+            topics: New topic names (None keeps the indexed ones)
+        """
+        if not user_id:
+            return
+        with self._lock:
+            if interests is not None:
+                self._interests[user_id] = list(interests)
+            if topics is not None:
+                self._topics[user_id] = list(topics)
+            tokens = user_tokens(self._interests.get(user_id), self._topics.get(user_id))
+            self._unbucket(user_id)
+            self._tokens[user_id] = tokens
+            if tokens:
+                for band, key in enumerate(self.band_keys(tokens)):
+                    self._buckets[band].setdefault(key, set()).add(user_id)
+
+    def remove_user(self, user_id: str) -> None:
+        """Drop a user from the index"""
+        with self._lock:
+            self._unbucket(user_id)
+            self._tokens.pop(user_id, None)
+            self._interests.pop(user_id, None)
+            self._topics.pop(user_id, None)
+
+    def top_k(
+        self,
+        user_id: str,
+        k: int = 10,
+        exclude: Optional[Container[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Approximate top-k Jaccard neighbours of an indexed user
+
+        Args:
+            user_id: ID of the user
+            k: Number of neighbours to return
+            exclude: Users to leave out before scoring (e.g. the user's seen-set)
+
+        Returns:
+            List of {"id", "shared_interests", "similarity"} dicts, best first;
+            fewer than k when not enough users share a bucket
+        """
+        with self._lock:
+            tokens = self._tokens.get(user_id)
+            if not tokens:
+                return []
+            interests = self._interests.get(user_id, [])
+
+            # The more bands a user collides in, the more similar it is likely
+            # to be: only the max_candidates most colliding users are scored
+            collisions: Counter = Counter()
+            for band, key in enumerate(self.band_keys(tokens)):
+                collisions.update(self._buckets[band].get(key, ()))
+            collisions.pop(user_id, None)
+            if exclude is not None:
+                for candidate_id in [candidate_id for candidate_id in collisions if candidate_id in exclude]:
+                    del collisions[candidate_id]
+            if len(collisions) > self.max_candidates:
+                candidate_ids = [candidate_id for candidate_id, _ in collisions.most_common(self.max_candidates)]
+            else:
+                candidate_ids = list(collisions)
+
+            scored = []
+            for candidate_id in candidate_ids:
+                candidate_tokens = self._tokens[candidate_id]
+                shared = len(tokens & candidate_tokens)
+                scored.append((shared / (len(tokens) + len(candidate_tokens) - shared), shared, candidate_id))
+            top = heapq.nlargest(k, scored)
+
+            self.queries += 1
+            self.candidates_scored += len(scored)
+            results = []
+            for similarity, _, candidate_id in top:
+                candidate_interests = set(self._interests.get(candidate_id, []))
+                results.append({
+                    "id": candidate_id,
+                    "shared_interests": [i for i in interests if i in candidate_interests],
+                    "similarity": cypher_round(similarity),
+                })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._tokens),
+                "bands": self.bands,
+                "rows": self.rows,
+                "buckets": sum(len(buckets) for buckets in self._buckets),
+                "queries": self.queries,
+                "avg_candidates": round(self.candidates_scored / self.queries, 1) if self.queries else 0.0,
+            }
+
+    def _unbucket(self, user_id: str) -> None:
+        tokens = self._tokens.get(user_id)
+        if not tokens:
+            return
+        for band, key in enumerate(self.band_keys(tokens)):
+            members = self._buckets[band].get(key)
+            if members is not None:
+                members.discard(user_id)
+                if not members:
+                    del self._buckets[band][key]
+
+
+# Global MinHash index instance
+minhash_index = MinHashIndex(
+    bands=settings.MINHASH_BANDS,
+    rows=settings.MINHASH_ROWS,
+    max_candidates=settings.MINHASH_MAX_CANDIDATES,
+)
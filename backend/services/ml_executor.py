@@ -0,0 +1,225 @@
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import functools
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class MLExecutorSaturated(RuntimeError):
+    """Raised when the ML executor already holds its maximum number of pending tasks"""
+
+
+class _PoolStats:
+    __slots__ = ("workers", "in_flight", "submitted", "completed", "failed", "wait_seconds", "run_seconds", "max_run_seconds")
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        finished = max(1, self.completed + self.failed)
+        return {
+            "workers": self.workers,
+            # Pools run tasks FIFO, so whatever exceeds the worker count is waiting
+            "running": min(self.in_flight, self.workers),
+            "queued": max(0, self.in_flight - self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_seconds / finished * 1000, 2),
+            "avg_run_ms": round(self.run_seconds / finished * 1000, 2),
+            "max_run_ms": round(self.max_run_seconds * 1000, 2),
+        }
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> tuple:
+    """
+    Run fn in a worker and report when it started and how long it ran
+
+    An exception raised by fn is returned rather than raised, so the caller can
+    tell the function's own errors from the pool failing to run it.
+    """
+    started = time.time()
+    try:
+        result, error = fn(*args, **kwargs), None
+    except Exception as e:
+        result, error = None, e
+    return result, error, started, time.time() - started
+
+
+class MLExecutor:
+    """
+    Bounded executor for ML analysis and scoring, off the event loop.
+
+    Async handlers await `run_thread` for analysis and small scoring batches and
+    `run_cpu` for scoring; `run_cpu` switches to a process pool for batches of at
+    least ML_PROCESS_MIN_BATCH items, where the pickling cost is worth escaping the
+    GIL. At most ML_EXECUTOR_MAX_PENDING tasks may be queued or running: past that
+    new work is rejected with MLExecutorSaturated so callers fall back instead of
+    piling up behind heavy scoring while websocket and auth traffic waits.
+    """
+
+    def __init__(self, thread_workers: int, process_workers: int, max_pending: int, process_min_batch: int):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_pending = max_pending
+        self.process_min_batch = process_min_batch
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self._stats = {"thread": _PoolStats(thread_workers), "process": _PoolStats(process_workers)}
+
+    async def run_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a function on the ML thread pool
+
+        Args:
+            fn: Function to run
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            The function's result
+
+        Raises:
+            MLExecutorSaturated: If the executor is full
+        """
+        result, error = await self._submit("thread", self._thread_pool(), fn, args, kwargs)
+        if error is not None:
+            raise error
+        return result
+
+    async def run_cpu(self, fn: Callable, *args, size: int = 0, **kwargs) -> Any:
+        """
+        Run CPU-bound work, in the process pool when the batch is large enough
+
+        Args:
+            fn: Picklable function to run (module-level function or bound method)
+            *args: Positional arguments for fn (pickled when sent to a process)
+            size: Number of items in the batch, compared against ML_PROCESS_MIN_BATCH
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            The function's result
+
+        Raises:
+            MLExecutorSaturated: If the executor is full
+        """
+        if self.process_workers > 0 and size >= self.process_min_batch:
+            try:
+                result, error = await self._submit("process", self._process_pool(), fn, args, kwargs)
+            except (BrokenProcessPool, pickle.PicklingError, TypeError, AttributeError) as e:
+                # Unpicklable payloads or a dead worker: score in a thread instead. Errors raised
+                # by fn itself come back as `error` and are not retried
+                logger.warning(f"Process pool unavailable for {getattr(fn, '__name__', fn)}, using threads: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_process_pool()
+            else:
+                if error is not None:
+                    raise error
+                return result
+        return await self.run_thread(fn, *args, **kwargs)
+
+    async def _submit(self, kind: str, pool, fn: Callable, args: tuple, kwargs: dict) -> tuple:
+        """Run fn in a pool, returning (result, error raised by fn)"""
+        stats = self._stats[kind]
+        with self._lock:
+            in_flight = sum(pool_stats.in_flight for pool_stats in self._stats.values())
+            if in_flight >= self.max_pending:
+                self.rejected += 1
+                raise MLExecutorSaturated(f"ML executor is saturated ({in_flight} tasks in flight)")
+            stats.in_flight += 1
+            stats.submitted += 1
+
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, error, started, run_seconds = await loop.run_in_executor(
+                pool, functools.partial(_timed_call, fn, args, kwargs)
+            )
+        except BaseException:
+            with self._lock:
+                stats.in_flight -= 1
+                stats.failed += 1
+            raise
+
+        with self._lock:
+            stats.in_flight -= 1
+            if error is None:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+            stats.wait_seconds += max(0.0, started - submitted_at)
+            stats.run_seconds += run_seconds
+            stats.max_run_seconds = max(stats.max_run_seconds, run_seconds)
+        return result, error
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="ml")
+            return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # spawn: forking a process that runs driver and executor threads can deadlock
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+
+    def _reset_process_pool(self) -> None:
+        with self._lock:
+            pool, self._processes = self._processes, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, rejections and per-pool execution times"""
+        with self._lock:
+            thread_stats = self._stats["thread"].as_dict()
+            process_stats = self._stats["process"].as_dict()
+            return {
+                "queue_depth": thread_stats["queued"] + process_stats["queued"],
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "thread_pool": thread_stats,
+                "process_pool": process_stats,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+
+
+# Global ML executor instance
+ml_executor = MLExecutor(
+    thread_workers=settings.ML_THREAD_WORKERS,
+    process_workers=settings.ML_PROCESS_WORKERS,
+    max_pending=settings.ML_EXECUTOR_MAX_PENDING,
+    process_min_batch=settings.ML_PROCESS_MIN_BATCH,
+)
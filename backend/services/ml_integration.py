@@ -7,6 +7,9 @@ import asyncio
 
 # Import our real enhanced matching service
 from ..ml.matching_service import matching_service
+from .feature_store import feature_store
+from .ml_executor import ml_executor
+from .activity_counters import activity_counters
 
 logger = logging.getLogger(__name__)
 
@@ -164,59 +167,89 @@ class MLService:
             logger.error(f"Error in user metadata analysis: {e}")
             return {}
     
-    def get_enhanced_matches(
+    def _stored_metadata(self, user_id: str) -> Dict[str, Any]:
+        """Metadata in the mock model's shape from a user's feature record, if one was read recently"""
+        record = feature_store.get_cached(user_id) if user_id else None
+        if not record or not record.get("personality_traits") or not record.get("topics"):
+            return {}
+        # The mock model scores interests as {interest: weight}, which is what topics hold
+        return {"personality_traits": record["personality_traits"], "interests": record["topics"]}
+    
+    def _get_mock_matches(self, user: UserInDB, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score candidates with the mock model, preferring the materialized features of each user"""
+        user_metadata = self._stored_metadata(user.id) or self.analyze_user(user.dict())
+        candidate_metadata = [
+            self._stored_metadata(candidate.get("id")) or self.analyze_user(candidate)
+            for candidate in candidates
+        ]
+        return self.matching_model.get_matches(
+            user.dict(),
+            user_metadata,
+            candidates,
+            candidate_metadata
+        )
+    
+    async def get_enhanced_matches_async(
         self,
         user: UserInDB,
         preferences: UserPreferences,
         candidates: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Get enhanced matches using real or mock matching model."""
+        """Get enhanced matches using real or mock matching model, without blocking the event loop."""
         try:
             # Check if we're using mock models
             if hasattr(self, 'matching_model'):
-                # Use mock model
-                user_metadata = self.analyze_user(user.dict())
-                candidate_metadata = [self.analyze_user(candidate) for candidate in candidates]
-                matches = self.matching_model.get_matches(
-                    user.dict(),
-                    user_metadata,
-                    candidates,
-                    candidate_metadata
-                )
+                matches = await ml_executor.run_thread(self._get_mock_matches, user, candidates)
             else:
-                # Use the real matching service
-                # Run the async function in a synchronous context
-                matches = asyncio.run(matching_service.get_matches_for_user(user.id, limit=len(candidates)))
-            
-            # Update stats
-            self.total_matches += len(matches)
-            for match in matches:
-                score = match["match_score"]
-                if score >= 0.9:
-                    self.match_quality_distribution["excellent"] += 1
-                    # 80% chance to be successful match
-                    if random.random() < 0.8:
-                        self.successful_matches += 1
-                elif score >= 0.75:
-                    self.match_quality_distribution["good"] += 1
-                    # 60% chance to be successful match
-                    if random.random() < 0.6:
-                        self.successful_matches += 1
-                elif score >= 0.6:
-                    self.match_quality_distribution["average"] += 1
-                    # 40% chance to be successful match
-                    if random.random() < 0.4:
-                        self.successful_matches += 1
-                else:
-                    self.match_quality_distribution["low"] += 1
-                    # 20% chance to be successful match
-                    if random.random() < 0.2:
-                        self.successful_matches += 1
+                # Use the real matching service, which scores on the ML executor
+                matches = await matching_service.get_matches_for_user(user.id, limit=len(candidates))
             
+            self._record_match_quality(matches)
             return matches
         except Exception as e:
             logger.error(f"Error in enhanced matching: {e}")
             return []
+    
+    def get_enhanced_matches(
+        self,
+        user: UserInDB,
+        preferences: UserPreferences,
+        candidates: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Synchronous wrapper for get_enhanced_matches_async, for callers outside an event loop."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.get_enhanced_matches_async(user, preferences, candidates))
+        # Starting a nested loop from inside a request would block the running one
+        logger.error("get_enhanced_matches called from a running event loop, use get_enhanced_matches_async")
+        return []
+    
+    def _record_match_quality(self, matches: List[Dict[str, Any]]) -> None:
+        """Update the match quality statistics with a batch of scored matches"""
+        self.total_matches += len(matches)
+        for match in matches:
+            score = match["match_score"]
+            if score >= 0.9:
+                self.match_quality_distribution["excellent"] += 1
+                # 80% chance to be successful match
+                if random.random() < 0.8:
+                    self.successful_matches += 1
+            elif score >= 0.75:
+                self.match_quality_distribution["good"] += 1
+                # 60% chance to be successful match
+                if random.random() < 0.6:
+                    self.successful_matches += 1
+            elif score >= 0.6:
+                self.match_quality_distribution["average"] += 1
+                # 40% chance to be successful match
+                if random.random() < 0.4:
+                    self.successful_matches += 1
+            else:
+                self.match_quality_distribution["low"] += 1
+                # 20% chance to be successful match
+                if random.random() < 0.2:
+                    self.successful_matches += 1
             
     async def get_match_statistics_async(self) -> Dict[str, Any]:
         """Get statistics about the matching process asynchronously."""
@@ -225,10 +258,10 @@ class MLService:
             try:
                 # Get a random user ID for statistics demonstration
                 from ..db.database import db
-                result = db.execute_query("MATCH (u:User) RETURN u.id LIMIT 1")
+                result = await db.execute_query_async("MATCH (u:User) RETURN u.id LIMIT 1")
                 if result and result[0] and "u.id" in result[0]:
                     user_id = result[0]["u.id"]
-                    user_stats = await matching_service.update_user_match_statistics(user_id)
+                    user_stats = await activity_counters.get_match_statistics(user_id)
                     return {
                         "total_matches_processed": self.total_matches,
                         "successful_matches": user_stats.get("mutual_matches", 0),
@@ -0,0 +1,134 @@
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expires_at", "size", "segments")
+
+    def __init__(self, value: Any, expires_at: float, size: int, segments: Set[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.segments = segments
+
+
+class RecommendationCache:
+    """
+    Per-user cache of computed recommendations with TTL, LRU eviction and a memory bound.
+
+    Entries are keyed by (user_id, kind) so the Jaccard recommendations and the
+    ML matches of a user are cached side by side. Each entry is tagged with the
+    user's segment (their interests): a newly registered user can only enter the
+    results of users sharing one of their interests, so only those entries are
+    dropped on registration.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, kind: str) -> Optional[Any]:
+        """Return the cached value for a user, or None on a miss or expired entry"""
+        key = (user_id, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, user_id: str, kind: str, value: Any, segments: Optional[Iterable[str]] = None) -> None:
+        """Store a value for a user, evicting least recently used entries past the bounds"""
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            return
+        key = (user_id, kind)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                size=size,
+                segments=set(segments or []),
+            )
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached entry of a user (after a swipe or a profile/preference change)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_segment(self, segments: Iterable[str]) -> None:
+        """Drop the entries of every user in one of the given segments (after a registration)"""
+        segments = set(segments or [])
+        if not segments:
+            return
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.segments & segments]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Approximate the memory held by a value by the size of its JSON encoding"""
+        return len(json.dumps(value, default=str))
+
+
+# Global recommendation cache instance
+recommendation_cache = RecommendationCache(
+    ttl_seconds=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+    max_entries=settings.RECOMMENDATION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RECOMMENDATION_CACHE_MAX_BYTES,
+)
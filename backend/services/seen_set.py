@@ -0,0 +1,148 @@
+from typing import Any, Dict, Iterable
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+import hashlib
+import logging
+import sys
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..db.database import db
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Relationships after which a user should not be shown to the swiping user again
+SEEN_RELATIONSHIPS = ("LIKED", "DISLIKED", "BLOCKED", "MATCHED")
+
+
+def fingerprint(user_id: str) -> int:
+    """Signed 64-bit fingerprint of a user id"""
+    return int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+class SeenSet:
+    """
+    Users already swiped on, blocked or matched by one user.
+
+    Ids are kept as a sorted array of 64-bit fingerprints, 8 bytes per id
+    instead of a Python string each, and looked up by binary search. A false
+    positive needs two ids colliding on 64 bits, so it is exact in practice.
+    """
+
+    __slots__ = ("_fingerprints", "loaded_at")
+
+    def __init__(self, user_ids: Iterable[str] = ()):
+        self._fingerprints = array("q", sorted({fingerprint(user_id) for user_id in user_ids}))
+        self.loaded_at = time.monotonic()
+
+    def __contains__(self, user_id: str) -> bool:
+        value = fingerprint(user_id)
+        position = bisect_left(self._fingerprints, value)
+        return position < len(self._fingerprints) and self._fingerprints[position] == value
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def add(self, user_id: str) -> None:
+        value = fingerprint(user_id)
+        position = bisect_left(self._fingerprints, value)
+        if position == len(self._fingerprints) or self._fingerprints[position] != value:
+            insort(self._fingerprints, value)
+
+    def fingerprints(self) -> np.ndarray:
+        """The sorted fingerprints as an int64 array, for vectorized exclusion"""
+        return np.frombuffer(self._fingerprints, dtype=np.int64).copy()
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._fingerprints)
+
+
+class SeenSets:
+    """
+    Per-user seen-sets excluding already-seen profiles from the swipe deck.
+
+    A user's set is loaded from their outgoing LIKED/DISLIKED/BLOCKED/MATCHED
+    relationships the first time their candidates are generated, then kept
+    current by every interaction recorded through this process. Sets are
+    reloaded after SEEN_SET_REFRESH_SECONDS to pick up writes made by other
+    workers, and the least recently used ones are dropped past
+    SEEN_SET_MAX_USERS.
+    """
+
+    def __init__(self, max_users: int, refresh_seconds: float):
+        self.max_users = max_users
+        self.refresh_seconds = refresh_seconds
+        self._sets: "OrderedDict[str, SeenSet]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    async def get(self, user_id: str) -> SeenSet:
+        """
+        The seen-set of a user, loading it from Neo4j if needed
+
+        Args:
+            user_id: ID of the swiping user
+
+        Returns:
+            The user's SeenSet
+        """
+        with self._lock:
+            seen = self._sets.get(user_id)
+            if seen is not None and time.monotonic() - seen.loaded_at <= self.refresh_seconds:
+                self._sets.move_to_end(user_id)
+                return seen
+
+        records = await db.execute_query_async(
+            f"""
+            MATCH (:User {{id: $user_id}})-[:{'|'.join(SEEN_RELATIONSHIPS)}]->(other:User)
+            RETURN collect(DISTINCT other.id) AS ids
+            """,
+            {"user_id": user_id},
+        )
+        seen = SeenSet(records[0]["ids"] if records else [])
+
+        with self._lock:
+            self._sets[user_id] = seen
+            self._sets.move_to_end(user_id)
+            self.loads += 1
+            while len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+                self.evictions += 1
+        return seen
+
+    def add(self, user_id: str, target_id: str) -> None:
+        """Mark a target as seen by a user whose set is loaded (unloaded sets read it from Neo4j)"""
+        with self._lock:
+            seen = self._sets.get(user_id)
+            if seen is not None:
+                seen.add(target_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of loaded sets, the ids they hold and their memory"""
+        with self._lock:
+            ids = sum(len(seen) for seen in self._sets.values())
+            return {
+                "users": len(self._sets),
+                "ids": ids,
+                "bytes": sum(seen.nbytes for seen in self._sets.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+# Global seen-set instance
+seen_sets = SeenSets(
+    max_users=settings.SEEN_SET_MAX_USERS,
+    refresh_seconds=settings.SEEN_SET_REFRESH_SECONDS,
+)
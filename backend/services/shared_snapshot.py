@@ -0,0 +1,137 @@
+from typing import Any, Dict, Optional, Tuple
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+META_FILE = "meta.json"
+
+
+class SnapshotGenerations:
+    """
+    Array bundles published once to a directory and memory-mapped by every worker.
+
+    A generation is a directory of .npy files plus a meta.json. It is written
+    under a temporary name and renamed into place, then the CURRENT file is
+    replaced to point at it, so a reader sees either the old generation or the
+    complete new one. Readers map the files copy-on-write: pages are shared
+    through the page cache by every process attached to the generation, and a
+    page is only copied into a process when that process writes to it.
+
+    Older generations are deleted after a publish, keeping the last `keep`;
+    processes still mapping a deleted generation keep reading it until they
+    attach the new one.
+    """
+
+    def __init__(self, directory: str, keep: int = 2):
+        self.directory = directory
+        self.keep = keep
+        self.publishes = 0
+        self.attaches = 0
+
+    def current(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        The published generation
+
+        Returns:
+            (generation, meta), or None when nothing was published yet
+        """
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                generation = f.read().strip()
+            with open(os.path.join(self.directory, generation, META_FILE)) as f:
+                return generation, json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def current_name(self) -> Optional[str]:
+        """Name of the published generation (one small read, cheap enough per request)"""
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def publish(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> str:
+        """
+        Write a new generation and make it current
+
+        Args:
+            arrays: Arrays to publish, by name
+            meta: JSON-serializable metadata stored with them
+
+        Returns:
+            Name of the new generation
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        generation = f"gen-{time.time_ns()}-{uuid.uuid4().hex[:6]}"
+        staging = os.path.join(self.directory, f".{generation}.tmp")
+        os.makedirs(staging)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump({**meta, "published_at": time.time(), "arrays": sorted(arrays)}, f)
+        os.rename(staging, os.path.join(self.directory, generation))
+
+        pointer = os.path.join(self.directory, f".{CURRENT_FILE}.{generation}.tmp")
+        with open(pointer, "w") as f:
+            f.write(generation)
+        os.replace(pointer, os.path.join(self.directory, CURRENT_FILE))
+        self.publishes += 1
+
+        self._prune(generation)
+        return generation
+
+    def attach(self, generation: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Map a generation's arrays copy-on-write
+
+        Returns:
+            (arrays by name, meta)
+        """
+        path = os.path.join(self.directory, generation)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c")
+            for name in meta["arrays"]
+        }
+        self.attaches += 1
+        return arrays, meta
+
+    def try_lock(self) -> Optional[int]:
+        """
+        Take the rebuild lock without waiting
+
+        Returns:
+            A file descriptor to pass to unlock, or None when another process holds the lock
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def unlock(self, fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _prune(self, current: str) -> None:
+        generations = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("gen-") and name != current
+        )
+        for name in generations[:max(0, len(generations) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
@@ -0,0 +1,580 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import get_settings
+from ..core.interest_bitmask import INTEREST_BITS, interest_mask, popcount
+from ..db.database import db
+from ..models.user import Gender, UserPreferences
+from .background_reload import BackgroundReload
+from .feature_store import FEATURE_VERSION
+from .geo_index import EARTH_RADIUS_KM, parse_coordinates
+from .seen_set import SeenSet, fingerprint
+from .shared_snapshot import SnapshotGenerations
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Big Five trait columns, in the order of the personality model
+TRAITS = ("openness", "conscientiousness", "extroversion", "agreeableness", "neuroticism")
+
+GENDER_CODES = {gender.value: code for code, gender in enumerate(Gender)}
+
+# Separator of the interests in the published interest blob
+_INTEREST_SEPARATOR = "\x1f"
+
+# Column dtypes and the value marking a missing entry
+_COLUMNS = {
+    "fingerprint": (np.int64, 0),
+    "is_active": (np.int8, -1),  # 1 true, 0 false, -1 not set
+    "gender": (np.int8, -1),
+    "age": (np.int16, -1),
+    "birth_year": (np.int16, -1),
+    "latitude": (np.float64, np.nan),
+    "longitude": (np.float64, np.nan),
+    "interest_mask": (np.int64, -1),  # -1: an interest outside the vocabulary
+    "interest_count": (np.int32, 0),  # User.interests has no length limit
+    "activity": (np.float32, np.nan),
+    "cluster": (np.int16, -1),
+}
+
+
+def _int_or(value: Any, missing: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return missing
+
+
+def _row_values(user: Dict[str, Any], features: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column values of a User node and its feature record"""
+    features = features or {}
+    interests = list(user.get("interests") or [])
+    # Jaccard is over interest sets, so duplicates do not prevent a mask
+    mask = interest_mask(dict.fromkeys(interests))
+    coordinates = parse_coordinates(user.get("latitude"), user.get("longitude"))
+    traits = features.get("personality_traits") or {}
+    is_active = user.get("is_active")
+    return {
+        "fingerprint": fingerprint(user["id"]),
+        "is_active": -1 if is_active is None else int(bool(is_active)),
+        "gender": GENDER_CODES.get(user.get("gender"), -1),
+        "age": _int_or(user.get("age"), -1),
+        "birth_year": _int_or(user.get("birth_year"), -1),
+        "latitude": coordinates[0] if coordinates else np.nan,
+        "longitude": coordinates[1] if coordinates else np.nan,
+        "interest_mask": -1 if mask is None else mask,
+        "interest_count": len(set(interests)),
+        "activity": features.get("activity_score", np.nan),
+        "cluster": _int_or(features.get("cluster"), -1),
+        "traits": [traits.get(trait, np.nan) for trait in TRAITS],
+        "interests": interests,
+    }
+
+
+class UserSnapshot(BackgroundReload):
+    """
+    Read-optimized columnar copy of every user for candidate retrieval.
+
+    Each matching request used to query Neo4j for a pool of candidate rows and
+    build a dict per row before anything was ranked. The snapshot keeps the
+    fields retrieval and short-listing need (age, gender code, coordinates,
+    interest bitmask) next to the materialized traits, activity score and
+    cluster as one NumPy column per field, so the radius, preference and
+    seen-set predicates and the cheap interest/proximity score are vectorized
+    passes over every user instead of a bounded query.
+
+    It is loaded at startup and kept current by the feature store, which sees
+    every profile write; removed rows are reused by later inserts. The snapshot
+    is rebuilt in the background every USER_SNAPSHOT_REFRESH_SECONDS to pick up
+    writes made by other workers, and requests use the Cypher retrieval until
+    the first load is done. Writes are also logged per user while a rebuild
+    reads Neo4j, and the ones made after its read started are re-applied to
+    the rebuilt snapshot so they are not lost in the swap.
+
+    With USER_SNAPSHOT_DIR set, one worker builds each generation and publishes
+    it there (ids and interests encoded as arrays too); every worker maps it
+    copy-on-write instead of holding its own copy, and attaches the next
+    generation as soon as it is published. Writes seen by a worker land in
+    its private pages and id/interest overlays until that next generation.
+    """
+
+    def __init__(self, capacity: int = 1024, shared_directory: str = ""):
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._allocate(capacity)
+        # Latest write of each user as (time.time(), user or None when removed, features)
+        self._writes: Dict[str, Tuple[float, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+        self.generations = SnapshotGenerations(shared_directory) if shared_directory else None
+        self.generation: Optional[str] = None
+        self.loads = 0
+        self.updates = 0
+        self.scans = 0
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.USER_SNAPSHOT_REFRESH_SECONDS
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            return self._row_of(user_id) is not None
+
+    async def _load(self) -> int:
+        """
+        (Re)build the snapshot from every User node and its feature record
+
+        In shared mode the snapshot is published for every worker, unless
+        another worker is already rebuilding it or a fresh generation exists,
+        in which case that generation is attached.
+        """
+        if self.generations is not None:
+            return await self._load_shared()
+
+        started = time.time()
+        built = await self._build()
+        with self._lock:
+            self._replay(built, started)
+            self._adopt(built)
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+        logger.info(f"User snapshot loaded with {self._count} users ({self.nbytes / 1e6:.1f} MB)")
+        return self._count
+
+    async def ensure_loaded(self, wait: bool = False) -> None:
+        """
+        Attach a newly published generation, and (re)load the snapshot in the background when missing or stale
+
+        Args:
+            wait: Wait for the first load; otherwise it is only started
+        """
+        if self.generations is not None:
+            # Also while unloaded: a worker that lost the rebuild lock attaches the builder's generation
+            generation = self.generations.current_name()
+            if generation is not None and generation != self.generation:
+                try:
+                    self.attach(generation)
+                except OSError as e:
+                    # Pruned by a newer publish in the meantime: the next call attaches that one
+                    logger.warning(f"Could not attach user snapshot generation {generation}: {e}")
+        await super().ensure_loaded(wait)
+
+    def attach(self, generation: str) -> None:
+        """Swap to a published generation, re-applying this worker's writes made after it was read"""
+        arrays, meta = self.generations.attach(generation)
+        built_at = meta.get("built_at", meta["published_at"])
+        with self._lock:
+            self._columns = {name: arrays[name] for name in _COLUMNS}
+            self._traits, self._live = arrays["traits"], arrays["live"]
+            self._base_ids = arrays["ids"]
+            self._base_offsets, self._base_blob = arrays["interest_offsets"], arrays["interest_blob"]
+            self._base_order, self._base_fingerprints = arrays["order"], arrays["sorted_fingerprints"]
+            self._local_rows, self._local_ids, self._local_interests = {}, {}, {}
+            self._free = []
+            self._size, self._count = meta["size"], meta["users"]
+            self._replay(self, built_at)
+            self.generation = generation
+            # Aged like the generation, so an old one is still rebuilt on time
+            self._loaded_at = time.monotonic() - max(0.0, time.time() - built_at)
+        logger.info(f"User snapshot attached generation {generation} with {self._count} users")
+
+    async def _load_shared(self) -> int:
+        current = self.generations.current()
+        if current is not None and time.time() - current[1].get("built_at", current[1]["published_at"]) <= self.refresh_seconds:
+            if current[0] != self.generation:
+                self.attach(current[0])
+            return self._count
+
+        lock = self.generations.try_lock()
+        if lock is None:
+            # Another worker is publishing: keep the current generation meanwhile. With none
+            # published yet this worker stays unloaded, and ensure_loaded attaches the
+            # builder's generation as soon as it appears
+            if current is not None and current[0] != self.generation:
+                self.attach(current[0])
+            return self._count
+
+        # Import here to avoid circular imports
+        from .ml_executor import ml_executor
+
+        try:
+            started = time.time()
+            built = await self._build()
+            meta = {"size": built._size, "users": built._count, "built_at": started}
+            # Encoding every id and interest list is CPU-bound too: keep it off the event loop
+            generation = await ml_executor.run_thread(
+                lambda: self.generations.publish(built._to_arrays(), meta)
+            )
+        finally:
+            self.generations.unlock(lock)
+        self.loads += 1
+        self.attach(generation)
+        logger.info(f"User snapshot published generation {generation} ({built.nbytes / 1e6:.1f} MB)")
+        return self._count
+
+    async def _build(self) -> "UserSnapshot":
+        """A private snapshot of every User node and its feature record"""
+        # Import here to avoid circular imports
+        from .ml_executor import ml_executor
+
+        records = await db.execute_query_async(
+            """
+            MATCH (u:User) WHERE u.id IS NOT NULL
+            OPTIONAL MATCH (u)-[:HAS_FEATURES]->(f:UserFeatures {version: $version})
+            RETURN u {.id, .is_active, .gender, .age, .birth_year, .latitude, .longitude, .interests} AS user,
+                   f.data AS features
+            """,
+            {"version": FEATURE_VERSION},
+        )
+
+        def build() -> "UserSnapshot":
+            # Headroom for inserts before the next rebuild
+            snapshot = UserSnapshot(capacity=len(records) + max(1024, len(records) // 8))
+            for record in records:
+                features = json.loads(record["features"]) if record["features"] else None
+                snapshot._upsert(record["user"], features)
+            return snapshot
+
+        # Parsing every feature record is CPU-bound: keep it off the event loop
+        return await ml_executor.run_thread(build)
+
+    def update_user(self, user: Dict[str, Any], features: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Insert or overwrite a user's row
+
+        Args:
+            user: User node properties
+            features: The user's feature record, if computed
+        """
+        if not user or not user.get("id"):
+            return
+        with self._lock:
+            self._writes[user["id"]] = (time.time(), user, features)
+            self._upsert(user, features)
+            self.updates += 1
+
+    def remove_user(self, user_id: str) -> None:
+        """Drop a user's row; it is reused by the next insert"""
+        with self._lock:
+            self._writes[user_id] = (time.time(), None, None)
+            self._remove(user_id)
+
+    def retrieve(
+        self,
+        user_id: str,
+        origin: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        preferences: Optional[UserPreferences],
+        today: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """
+        Rows passing the retrieval predicates of a matching request
+
+        Mirrors the Cypher retrieval: users within the radius (when the user is
+        located), and with preferences only active users of a preferred gender
+        whose birth year is in the age range.
+
+        Args:
+            user_id: ID of the searching user, never retrieved
+            origin: The user's (latitude, longitude), if located
+            radius_km: The user's search radius, if bounded
+            preferences: The user's matching preferences, if set
+            today: Reference date for the age range (defaults to now)
+
+        Returns:
+            Row numbers, in row order
+        """
+        with self._lock:
+            self.scans += 1
+            columns = self._columns
+            keep = self._live[:self._size].copy()
+            own_row = self._row_of(user_id)
+            if own_row is not None:
+                keep[own_row] = False
+
+            if origin is not None and radius_km is not None:
+                distances = self._distances(origin)
+                # NaN distances (no coordinates) compare False
+                keep &= distances <= radius_km
+
+            if preferences is not None:
+                current_year = (today or datetime.now()).year
+                birth_years = columns["birth_year"][:self._size]
+                keep &= columns["is_active"][:self._size] == 1
+                keep &= (birth_years >= current_year - preferences.max_age) & (birth_years <= current_year - preferences.min_age)
+                if preferences.preferred_gender:
+                    codes = [GENDER_CODES[gender.value] for gender in preferences.preferred_gender]
+                    keep &= np.isin(columns["gender"][:self._size], codes)
+
+            return np.flatnonzero(keep)
+
+    def filter(self, rows: np.ndarray, seen: Optional[SeenSet] = None) -> np.ndarray:
+        """
+        Drop inactive and already-seen users
+
+        Args:
+            rows: Rows from retrieve
+            seen: The searching user's seen-set
+
+        Returns:
+            The remaining rows, in order
+        """
+        with self._lock:
+            keep = self._columns["is_active"][rows] != 0
+            if seen is not None and len(seen):
+                keep &= ~np.isin(self._columns["fingerprint"][rows], seen.fingerprints())
+            return rows[keep]
+
+    def shortlist(
+        self,
+        rows: np.ndarray,
+        user_interests: List[str],
+        origin: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        size: int,
+        interest_weight: float,
+        location_weight: float,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep the rows worth a full compatibility score
+
+        The vectorized form of candidate_pipeline.shortlist: interest Jaccard
+        from mask popcounts (list Jaccard for users with an interest outside
+        the vocabulary) plus proximity, weighted like the full model.
+
+        Args:
+            rows: Rows from filter
+            user_interests: The searching user's interests
+            origin: The searching user's (latitude, longitude), if located
+            radius_km: Search radius the proximity is relative to (default 1000 km)
+            size: Number of candidates to keep
+            interest_weight: Weight of the interest overlap
+            location_weight: Weight of the proximity
+
+        Returns:
+            The best `size` candidates as {"id", "interests", "coordinates", "is_active"}
+            dicts, best first (row order on ties)
+        """
+        if len(rows) == 0 or size <= 0:
+            return []
+        mine = set(user_interests or [])
+        # Interests outside the vocabulary cannot be shared with a masked user
+        user_mask = 0
+        for interest in mine:
+            user_mask |= INTEREST_BITS.get(interest, 0)
+
+        with self._lock:
+            columns = self._columns
+            masks = columns["interest_mask"][rows]
+            masked = masks >= 0
+            shared = popcount(np.where(masked, masks & user_mask, 0))
+            union = len(mine) + columns["interest_count"][rows].astype(np.int64) - shared
+            similarity = np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+            for position in np.flatnonzero(~masked).tolist():
+                theirs = set(self._interests_at(rows[position]))
+                together = len(mine | theirs)
+                similarity[position] = len(mine & theirs) / together if together else 0.0
+            scores = interest_weight * similarity
+
+            if origin is not None:
+                proximity = 1.0 - self._distances(origin)[rows] / (radius_km or 1000.0)
+                scores += np.where(np.isnan(proximity), 0.0, location_weight * np.maximum(0.0, proximity))
+
+            if len(rows) > size:
+                # Everything above the cutoff score, then the earliest rows tied at it
+                cutoff = -np.partition(-scores, size - 1)[size - 1]
+                above = np.flatnonzero(scores > cutoff)
+                best = np.concatenate((above, np.flatnonzero(scores == cutoff)[:size - len(above)]))
+            else:
+                best = np.arange(len(rows))
+            best = best[np.lexsort((best, -scores[best]))]
+
+            candidates = []
+            for position in best.tolist():
+                row = rows[position]
+                latitude, longitude = columns["latitude"][row], columns["longitude"][row]
+                is_active = columns["is_active"][row]
+                candidates.append({
+                    "id": self._id_at(row),
+                    "interests": self._interests_at(row),
+                    "coordinates": None if np.isnan(latitude) else (float(latitude), float(longitude)),
+                    "is_active": None if is_active < 0 else bool(is_active),
+                })
+            return candidates
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays"""
+        return sum(column.nbytes for column in self._columns.values()) + self._traits.nbytes + self._live.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": self._count,
+                "capacity": len(self._live),
+                "bytes": self.nbytes,
+                "generation": self.generation,
+                "private_users": len(self._local_rows),
+                "logged_writes": len(self._writes),
+                "loads": self.loads,
+                "updates": self.updates,
+                "scans": self.scans,
+            }
+
+    def _allocate(self, capacity: int) -> None:
+        self._columns = {name: np.full(capacity, missing, dtype=dtype) for name, (dtype, missing) in _COLUMNS.items()}
+        self._traits = np.full((capacity, len(TRAITS)), np.nan, dtype=np.float32)
+        self._live = np.zeros(capacity, dtype=bool)
+        # Ids and interests of a published generation, encoded as arrays
+        self._base_ids: Optional[np.ndarray] = None
+        self._base_offsets: Optional[np.ndarray] = None
+        self._base_blob: Optional[np.ndarray] = None
+        self._base_order: Optional[np.ndarray] = None
+        self._base_fingerprints: Optional[np.ndarray] = None
+        # Rows written in this process, over the published ones
+        self._local_rows: Dict[str, int] = {}
+        self._local_ids: Dict[int, str] = {}
+        self._local_interests: Dict[int, List[str]] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._count = 0
+
+    def _adopt(self, other: "UserSnapshot") -> None:
+        self._columns, self._traits, self._live = other._columns, other._traits, other._live
+        self._base_ids, self._base_offsets, self._base_blob = None, None, None
+        self._base_order, self._base_fingerprints = None, None
+        self._local_rows, self._local_ids, self._local_interests = other._local_rows, other._local_ids, other._local_interests
+        self._free, self._size, self._count = other._free, other._size, other._count
+
+    def _replay(self, target: "UserSnapshot", built_at: float) -> None:
+        """
+        Re-apply to a rebuilt snapshot the writes its read may have missed (lock held)
+
+        Args:
+            target: Snapshot built from a read of Neo4j
+            built_at: time.time() when that read started; older writes are in it and are forgotten
+        """
+        self._writes = {user_id: write for user_id, write in self._writes.items() if write[0] >= built_at}
+        for user_id, (_, user, features) in self._writes.items():
+            if user is None:
+                target._remove(user_id)
+            else:
+                target._upsert(user, features)
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        """The snapshot's state as arrays, to be published (only for a private snapshot)"""
+        ids = [self._local_ids.get(row, "") for row in range(self._size)]
+        encoded = [
+            _INTEREST_SEPARATOR.join(self._local_interests.get(row, [])).encode() for row in range(self._size)
+        ]
+        offsets = np.zeros(self._size + 1, dtype=np.int64)
+        np.cumsum([len(interests) for interests in encoded], out=offsets[1:])
+        fingerprints = self._columns["fingerprint"][:self._size]
+        order = np.argsort(fingerprints, kind="stable")
+        return {
+            **{name: column for name, column in self._columns.items()},
+            "traits": self._traits,
+            "live": self._live,
+            "ids": np.array([user_id.encode() for user_id in ids], dtype=bytes),
+            "interest_offsets": offsets,
+            "interest_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "order": order,
+            "sorted_fingerprints": fingerprints[order],
+        }
+
+    def _row_of(self, user_id: str) -> Optional[int]:
+        row = self._local_rows.get(user_id)
+        if row is not None or self._base_fingerprints is None:
+            return row
+        value = fingerprint(user_id)
+        position = int(np.searchsorted(self._base_fingerprints, value))
+        while position < len(self._base_fingerprints) and self._base_fingerprints[position] == value:
+            row = int(self._base_order[position])
+            if self._live[row] and self._id_at(row) == user_id:
+                return row
+            position += 1
+        return None
+
+    def _id_at(self, row: int) -> Optional[str]:
+        user_id = self._local_ids.get(row)
+        if user_id is None and self._base_ids is not None and row < len(self._base_ids):
+            user_id = self._base_ids[row].decode()
+        return user_id
+
+    def _interests_at(self, row: int) -> List[str]:
+        interests = self._local_interests.get(row)
+        if interests is None and self._base_offsets is not None and row < len(self._base_ids):
+            encoded = self._base_blob[self._base_offsets[row]:self._base_offsets[row + 1]].tobytes().decode()
+            interests = encoded.split(_INTEREST_SEPARATOR) if encoded else []
+        return interests or []
+
+    def _grow(self) -> None:
+        capacity = len(self._live) * 2
+        for name, (dtype, missing) in _COLUMNS.items():
+            column = np.full(capacity, missing, dtype=dtype)
+            column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+        traits = np.full((capacity, len(TRAITS)), np.nan, dtype=np.float32)
+        traits[:self._size] = self._traits[:self._size]
+        self._traits = traits
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._live = live
+
+    def _upsert(self, user: Dict[str, Any], features: Optional[Dict[str, Any]]) -> None:
+        values = _row_values(user, features)
+        row = self._row_of(user["id"])
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._size == len(self._live):
+                    self._grow()
+                row = self._size
+                self._size += 1
+            self._count += 1
+        self._local_rows[user["id"]] = row
+        for name in _COLUMNS:
+            self._columns[name][row] = values[name]
+        self._traits[row] = values["traits"]
+        self._live[row] = True
+        self._local_ids[row] = user["id"]
+        self._local_interests[row] = values["interests"]
+
+    def _remove(self, user_id: str) -> None:
+        row = self._row_of(user_id)
+        if row is None:
+            return
+        self._local_rows.pop(user_id, None)
+        self._clear_row(row)
+        self._free.append(row)
+        self._count -= 1
+
+    def _clear_row(self, row: int) -> None:
+        for name, (_, missing) in _COLUMNS.items():
+            self._columns[name][row] = missing
+        self._traits[row] = np.nan
+        self._live[row] = False
+        self._local_ids.pop(row, None)
+        self._local_interests[row] = []
+
+    def _distances(self, origin: Tuple[float, float]) -> np.ndarray:
+        """Haversine distance in km from a point to every row (NaN without coordinates)"""
+        lat1, lon1 = math.radians(origin[0]), math.radians(origin[1])
+        lat2 = np.radians(self._columns["latitude"][:self._size])
+        lon2 = np.radians(self._columns["longitude"][:self._size])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+# Global user snapshot instance
+user_snapshot = UserSnapshot(shared_directory=settings.USER_SNAPSHOT_DIR)
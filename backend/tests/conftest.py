@@ -63,6 +63,8 @@ def test_user(test_db):
         hashed_password: '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LHHWxNHGRI.3.9Fk.',  # password: strongpassword123
         gender: 'male',
         birth_date: date('1990-01-01'),
+        birth_year: 1990,
+        age: duration.inMonths(date('1990-01-01'), date()).years,
         bio: 'Test bio',
         interests: ['reading', 'coding'],
         location: 'Test City',
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+
+from ..core.interest_bitmask import (
+    ALL_INTERESTS,
+    INTEREST_BITS,
+    INTEREST_VOCABULARY,
+    interest_mask,
+    mask_interests,
+    mask_jaccard,
+    mask_properties,
+    popcount,
+)
+
+
+def test_vocabulary_starts_with_all_interests():
+    assert INTEREST_VOCABULARY[:len(ALL_INTERESTS)] == tuple(ALL_INTERESTS)
+    assert len(set(INTEREST_VOCABULARY)) == len(INTEREST_VOCABULARY) <= 63
+    assert INTEREST_BITS[INTEREST_VOCABULARY[0]] == 1
+
+
+def test_interest_mask_round_trips():
+    interests = ["Music", "Travel", "Sports"]
+    mask = interest_mask(interests)
+    assert mask == INTEREST_BITS["Music"] | INTEREST_BITS["Travel"] | INTEREST_BITS["Sports"]
+    # Decoded in vocabulary order
+    assert mask_interests(mask) == ["Travel", "Music", "Sports"]
+
+
+def test_interest_mask_empty():
+    assert interest_mask([]) == 0
+    assert interest_mask(None) == 0
+    assert mask_properties([]) == {"interest_mask": 0, "interest_count": 0}
+
+
+def test_interest_mask_outside_vocabulary():
+    assert interest_mask(["Travel", "Knitting"]) is None
+    # Case matters: interests are compared as stored
+    assert interest_mask(["travel"]) is None
+    assert mask_properties(["Knitting"]) == {"interest_mask": None, "interest_count": None}
+
+
+def test_interest_mask_duplicates():
+    # A mask would drop the duplicate that list-based Jaccard counts
+    assert interest_mask(["Travel", "Travel"]) is None
+    assert mask_properties(["Art", "Art"]) == {"interest_mask": None, "interest_count": None}
+
+
+def test_mask_jaccard_matches_sets():
+    rng = random.Random(3)
+    for _ in range(200):
+        first = rng.sample(INTEREST_VOCABULARY, rng.randint(0, 10))
+        second = rng.sample(INTEREST_VOCABULARY, rng.randint(0, 10))
+        union = set(first) | set(second)
+        expected = len(set(first) & set(second)) / len(union) if union else 0.0
+        assert mask_jaccard(interest_mask(first), interest_mask(second)) == expected
+
+
+def test_popcount():
+    rng = random.Random(5)
+    masks = [0, 1, (1 << 62) | 1, (1 << 63) - 1, -1] + [rng.getrandbits(63) for _ in range(100)]
+    counts = popcount(np.array(masks, dtype=np.int64))
+    assert counts.dtype == np.int64
+    # -1 (all 64 bits of a signed int64) counts the sign bit too
+    assert counts.tolist() == [(mask & ((1 << 64) - 1)).bit_count() for mask in masks]
+    assert popcount(np.array([], dtype=np.int64)).tolist() == []
+
+
+def test_mask_properties_counts_interests():
+    properties = mask_properties(ALL_INTERESTS[:5])
+    assert properties["interest_mask"] == interest_mask(ALL_INTERESTS[:5])
+    assert properties["interest_count"] == 5
@@ -0,0 +1,110 @@
+import random
+
+from ..core.interest_bitmask import ALL_INTERESTS
+from ..services.interest_index import InterestIndex, cypher_round
+
+# Vocabulary interests plus a few outside it, which are compared as lists
+INTERESTS = ALL_INTERESTS[:12] + ["Knitting", "Chess"]
+
+
+def cypher_jaccard(interests, other_interests):
+    """The recommendation Cypher: (shared interests in the caller's order, jaccardScore)"""
+    shared = [i for i in interests if i in other_interests]
+    union_size = len(interests) + len(other_interests) - len(shared)
+    return shared, (len(shared) / union_size if union_size else 0.0)
+
+
+def build_index(users):
+    index = InterestIndex()
+    for user_id, interests in users.items():
+        index.update_user(user_id, interests)
+    return index
+
+
+def test_cypher_round_rounds_half_up():
+    assert cypher_round(0.125) == 0.13
+    assert cypher_round(0.375) == 0.38
+    assert cypher_round(0.625) == 0.63
+    assert cypher_round(1 / 3) == 0.33
+    assert cypher_round(0.0) == 0.0
+
+
+def test_top_k_matches_cypher_jaccard():
+    rng = random.Random(4)
+    for _ in range(100):
+        users = {
+            f"u{n}": rng.sample(INTERESTS, rng.randint(0, 6)) + rng.choice([[], [], ["Chess"]])
+            for n in range(60)
+        }
+        index = build_index(users)
+        me = rng.choice(list(users))
+        my_interests = users[me]
+        k = rng.choice([1, 5, 10])
+        exclude = set(rng.sample(list(users), 5)) - {me}
+
+        results = index.top_k(me, my_interests, k=k, exclude=exclude)
+
+        expected = {}
+        for user_id, interests in users.items():
+            if user_id == me or user_id in exclude:
+                continue
+            shared, jaccard = cypher_jaccard(my_interests, interests)
+            if shared:
+                expected[user_id] = (jaccard, len(shared), shared)
+        ranked = sorted(expected.values(), key=lambda value: (value[0], value[1]), reverse=True)
+
+        # Cypher leaves the order of full ties open: compare the rank keys, then each row
+        matched = [result for result in results if result["id"] in expected]
+        assert [(expected[r["id"]][0], expected[r["id"]][1]) for r in matched] == \
+            [(jaccard, shared_count) for jaccard, shared_count, _ in ranked[:k]]
+        for result in matched:
+            jaccard, _, shared = expected[result["id"]]
+            assert result["shared_interests"] == shared
+            assert result["similarity"] == cypher_round(jaccard)
+
+        # Padded with zero-similarity users when fewer than k share an interest
+        assert len(results) == min(k, len(users) - 1 - len(exclude))
+        for result in results[len(matched):]:
+            assert result["id"] not in expected and result["id"] != me and result["id"] not in exclude
+            assert result["similarity"] == 0.0
+            assert result["shared_interests"] == []
+
+
+def test_top_k_rounds_ties_like_cypher():
+    me = ALL_INTERESTS[:8]
+    index = build_index({
+        "me": me,
+        # 1 shared of 8: 0.125, which Python's round() would make 0.12
+        "one": [ALL_INTERESTS[0]],
+        # 3 shared of 8: 0.375
+        "three": ALL_INTERESTS[:3],
+    })
+
+    results = index.top_k("me", me, k=2)
+
+    assert [(r["id"], r["similarity"]) for r in results] == [("three", 0.38), ("one", 0.13)]
+
+
+def test_top_k_breaks_similarity_ties_on_shared_count():
+    me = ALL_INTERESTS[:2]
+    index = build_index({
+        "me": me,
+        # Both 0.5: one shared of a union of 2, two shared of a union of 4
+        "small": [ALL_INTERESTS[0]],
+        "large": ALL_INTERESTS[:2] + ALL_INTERESTS[10:12],
+    })
+
+    results = index.top_k("me", me, k=2)
+
+    assert [r["id"] for r in results] == ["large", "small"]
+    assert [r["similarity"] for r in results] == [0.5, 0.5]
+
+
+def test_update_and_remove_user():
+    index = build_index({"me": ["Art"], "other": ["Art"]})
+    index.update_user("other", ["Wine"])
+    assert index.top_k("me", ["Art"], k=1) == [{"id": "other", "shared_interests": [], "similarity": 0.0}]
+
+    index.remove_user("other")
+    assert index.get_interests("other") is None
+    assert index.top_k("me", ["Art"], k=1) == []
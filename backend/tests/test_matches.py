@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from ..main import app
+from ..services.deck import DeckStore, InvalidCursor, decode_cursor, encode_cursor
 
 client = TestClient(app)
 
@@ -130,4 +131,158 @@ def test_get_my_matches(auth_headers):
         assert "id" in data[0]
         assert "email" in data[0]
         assert "match_score" in data[0]
-        assert "hashed_password" not in data[0] 
\ No newline at end of file
+        assert "hashed_password" not in data[0]
+
+def test_submit_swipes(auth_headers):
+    response = client.get("/api/v1/matches/recommendations", headers=auth_headers)
+    if response.status_code == 200 and len(response.json()) > 1:
+        first, second = response.json()[:2]
+        swipes = [
+            {"target_id": first["id"], "action": "like"},
+            {"target_id": second["id"], "action": "dislike"},
+            {"target_id": first["id"], "action": "dislike"},
+        ]
+        response = client.post("/api/v1/swipes", json={"swipes": swipes}, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["target_id"] for r in data["results"]] == [s["target_id"] for s in swipes]
+        assert data["results"][0]["status"] in ("created", "unchanged")
+        assert data["results"][2]["status"] == "duplicate"
+        assert "likes_sent" in data["statistics"]
+        
+        # Replaying the batch records nothing new
+        response = client.post("/api/v1/swipes", json={"swipes": swipes[:2]}, headers=auth_headers)
+        assert [r["status"] for r in response.json()["results"]] == ["unchanged", "unchanged"]
+
+def test_submit_swipes_unknown_target(auth_headers):
+    response = client.post(
+        "/api/v1/swipes",
+        json={"swipes": [{"target_id": "nonexistent-id", "action": "like"}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "not_found"
+    assert response.json()["results"][0]["is_match"] is False
+
+def test_submit_swipes_validation(auth_headers):
+    response = client.post("/api/v1/swipes", json={"swipes": []}, headers=auth_headers)
+    assert response.status_code == 422
+    
+    response = client.post(
+        "/api/v1/swipes",
+        json={"swipes": [{"target_id": "someone", "action": "superlike"}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 422
+
+def test_get_match_deck(auth_headers, user_preferences):
+    response = client.get("/api/v1/matches/deck?page_size=5", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["items"]) <= 5
+    assert isinstance(data["prefetch"], bool)
+    
+    if data["next_cursor"]:
+        # The next page continues the same deck without repeating profiles
+        response = client.get(
+            f"/api/v1/matches/deck?page_size=5&cursor={data['next_cursor']}",
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        first_ids = {item["id"] for item in data["items"]}
+        assert not first_ids & {item["id"] for item in response.json()["items"]}
+
+def test_get_match_deck_skips_swiped(auth_headers, user_preferences):
+    response = client.get("/api/v1/matches/deck?page_size=2", headers=auth_headers)
+    data = response.json()
+    if len(data["items"]) == 2 and data["next_cursor"]:
+        swiped = data["items"][1]["id"]
+        client.post(
+            "/api/v1/swipes",
+            json={"swipes": [{"target_id": swiped, "action": "dislike"}]},
+            headers=auth_headers
+        )
+        response = client.get("/api/v1/matches/deck?page_size=50", headers=auth_headers)
+        assert swiped not in [item["id"] for item in response.json()["items"]]
+
+def test_get_match_deck_invalid_cursor(auth_headers, user_preferences):
+    response = client.get("/api/v1/matches/deck?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+def _deck(count):
+    return [{"id": f"user-{i}"} for i in range(count)]
+
+def test_deck_store_pages():
+    store = DeckStore(ttl_seconds=60, max_users=10)
+    deck_id = store.store("me", _deck(5))
+    
+    page = store.page("me", deck_id, 0, 2)
+    assert [item["id"] for item in page["items"]] == ["user-0", "user-1"]
+    assert page["remaining"] == 3
+    assert decode_cursor(page["next_cursor"]) == (deck_id, 2)
+    
+    page = store.page("me", deck_id, 2, 2)
+    assert [item["id"] for item in page["items"]] == ["user-2", "user-3"]
+    
+    page = store.page("me", deck_id, 4, 2)
+    assert [item["id"] for item in page["items"]] == ["user-4"]
+    assert page["remaining"] == 0
+    
+    # The deck is exhausted: its last cursor starts a re-rank
+    _, offset = decode_cursor(page["next_cursor"])
+    assert store.page("me", deck_id, offset, 2) is None
+
+def test_deck_store_skips_seen_across_pages():
+    store = DeckStore(ttl_seconds=60, max_users=10)
+    deck_id = store.store("me", _deck(6))
+    
+    first = store.page("me", deck_id, 0, 2)
+    assert [item["id"] for item in first["items"]] == ["user-0", "user-1"]
+    
+    # user-2 and user-3 were swiped after the first page was read
+    _, offset = decode_cursor(first["next_cursor"])
+    second = store.page("me", deck_id, offset, 2, exclude={"user-2", "user-3"})
+    assert [item["id"] for item in second["items"]] == ["user-4", "user-5"]
+    assert second["remaining"] == 0
+
+def test_deck_store_gone_decks():
+    store = DeckStore(ttl_seconds=60, max_users=10)
+    deck_id = store.store("me", _deck(3))
+    
+    # Replaced by a newer deck
+    new_deck_id = store.store("me", _deck(3))
+    assert store.page("me", deck_id, 0, 2) is None
+    assert store.page("me", new_deck_id, 0, 2) is not None
+    
+    # Invalidated
+    store.invalidate_user("me")
+    assert store.page("me", new_deck_id, 0, 2) is None
+    assert store.current("me") is None
+    
+    # Expired
+    expiring = DeckStore(ttl_seconds=0, max_users=10)
+    deck_id = expiring.store("me", _deck(3))
+    assert expiring.page("me", deck_id, 0, 2) is None
+    
+    # Evicted as least recently used
+    small = DeckStore(ttl_seconds=60, max_users=1)
+    deck_id = small.store("me", _deck(3))
+    small.store("someone-else", _deck(3))
+    assert small.page("me", deck_id, 0, 2) is None
+
+def test_deck_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc123", 0)) == ("abc123", 0)
+    assert decode_cursor(encode_cursor("abc123", 40)) == ("abc123", 40)
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "",
+    encode_cursor("abc123", -1),
+    "YWJjMTIzOmZvdXI",  # "abc123:four"
+    "YWJjMTIz",  # no offset
+    "YTpiOjE",  # "a:b:1"
+    "__8",  # not UTF-8
+])
+def test_deck_cursor_invalid(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
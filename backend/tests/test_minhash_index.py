@@ -0,0 +1,95 @@
+import random
+
+from ..core.interest_bitmask import ALL_INTERESTS
+from ..services.interest_index import cypher_round
+from ..services.minhash_index import MinHashIndex, jaccard, user_tokens
+
+TOPICS = [f"topic-{n}" for n in range(200)]
+
+
+def clustered_users(rng, clusters=20, size=25):
+    """Users drawn around cluster centres, so each has a few close neighbours"""
+    users = {}
+    for cluster in range(clusters):
+        interests = rng.sample(ALL_INTERESTS, 6)
+        topics = rng.sample(TOPICS, 10)
+        for member in range(size):
+            users[f"c{cluster}-{member}"] = (
+                [i for i in interests if rng.random() < 0.8] + rng.sample(ALL_INTERESTS, 1),
+                [t for t in topics if rng.random() < 0.8] + rng.sample(TOPICS, 2),
+            )
+    return users
+
+
+def build_index(users):
+    index = MinHashIndex(bands=32, rows=4, max_candidates=5000, seed=1)
+    for user_id, (interests, topics) in users.items():
+        index.update_user(user_id, interests, topics)
+    return index
+
+
+def test_minhash_recall_on_fixed_seed():
+    rng = random.Random(0)
+    users = clustered_users(rng)
+    index = build_index(users)
+    tokens = {user_id: user_tokens(*profile) for user_id, profile in users.items()}
+
+    near = found = far = far_found = 0
+    for user_id in rng.sample(list(users), 60):
+        candidates = {result["id"] for result in index.top_k(user_id, k=len(users))}
+        for other_id in users:
+            if other_id == user_id:
+                continue
+            similarity = jaccard(tokens[user_id], tokens[other_id])
+            if similarity >= 0.5:
+                near += 1
+                found += other_id in candidates
+            elif similarity < 0.1:
+                far += 1
+                far_found += other_id in candidates
+
+    # 32 bands of 4 rows find a pair at Jaccard 0.5 with probability 1 - (1 - 0.5^4)^32 = 0.87
+    assert near > 500
+    assert found / near >= 0.9
+    assert far_found / far <= 0.005
+
+
+def test_top_k_scores_exact_jaccard():
+    rng = random.Random(1)
+    users = clustered_users(rng, clusters=5, size=10)
+    index = build_index(users)
+    tokens = {user_id: user_tokens(*profile) for user_id, profile in users.items()}
+
+    user_id = "c0-0"
+    results = index.top_k(user_id, k=5)
+    assert len(results) == 5
+    for result in results:
+        assert result["similarity"] == cypher_round(jaccard(tokens[user_id], tokens[result["id"]]))
+        other_interests = set(users[result["id"]][0])
+        assert result["shared_interests"] == [i for i in users[user_id][0] if i in other_interests]
+    similarities = [result["similarity"] for result in results]
+    assert similarities == sorted(similarities, reverse=True)
+
+
+def test_identical_users_always_collide():
+    index = build_index({
+        "me": (["Art", "Wine"], ["topic-1"]),
+        "twin": (["Wine", "Art"], ["topic-1"]),
+        "other": (["Cars"], ["topic-2"]),
+    })
+
+    assert index.top_k("me", k=10) == [{"id": "twin", "shared_interests": ["Art", "Wine"], "similarity": 1.0}]
+    assert index.top_k("me", k=10, exclude={"twin"}) == []
+
+
+def test_update_and_remove_user():
+    index = build_index({"me": (["Art"], []), "other": (["Art"], [])})
+    index.update_user("other", interests=["Cars"])
+    assert index.top_k("me", k=10) == []
+
+    index.update_user("other", interests=["Art"])
+    assert [result["id"] for result in index.top_k("me", k=10)] == ["other"]
+
+    index.remove_user("other")
+    assert "other" not in index
+    assert index.top_k("me", k=10) == []
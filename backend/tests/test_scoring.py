@@ -0,0 +1,99 @@
+import asyncio
+import random
+
+import pytest
+
+from ..core.interest_bitmask import ALL_INTERESTS
+from ..ml.models.compatibility import EnhancedMatchingModel
+from ..ml.scoring_queue import ScoringQueue
+
+TRAITS = ["openness", "conscientiousness", "extroversion", "agreeableness", "neuroticism"]
+# Vocabulary interests plus a few outside it, which take the set path
+INTERESTS = ALL_INTERESTS + ["Sports", "Knitting", "Chess"]
+
+
+def random_profile(rng):
+    profile = {"interests": [rng.choice(INTERESTS) for _ in range(rng.randint(0, 8))]}
+    if rng.random() < 0.9:
+        profile["coordinates"] = {"latitude": rng.uniform(40, 41), "longitude": rng.uniform(-74, -73)}
+    if rng.random() < 0.9:
+        profile["age"] = rng.randint(18, 60)
+    if rng.random() < 0.8:
+        profile["personality_traits"] = {trait: round(rng.random(), 2) for trait in rng.sample(TRAITS, rng.randint(1, 5))}
+    return profile
+
+
+def reference_scores(model, user_data, candidates, top_k=None):
+    """score_batch through the per-pair path: stable sort on match_score"""
+    scored = []
+    for i, candidate in enumerate(candidates):
+        compatibility = model.calculate_overall_compatibility(user_data, candidate)
+        compatibility["index"] = i
+        scored.append(compatibility)
+    scored.sort(key=lambda compatibility: -compatibility["match_score"])
+    return scored if top_k is None else scored[:top_k]
+
+
+def normalized(results):
+    for compatibility in results:
+        compatibility["common_interests"] = sorted(compatibility["common_interests"])
+    return results
+
+
+def test_score_batch_matches_pairwise_scores():
+    model = EnhancedMatchingModel()
+    rng = random.Random(42)
+    for _ in range(200):
+        user_data = random_profile(rng)
+        candidates = [random_profile(rng) for _ in range(rng.randint(1, 60))]
+        top_k = rng.choice([None, 1, 5, 20])
+        assert normalized(model.score_batch(user_data, candidates, top_k)) == \
+            normalized(reference_scores(model, user_data, candidates, top_k))
+
+
+def test_score_requests_matches_score_batch():
+    model = EnhancedMatchingModel()
+    rng = random.Random(7)
+    requests = [
+        (random_profile(rng), [random_profile(rng) for _ in range(rng.randint(0, 30))], rng.choice([None, 3]))
+        for _ in range(10)
+    ]
+    assert model.score_requests(requests) == [model.score_batch(*request) for request in requests]
+
+
+def failing_scorer(requests):
+    if any(user_data.get("fail") for user_data, _, _ in requests):
+        raise ValueError("bad request")
+    return [[len(candidates)] for _, candidates, _ in requests]
+
+
+def test_scoring_queue_batches_requests():
+    queue = ScoringQueue(failing_scorer, max_items=1000, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(queue.score({"id": i}, [{}] * (i + 1)) for i in range(4)))
+
+    assert asyncio.run(run()) == [[1], [2], [3], [4]]
+    stats = queue.stats()
+    assert stats["batches"] == 1
+    assert stats["requests"] == 4
+
+
+def test_scoring_queue_isolates_failing_request():
+    queue = ScoringQueue(failing_scorer, max_items=1000, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            queue.score({"id": 1}, [{}]),
+            queue.score({"id": 2, "fail": True}, [{}]),
+            queue.score({"id": 3}, [{}, {}]),
+            return_exceptions=True,
+        )
+
+    first, failed, third = asyncio.run(run())
+    assert first == [1]
+    assert isinstance(failed, ValueError)
+    assert third == [2]
+    stats = queue.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["retried_requests"] == 3
@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+
+from ..db.database import db
+from ..services.seen_set import SeenSet, SeenSets, fingerprint
+
+
+def test_seen_set_add_and_contains():
+    seen = SeenSet(["a", "b", "b"])
+    assert len(seen) == 2
+    assert "a" in seen and "b" in seen
+    assert "c" not in seen
+
+    seen.add("c")
+    seen.add("c")
+    assert "c" in seen
+    assert len(seen) == 3
+    assert seen.fingerprints().tolist() == sorted(fingerprint(user_id) for user_id in ["a", "b", "c"])
+    assert seen.fingerprints().dtype == np.int64
+
+
+def test_seen_set_stays_sorted():
+    ids = [f"user-{n}" for n in range(500)]
+    seen = SeenSet(ids[:250])
+    for user_id in reversed(ids[250:]):
+        seen.add(user_id)
+    fingerprints = seen.fingerprints()
+    assert (np.diff(fingerprints) > 0).all()
+    assert all(user_id in seen for user_id in ids)
+    assert "user-500" not in seen
+
+
+def query_returning(*id_lists):
+    return AsyncMock(side_effect=[[{"ids": ids}] for ids in id_lists])
+
+
+def test_seen_sets_load_once_and_track_adds():
+    seen_sets = SeenSets(max_users=10, refresh_seconds=60)
+    with patch.object(db, "execute_query_async", query_returning(["a"])) as query:
+        seen = asyncio.run(seen_sets.get("me"))
+        seen_sets.add("me", "b")
+        # Not loaded: read from Neo4j when first needed
+        seen_sets.add("other", "b")
+        again = asyncio.run(seen_sets.get("me"))
+
+    assert query.await_count == 1
+    assert again is seen
+    assert "a" in seen and "b" in seen
+    assert seen_sets.stats()["users"] == 1
+
+
+def test_seen_sets_refresh_after_refresh_seconds():
+    seen_sets = SeenSets(max_users=10, refresh_seconds=60)
+    with patch.object(db, "execute_query_async", query_returning(["a"], ["a", "c"])) as query:
+        first = asyncio.run(seen_sets.get("me"))
+        first.loaded_at -= 61
+        second = asyncio.run(seen_sets.get("me"))
+
+    assert query.await_count == 2
+    assert second is not first
+    assert "c" in second
+    assert seen_sets.stats()["loads"] == 2
+
+
+def test_seen_sets_evict_least_recently_used():
+    seen_sets = SeenSets(max_users=2, refresh_seconds=60)
+    with patch.object(db, "execute_query_async", query_returning([], [], [], [])) as query:
+        asyncio.run(seen_sets.get("u1"))
+        asyncio.run(seen_sets.get("u2"))
+        asyncio.run(seen_sets.get("u1"))
+        asyncio.run(seen_sets.get("u3"))
+        asyncio.run(seen_sets.get("u1"))
+
+    # u2 was least recently used when u3 was loaded; u1 stayed cached
+    assert query.await_count == 3
+    assert seen_sets.stats()["evictions"] == 1
+    assert seen_sets.stats()["users"] == 2
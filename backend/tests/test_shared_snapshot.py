@@ -0,0 +1,138 @@
+import os
+import time
+
+import numpy as np
+
+from ..services.shared_snapshot import SnapshotGenerations
+from ..services.user_snapshot import UserSnapshot
+
+
+def generation_dirs(directory):
+    return sorted(name for name in os.listdir(directory) if not name.startswith(("CURRENT", ".lock")))
+
+
+def test_publish_and_attach(tmp_path):
+    generations = SnapshotGenerations(str(tmp_path))
+    assert generations.current() is None
+    assert generations.current_name() is None
+
+    arrays = {"values": np.arange(10, dtype=np.int64), "flags": np.array([True, False, True])}
+    generation = generations.publish(arrays, {"size": 10})
+
+    assert generations.current_name() == generation
+    name, meta = generations.current()
+    assert name == generation
+    assert meta["size"] == 10
+    assert meta["arrays"] == ["flags", "values"]
+
+    attached, attached_meta = generations.attach(generation)
+    assert attached_meta == meta
+    assert attached["values"].tolist() == list(range(10))
+    assert attached["flags"].tolist() == [True, False, True]
+
+
+def test_attach_is_copy_on_write(tmp_path):
+    generations = SnapshotGenerations(str(tmp_path))
+    generation = generations.publish({"values": np.zeros(4, dtype=np.int64)}, {})
+
+    first, _ = generations.attach(generation)
+    first["values"][0] = 7
+
+    second, _ = generations.attach(generation)
+    assert second["values"].tolist() == [0, 0, 0, 0]
+    assert first["values"].tolist() == [7, 0, 0, 0]
+
+
+def test_publish_prunes_old_generations(tmp_path):
+    generations = SnapshotGenerations(str(tmp_path), keep=2)
+    published = [generations.publish({"values": np.full(3, n)}, {"n": n}) for n in range(4)]
+
+    # The current generation and the one before it; no staging directories left behind
+    assert generation_dirs(tmp_path) == published[2:]
+    assert generations.current()[1]["n"] == 3
+    assert generations.publishes == 4
+
+
+def test_mapped_generation_survives_prune(tmp_path):
+    generations = SnapshotGenerations(str(tmp_path), keep=1)
+    first = generations.publish({"values": np.arange(3)}, {})
+    mapped, _ = generations.attach(first)
+
+    generations.publish({"values": np.arange(5)}, {})
+
+    assert first not in generation_dirs(tmp_path)
+    assert mapped["values"].tolist() == [0, 1, 2]
+
+
+def test_rebuild_lock_is_exclusive(tmp_path):
+    generations = SnapshotGenerations(str(tmp_path))
+    lock = generations.try_lock()
+    assert lock is not None
+    assert generations.try_lock() is None
+
+    generations.unlock(lock)
+    lock = generations.try_lock()
+    assert lock is not None
+    generations.unlock(lock)
+
+
+def test_user_snapshot_round_trip(tmp_path):
+    built = UserSnapshot(capacity=4)
+    for n in range(10):
+        built.update_user({
+            "id": f"user-{n}",
+            "interests": ["Art", "Wine"] if n % 2 else ["Knitting"],
+            "is_active": True,
+            "latitude": 45.0 + n / 10,
+            "longitude": 5.0,
+        })
+    built.remove_user("user-3")
+
+    publisher = UserSnapshot(shared_directory=str(tmp_path))
+    generation = publisher.generations.publish(
+        built._to_arrays(), {"size": built._size, "users": built._count, "built_at": time.time()}
+    )
+
+    worker = UserSnapshot(shared_directory=str(tmp_path))
+    worker.attach(generation)
+
+    assert worker.generation == generation
+    assert len(worker) == 9
+    assert "user-3" not in worker
+    shortlists = [
+        snapshot.shortlist(snapshot.retrieve("user-0", (45.0, 5.0), 100.0, None), ["Art"], (45.0, 5.0), 100.0, 3, 0.4, 0.3)
+        for snapshot in (built, worker)
+    ]
+    assert shortlists[0] == shortlists[1]
+    assert [candidate["id"] for candidate in shortlists[1]] == ["user-1", "user-5", "user-7"]
+    assert worker.shortlist(worker.retrieve("user-0", None, None, None), ["Knitting"], None, None, 1, 0.4, 0.3)[0] == \
+        {"id": "user-2", "interests": ["Knitting"], "coordinates": (45.2, 5.0), "is_active": True}
+
+
+def test_attach_replays_writes_made_after_the_build(tmp_path):
+    built = UserSnapshot(capacity=4)
+    for n in range(3):
+        built.update_user({"id": f"user-{n}", "interests": ["Art"], "is_active": True})
+    generations = SnapshotGenerations(str(tmp_path))
+
+    worker = UserSnapshot(shared_directory=str(tmp_path))
+    # Made before the build read Neo4j: already in the generation
+    worker.update_user({"id": "user-0", "interests": ["Old"], "is_active": True})
+    time.sleep(0.01)
+    built_at = time.time()
+    # Made while it was built: re-applied over the generation
+    worker.update_user({"id": "user-1", "interests": ["Wine"], "is_active": True})
+    worker.update_user({"id": "user-9", "interests": ["Cars"], "is_active": True})
+    worker.remove_user("user-2")
+
+    generation = generations.publish(
+        built._to_arrays(), {"size": built._size, "users": built._count, "built_at": built_at}
+    )
+    worker.attach(generation)
+
+    interests = {
+        candidate["id"]: candidate["interests"]
+        for candidate in worker.shortlist(worker.retrieve("nobody", None, None, None), [], None, None, 10, 0.4, 0.3)
+    }
+    assert interests == {"user-0": ["Art"], "user-1": ["Wine"], "user-9": ["Cars"]}
+    assert set(worker._writes) == {"user-1", "user-9", "user-2"}
@@ -0,0 +1,183 @@
+import random
+from datetime import datetime
+
+import numpy as np
+
+from ..core.interest_bitmask import ALL_INTERESTS
+from ..ml.candidate_pipeline import shortlist
+from ..models.user import Gender, UserPreferences
+from ..services.geo_index import haversine_km, parse_coordinates
+from ..services.seen_set import SeenSet
+from ..services.user_snapshot import UserSnapshot
+
+TODAY = datetime(2026, 6, 1)
+# Vocabulary interests plus a few outside it, which have no mask
+INTERESTS = ALL_INTERESTS + ["Sports", "Knitting", "Chess"]
+GENDERS = [gender.value for gender in Gender]
+
+
+def random_user(rng, user_id):
+    interests = rng.sample(INTERESTS, rng.randint(0, 6))
+    if interests and rng.random() < 0.1:
+        interests.append(interests[0])
+    user = {
+        "id": user_id,
+        "interests": interests,
+        "gender": rng.choice(GENDERS),
+        "birth_year": rng.randint(1950, 2006),
+        "is_active": rng.choice([True, True, True, False, None]),
+    }
+    if rng.random() < 0.9:
+        # RandomUser stores coordinates as strings
+        latitude, longitude = rng.uniform(40, 50), rng.uniform(0, 10)
+        user["latitude"], user["longitude"] = (str(latitude), str(longitude)) if rng.random() < 0.3 else (latitude, longitude)
+    return user
+
+
+def random_preferences(rng):
+    if rng.random() < 0.3:
+        return None
+    min_age = rng.randint(18, 50)
+    return UserPreferences(
+        min_age=min_age,
+        max_age=rng.randint(min_age, 80),
+        preferred_gender=rng.choice([None, [Gender.FEMALE], [Gender.MALE, Gender.NON_BINARY]]),
+    )
+
+
+def reference_retrieve(users, user_id, origin, radius_km, preferences):
+    """The Cypher retrieval predicates, one user at a time"""
+    retrieved = []
+    for user in users:
+        if user["id"] == user_id:
+            continue
+        if origin is not None and radius_km is not None:
+            coordinates = parse_coordinates(user.get("latitude"), user.get("longitude"))
+            if coordinates is None or haversine_km(*origin, *coordinates) > radius_km:
+                continue
+        if preferences is not None:
+            if user["is_active"] is not True:
+                continue
+            if not TODAY.year - preferences.max_age <= user["birth_year"] <= TODAY.year - preferences.min_age:
+                continue
+            if preferences.preferred_gender and user["gender"] not in [g.value for g in preferences.preferred_gender]:
+                continue
+        retrieved.append(user)
+    return retrieved
+
+
+def build_snapshot(rng, count):
+    snapshot = UserSnapshot(capacity=16)
+    users = [random_user(rng, f"user-{n}") for n in range(count)]
+    for user in users:
+        snapshot.update_user(user)
+    # Removed rows are reused by later inserts
+    for user in rng.sample(users, count // 10):
+        snapshot.remove_user(user["id"])
+        users.remove(user)
+    for n in range(count // 20):
+        user = random_user(rng, f"late-{n}")
+        snapshot.update_user(user)
+        users.append(user)
+    return snapshot, users
+
+
+def snapshot_order(snapshot, users):
+    """Users in row order, the order retrieve returns them in"""
+    return sorted(users, key=lambda user: snapshot._row_of(user["id"]))
+
+
+def test_retrieve_matches_cypher_predicates():
+    rng = random.Random(8)
+    for _ in range(30):
+        snapshot, users = build_snapshot(rng, 300)
+        me = rng.choice(users)
+        origin = rng.choice([None, (45.0, 5.0)])
+        radius_km = rng.choice([None, 150.0, 400.0])
+        preferences = random_preferences(rng)
+
+        rows = snapshot.retrieve(me["id"], origin, radius_km, preferences, today=TODAY)
+
+        expected = reference_retrieve(snapshot_order(snapshot, users), me["id"], origin, radius_km, preferences)
+        assert [snapshot._id_at(row) for row in rows.tolist()] == [user["id"] for user in expected]
+
+
+def test_filter_drops_inactive_and_seen_users():
+    rng = random.Random(9)
+    snapshot, users = build_snapshot(rng, 200)
+    seen = SeenSet(user["id"] for user in rng.sample(users, 30))
+
+    rows = snapshot.filter(snapshot.retrieve("nobody", None, None, None), seen)
+
+    expected = [
+        user["id"] for user in snapshot_order(snapshot, users)
+        if user["is_active"] is not False and user["id"] not in seen
+    ]
+    assert [snapshot._id_at(row) for row in rows.tolist()] == expected
+
+
+def test_shortlist_matches_candidate_pipeline():
+    rng = random.Random(10)
+    for _ in range(50):
+        snapshot, users = build_snapshot(rng, 300)
+        me = rng.choice(users)
+        origin = rng.choice([None, (45.0, 5.0)])
+        radius_km = rng.choice([None, 300.0])
+        size = rng.choice([1, 10, 50, 500])
+
+        rows = snapshot.filter(snapshot.retrieve(me["id"], origin, radius_km, None))
+        got = snapshot.shortlist(rows, me["interests"], origin, radius_km, size, 0.4, 0.3)
+
+        candidates = [
+            {
+                "id": user["id"],
+                "interests": user["interests"],
+                "coordinates": parse_coordinates(user.get("latitude"), user.get("longitude")),
+                "is_active": user["is_active"],
+            }
+            for user in snapshot_order(snapshot, users)
+            if user["id"] != me["id"] and user["is_active"] is not False
+        ]
+        if origin is not None and radius_km is not None:
+            candidates = [
+                candidate for candidate in candidates
+                if candidate["coordinates"] is not None and haversine_km(*origin, *candidate["coordinates"]) <= radius_km
+            ]
+        expected = shortlist(me["interests"], origin, radius_km, candidates, size, 0.4, 0.3)
+
+        assert [candidate["id"] for candidate in got] == [candidate["id"] for candidate in expected]
+        for candidate, reference in zip(got, expected):
+            assert candidate["interests"] == reference["interests"]
+            assert candidate["is_active"] == reference["is_active"]
+            if reference["coordinates"] is None:
+                assert candidate["coordinates"] is None
+            else:
+                assert np.allclose(candidate["coordinates"], reference["coordinates"])
+
+
+def test_shortlist_breaks_ties_in_row_order():
+    snapshot = UserSnapshot(capacity=16)
+    for n in range(10):
+        snapshot.update_user({"id": f"user-{n}", "interests": ["Art"], "is_active": True})
+
+    rows = snapshot.retrieve("nobody", None, None, None)
+    got = snapshot.shortlist(rows, ["Art"], None, None, 3, 0.4, 0.3)
+
+    assert [candidate["id"] for candidate in got] == ["user-0", "user-1", "user-2"]
+
+
+def test_update_and_remove_user():
+    snapshot = UserSnapshot(capacity=2)
+    snapshot.update_user({"id": "a", "interests": ["Art"], "is_active": True})
+    snapshot.update_user({"id": "b", "interests": ["Art"], "is_active": True})
+    snapshot.update_user({"id": "c", "interests": ["Art"], "is_active": True})
+    assert len(snapshot) == 3
+    assert "c" in snapshot
+
+    snapshot.remove_user("b")
+    assert "b" not in snapshot
+    assert len(snapshot) == 2
+
+    snapshot.update_user({"id": "a", "interests": ["Wine"], "is_active": False})
+    rows = snapshot.filter(snapshot.retrieve("nobody", None, None, None))
+    assert [snapshot._id_at(row) for row in rows.tolist()] == ["c"]